@@ -0,0 +1,41 @@
+"""Admission control for inline submission processing.
+
+A request is admitted to run detection inline only while its assignment's
+token bucket has tokens and both the per-process and per-assignment
+in-flight caps have room. Everything else is stored and queued, never rejected.
+The token is only taken once both caps have room, so a submission sent to the
+queue doesn't use up its assignment's inline budget.
+"""
+import threading
+from collections import defaultdict
+
+from ratelimit import KeyedBuckets
+
+
+class AdmissionController:
+    def __init__(self, max_inflight, max_inflight_per_assignment, rate_per_assignment, burst_per_assignment):
+        self.max_inflight_per_assignment = max_inflight_per_assignment
+        self._process_slots = threading.BoundedSemaphore(max_inflight)
+        self._buckets = KeyedBuckets(rate_per_assignment, burst_per_assignment)
+        self._inflight = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def try_admit(self, assignment_id):
+        """Reserve an inline processing slot; the caller must release() it when done"""
+        if not self._process_slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            # The rate token is taken last, so a request turned away for lack of a slot doesn't spend it
+            if (self._inflight[assignment_id] >= self.max_inflight_per_assignment
+                    or not self._buckets.get(assignment_id).try_acquire()):
+                self._process_slots.release()
+                return False
+            self._inflight[assignment_id] += 1
+        return True
+
+    def release(self, assignment_id):
+        with self._lock:
+            self._inflight[assignment_id] -= 1
+            if not self._inflight[assignment_id]:
+                del self._inflight[assignment_id]
+        self._process_slots.release()
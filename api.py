@@ -1,17 +1,54 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, g, current_app
 from models import db, Teacher, Student, Assignment, Submission
+from batch import BatchError, apply_batch
+from changes import changes_since
+from read_models import assignment_dict, submission_rows
+from search import SUBMISSION_COLUMNS, search_assignments, search_submissions
+from tokens import TokenError, issue_token, verify_token, denylist
 from werkzeug.security import check_password_hash
 from datetime import datetime
 import os
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
+@api.before_request
+def load_principal():
+    """Resolve the caller from a bearer token, falling back to the cookie session"""
+    g.api_claims = None
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        try:
+            g.api_claims = verify_token(_token_secret(), auth_header[7:].strip())
+        except TokenError as e:
+            return jsonify({'error': str(e)}), 401
+
+def _token_secret():
+    return current_app.config.get('API_TOKEN_SECRET') or current_app.config['SECRET_KEY']
+
+def current_teacher_id():
+    claims = g.get('api_claims')
+    if claims is not None:
+        return claims['sub'] if claims['role'] == 'teacher' else None
+    return session.get('teacher_id')
+
+def current_student_id():
+    claims = g.get('api_claims')
+    if claims is not None:
+        return claims['sub'] if claims['role'] == 'student' else None
+    return session.get('student_id')
+
 def require_auth():
     """Check if user is authenticated"""
-    if 'teacher_id' not in session and 'student_id' not in session:
+    if current_teacher_id() is None and current_student_id() is None:
         return jsonify({'error': 'Authentication required'}), 401
     return None
 
+def _token_response(role, user, **claims):
+    """Login payload with a bearer token for clients that don't keep cookies"""
+    ttl = current_app.config.get('API_TOKEN_TTL', 3600)
+    token, _ = issue_token(_token_secret(), role, user.id, ttl, **claims)
+    return {'access_token': token, 'token_type': 'Bearer', 'expires_in': ttl}
+
 @api.route('/auth/login', methods=['POST'])
 def api_login():
     """API endpoint for user login"""
@@ -32,7 +69,8 @@ def api_login():
                 'user_type': 'teacher',
                 'user_id': user.id,
                 'name': user.name,
-                'email': user.email
+                'email': user.email,
+                **_token_response('teacher', user)
             })
     else:
         user = Student.query.filter_by(email=email).first()
@@ -44,7 +82,9 @@ def api_login():
                 'user_id': user.id,
                 'name': user.name,
                 'email': user.email,
-                'reg_no': user.reg_no
+                'reg_no': user.reg_no,
+                # Profile claims let create_submission skip the Student lookup
+                **_token_response('student', user, name=user.name, email=user.email, reg_no=user.reg_no)
             })
     
     return jsonify({'error': 'Invalid credentials'}), 401
@@ -52,6 +92,8 @@ def api_login():
 @api.route('/auth/logout', methods=['POST'])
 def api_logout():
     """API endpoint for user logout"""
+    if g.get('api_claims') is not None:
+        denylist.revoke(g.api_claims)
     session.clear()
     return jsonify({'success': True, 'message': 'Logged out successfully'})
 
@@ -63,14 +105,7 @@ def get_assignments():
         return auth_error
     
     assignments = Assignment.query.order_by(Assignment.due_date.desc()).all()
-    return jsonify([{
-        'id': a.id,
-        'title': a.title,
-        'description': a.description,
-        'due_date': a.due_date.isoformat(),
-        'created_at': a.created_at.isoformat(),
-        'teacher_id': a.teacher_id
-    } for a in assignments])
+    return jsonify([assignment_dict(a) for a in assignments])
 
 @api.route('/assignments/<int:assignment_id>', methods=['GET'])
 def get_assignment(assignment_id):
@@ -80,23 +115,15 @@ def get_assignment(assignment_id):
         return auth_error
     
     assignment = Assignment.query.get_or_404(assignment_id)
-    return jsonify({
-        'id': assignment.id,
-        'title': assignment.title,
-        'description': assignment.description,
-        'due_date': assignment.due_date.isoformat(),
-        'created_at': assignment.created_at.isoformat(),
-        'teacher_id': assignment.teacher_id
-    })
+    return jsonify(assignment_dict(assignment))
 
 @api.route('/submissions', methods=['GET'])
 def get_submissions():
     """Get all submissions (teachers only)"""
-    if 'teacher_id' not in session:
+    if current_teacher_id() is None:
         return jsonify({'error': 'Teacher access required'}), 403
     
-    submissions = Submission.query.all()
-    return jsonify([submission.to_dict() for submission in submissions])
+    return jsonify(submission_rows())
 
 @api.route('/submissions/<int:submission_id>', methods=['GET'])
 def get_submission(submission_id):
@@ -108,7 +135,8 @@ def get_submission(submission_id):
     submission = Submission.query.get_or_404(submission_id)
     
     # Check permissions
-    if 'student_id' in session and submission.student_id != session['student_id']:
+    student_id = current_student_id()
+    if student_id is not None and submission.student_id != student_id:
         return jsonify({'error': 'Access denied'}), 403
     
     return jsonify(submission.to_dict())
@@ -116,7 +144,8 @@ def get_submission(submission_id):
 @api.route('/submissions', methods=['POST'])
 def create_submission():
     """Create new submission"""
-    if 'student_id' not in session:
+    student_id = current_student_id()
+    if student_id is None:
         return jsonify({'error': 'Student access required'}), 403
     
     data = request.get_json()
@@ -127,18 +156,23 @@ def create_submission():
         return jsonify({'error': 'Assignment ID required'}), 400
     
     assignment = Assignment.query.get_or_404(assignment_id)
-    student = Student.query.get(session['student_id'])
+    claims = g.get('api_claims')
+    if claims is not None:
+        profile = {'name': claims['name'], 'reg_no': claims['reg_no'], 'email': claims['email']}
+    else:
+        student = Student.query.get(student_id)
+        profile = {'name': student.name, 'reg_no': student.reg_no, 'email': student.email}
     
     is_late = datetime.utcnow() > assignment.due_date
     
     submission = Submission(
-        student_name=student.name,
-        reg_no=student.reg_no,
-        student_email=student.email,
+        student_name=profile['name'],
+        reg_no=profile['reg_no'],
+        student_email=profile['email'],
         text_content=text_content,
         assignment_id=assignment_id,
         is_late=is_late,
-        student_id=student.id
+        student_id=student_id
     )
     
     db.session.add(submission)
@@ -153,14 +187,17 @@ def create_submission():
 @api.route('/submissions/<int:submission_id>/grade', methods=['PUT'])
 def grade_submission(submission_id):
     """Grade a submission (teachers only)"""
-    if 'teacher_id' not in session:
+    teacher_id = current_teacher_id()
+    if teacher_id is None:
         return jsonify({'error': 'Teacher access required'}), 403
     
     data = request.get_json()
     grade = data.get('grade')
     feedback = data.get('feedback', '')
     
-    submission = Submission.query.get_or_404(submission_id)
+    # Only submissions to the teacher's own assignments, like /batch and /bulk-grade
+    submission = Submission.query.join(Assignment, Submission.assignment_id == Assignment.id) \
+        .filter(Submission.id == submission_id, Assignment.teacher_id == teacher_id).first_or_404()
     submission.grade = grade
     submission.feedback = feedback
     
@@ -171,6 +208,37 @@ def grade_submission(submission_id):
         'message': 'Submission graded successfully'
     })
 
+@api.route('/batch', methods=['POST'])
+def batch_operations():
+    """Apply many grade, feedback and flag operations in one transaction (teachers only)"""
+    teacher_id = current_teacher_id()
+    if teacher_id is None:
+        return jsonify({'error': 'Teacher access required'}), 403
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON object with operations required'}), 400
+    operations = data.get('operations')
+    limit = current_app.config['BATCH_MAX_OPERATIONS']
+    if isinstance(operations, list) and len(operations) > limit:
+        return jsonify({'error': f'At most {limit} operations per batch'}), 413
+    atomic = bool(data.get('atomic', False))
+    try:
+        results, applied, queued = apply_batch(operations, teacher_id, atomic=atomic,
+                                               notify=bool(data.get('notify', True)),
+                                               chunk_size=current_app.config['BULK_CHUNK_SIZE'])
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+
+    failed = sum(1 for result in results if result['status'] == 'error')
+    body = {'results': results, 'applied': applied, 'failed': failed, 'notifications': queued}
+    if atomic and failed:
+        db.session.rollback()
+        return jsonify(body), 422
+    # One commit for every write and every queued email
+    db.session.commit()
+    return jsonify(body)
+
 @api.route('/students/<int:student_id>/submissions', methods=['GET'])
 def get_student_submissions(student_id):
     """Get submissions for a specific student"""
@@ -179,16 +247,88 @@ def get_student_submissions(student_id):
         return auth_error
     
     # Check permissions
-    if 'student_id' in session and student_id != session['student_id']:
+    caller_student_id = current_student_id()
+    if caller_student_id is not None and student_id != caller_student_id:
         return jsonify({'error': 'Access denied'}), 403
     
-    submissions = Submission.query.filter_by(student_id=student_id).all()
-    return jsonify([submission.to_dict() for submission in submissions])
+    return jsonify(submission_rows(Submission.student_id == student_id))
+
+@api.route('/changes', methods=['GET'])
+def get_changes():
+    """Submissions and assignments changed since a sequence number, for incremental sync"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    if not current_app.extensions.get('changes'):
+        return jsonify({'error': 'Change feed not available on this database'}), 501
+
+    page_size = current_app.config['CHANGES_PAGE_SIZE']
+    try:
+        since = int(request.args.get('since', 0))
+        limit = min(int(request.args.get('limit', page_size)), page_size)
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    if since < 0 or limit < 1:
+        return jsonify({'error': 'since must be >= 0 and limit >= 1'}), 400
+
+    # Students see their own submissions; teachers their own assignments and their submissions
+    return jsonify(changes_since(since, limit, student_id=current_student_id(), teacher_id=current_teacher_id()))
+
+def _search_params():
+    """(q, limit, offset) from the query string, or an error response"""
+    page_size = current_app.config['SEARCH_PAGE_SIZE']
+    q = request.args.get('q', '').strip()
+    if not q:
+        return None, (jsonify({'error': 'q is required'}), 400)
+    try:
+        limit = min(int(request.args.get('limit', page_size)), page_size)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return None, (jsonify({'error': 'limit and offset must be integers'}), 400)
+    if limit < 1 or offset < 0:
+        return None, (jsonify({'error': 'limit must be >= 1 and offset >= 0'}), 400)
+    return (q, limit, offset), None
+
+@api.route('/search/submissions', methods=['GET'])
+def search_submissions_endpoint():
+    """Submissions whose text, feedback or uploaded document match q, best first"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    if not current_app.extensions.get('search'):
+        return jsonify({'error': 'Search not available on this database'}), 501
+    params, error = _search_params()
+    if error:
+        return error
+    columns = [c for c in request.args.get('in', '').split(',') if c]
+    if any(c not in SUBMISSION_COLUMNS for c in columns):
+        return jsonify({'error': f"in must be a comma-separated subset of {', '.join(SUBMISSION_COLUMNS)}"}), 400
+
+    q, limit, offset = params
+    # Teachers search their own assignments' submissions, students their own submissions
+    results = search_submissions(q, limit, offset, teacher_id=current_teacher_id(),
+                                 student_id=current_student_id(), columns=columns)
+    return jsonify({'q': q, 'offset': offset, 'results': results})
+
+@api.route('/search/assignments', methods=['GET'])
+def search_assignments_endpoint():
+    """Assignments whose title or description match q, best first"""
+    auth_error = require_auth()
+    if auth_error:
+        return auth_error
+    if not current_app.extensions.get('search'):
+        return jsonify({'error': 'Search not available on this database'}), 501
+    params, error = _search_params()
+    if error:
+        return error
+
+    q, limit, offset = params
+    return jsonify({'q': q, 'offset': offset, 'results': search_assignments(q, limit, offset, teacher_id=current_teacher_id())})
 
 @api.route('/analytics/overview', methods=['GET'])
 def get_analytics_overview():
     """Get analytics overview (teachers only)"""
-    if 'teacher_id' not in session:
+    if current_teacher_id() is None:
         return jsonify({'error': 'Teacher access required'}), 403
     
     total_assignments = Assignment.query.count()
@@ -216,7 +356,8 @@ def download_submission_file(submission_id):
     submission = Submission.query.get_or_404(submission_id)
     
     # Check permissions
-    if 'student_id' in session and submission.student_id != session['student_id']:
+    student_id = current_student_id()
+    if student_id is not None and submission.student_id != student_id:
         return jsonify({'error': 'Access denied'}), 403
     
     if not submission.file_path or not os.path.exists(submission.file_path):
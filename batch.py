@@ -0,0 +1,150 @@
+"""Many grade, feedback and flag operations in one request and one transaction.
+
+POST /api/batch takes {"operations": [...], "atomic": false, "notify": true}.
+Each operation is one of:
+
+    {"op": "grade", "submission_id": 1, "grade": "A", "feedback": "..."}
+    {"op": "feedback", "submission_id": 2, "feedback": "..."}
+    {"op": "flag", "submission_id": 3, "needs_review": true, "is_late": false}
+
+A teacher can only touch submissions to their own assignments. An optional
+"ref" is echoed in that operation's result. Invalid operations
+get an error result and the rest are applied, unless "atomic" is set, in
+which case nothing is applied. Operations on the same submission apply in
+order. Every submission is then written once: bulk UPDATEs by primary key,
+new feedback bodies in one INSERT, and a single commit. Each graded or
+re-commented submission gets one feedback email, and all of them are
+queued in one outbox insert.
+"""
+from sqlalchemy import insert, select, update
+
+from models import Assignment, Submission, SubmissionBody, db
+from notifications import queue_graded_notifications
+
+GRADE_MAX_LENGTH = Submission.grade.type.length
+FLAGS = ("needs_review", "is_late")
+
+
+class BatchError(Exception):
+    """Raised for a request body that is not a batch at all"""
+
+
+def _validate(op):
+    """The column values an operation writes, or raise ValueError with the reason"""
+    if not isinstance(op, dict):
+        raise ValueError("operation must be an object")
+    kind = op.get("op")
+    values = {}
+    if kind == "grade":
+        grade = op.get("grade")
+        if not isinstance(grade, str) or not grade or len(grade) > GRADE_MAX_LENGTH:
+            raise ValueError(f"grade must be a string of 1-{GRADE_MAX_LENGTH} characters")
+        values["grade"] = grade
+        if "feedback" in op:
+            values["feedback"] = op["feedback"]
+    elif kind == "feedback":
+        if "feedback" not in op:
+            raise ValueError("feedback is required")
+        values["feedback"] = op["feedback"]
+    elif kind == "flag":
+        for flag in FLAGS:
+            if flag in op:
+                if not isinstance(op[flag], bool):
+                    raise ValueError(f"{flag} must be true or false")
+                values[flag] = op[flag]
+        if not values:
+            raise ValueError(f"flag needs at least one of {', '.join(FLAGS)}")
+    else:
+        raise ValueError("op must be grade, feedback or flag")
+    if "feedback" in values and values["feedback"] is not None and not isinstance(values["feedback"], str):
+        raise ValueError("feedback must be a string or null")
+    return values
+
+
+def _load(ids, teacher_id, chunk_size):
+    """{id: row} for the teacher's submissions among `ids`, with what the feedback emails need"""
+    found = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        for row in db.session.execute(
+            select(Submission.id, Submission.grade, Submission.student_email, Submission.student_name,
+                   Submission.legacy_feedback, Assignment.title,
+                   SubmissionBody.submission_id.label("body_id"), SubmissionBody.feedback)
+            .join(Assignment, Submission.assignment_id == Assignment.id)
+            .outerjoin(SubmissionBody, SubmissionBody.submission_id == Submission.id)
+            .where(Submission.id.in_(chunk), Assignment.teacher_id == teacher_id)
+        ):
+            found[row.id] = row
+    return found
+
+
+def apply_batch(operations, teacher_id, atomic=False, notify=True, chunk_size=500):
+    """Validate and apply `operations`; returns (results, submissions written, emails queued).
+
+    Only submissions to `teacher_id`'s assignments are written; others are
+    "not found". The caller commits. With `atomic`, nothing is written if any operation
+    is invalid.
+    """
+    if not isinstance(operations, list) or not operations:
+        raise BatchError("operations must be a non-empty list")
+
+    results = []
+    valid = []
+    for index, op in enumerate(operations):
+        result = {"index": index, "status": "ok"}
+        if isinstance(op, dict):
+            result.update(op=op.get("op"), submission_id=op.get("submission_id"))
+            if "ref" in op:
+                result["ref"] = op["ref"]
+        results.append(result)
+        try:
+            values = _validate(op)
+            if not isinstance(op["submission_id"], int) or isinstance(op["submission_id"], bool):
+                raise ValueError("submission_id must be an integer")
+        except (KeyError, ValueError) as e:
+            result.update(status="error", error=str(e) if isinstance(e, ValueError) else "submission_id is required")
+            continue
+        valid.append((result, op["submission_id"], values))
+
+    found = _load(sorted({submission_id for _, submission_id, _ in valid}), teacher_id, chunk_size)
+    changes = {}
+    for result, submission_id, values in valid:
+        if submission_id not in found:
+            result.update(status="error", error="submission not found")
+            continue
+        changes.setdefault(submission_id, {}).update(values)
+
+    if atomic and any(result["status"] == "error" for result in results):
+        for result in results:
+            if result["status"] == "ok":
+                result.update(status="skipped", error="batch not applied")
+        return results, 0, 0
+
+    submission_updates = []
+    body_updates = []
+    body_inserts = []
+    graded = []
+    for submission_id, values in changes.items():
+        row = found[submission_id]
+        columns = {name: values[name] for name in ("grade", *FLAGS) if name in values}
+        if "feedback" in values:
+            # The body holds feedback from now on; the old in-row copy must not shadow it
+            columns["legacy_feedback"] = None
+            body = {"submission_id": submission_id, "feedback": values["feedback"]}
+            (body_updates if row.body_id is not None else body_inserts).append(body)
+        if columns:
+            submission_updates.append(dict(columns, id=submission_id))
+        if notify and ("grade" in values or "feedback" in values):
+            graded.append((row.student_email, row.student_name, row.title,
+                           values.get("grade", row.grade),
+                           values["feedback"] if "feedback" in values else row.feedback or row.legacy_feedback))
+
+    # Bulk UPDATE by primary key: one executemany per set of columns
+    if submission_updates:
+        db.session.execute(update(Submission), submission_updates)
+    if body_updates:
+        db.session.execute(update(SubmissionBody), body_updates)
+    if body_inserts:
+        db.session.execute(insert(SubmissionBody), body_inserts)
+    queued = queue_graded_notifications(graded) if graded else 0
+    return results, len(changes), queued
@@ -0,0 +1,373 @@
+"""Offline micro-benchmarks for the detection stack.
+
+Builds a deterministic synthetic corpus and times extract_text,
+check_text_plagiarism, check_file_plagiarism and detect_ai_content through
+detectors.py:
+
+- documents of 1KB to 16MB in txt, docx, pdf, png and jpg
+- 100 to 100k prior submissions in ./uploads, where the checker looks for them
+
+Latency percentiles and peak traced memory per case are written as JSON.
+With --baseline the run is compared against a stored result and the script
+exits non-zero on regressions. Baselines are machine-specific: record one with
+--update-baseline on the CI runner. Until one exists the comparison is skipped
+with a warning. Run from the repository root, e.g. in CI:
+
+    python benchmarks/detector_bench.py --preset quick --baseline benchmarks/detector_baseline.json
+    python benchmarks/detector_bench.py --preset quick --update-baseline benchmarks/detector_baseline.json
+    python benchmarks/detector_bench.py --preset full --out detector_results.json
+
+Size is the amount of text for txt/docx/pdf and the file size for png/jpg.
+Generated files are cached in --cache-dir, so only the first run pays for the
+16MB documents and the 100k corpus. Formats whose generator library
+(python-docx, reportlab, Pillow) is missing are skipped with a warning, and so
+are detectors that cannot be imported.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import textwrap
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import detectors  # noqa: E402
+
+KB = 1024
+MB = 1024 * KB
+FORMATS = ("txt", "docx", "pdf", "png", "jpg")
+DETECTORS = ("extract_text", "check_text_plagiarism", "check_file_plagiarism", "detect_ai_content")
+
+PRESETS = {
+    # Small enough for every CI run
+    "quick": {"sizes": [1 * KB, 64 * KB], "corpus_sizes": [100, 1000], "repeat": 5},
+    "full": {
+        "sizes": [1 * KB, 16 * KB, 256 * KB, 1 * MB, 4 * MB, 16 * MB],
+        "corpus_sizes": [100, 1000, 10000, 100000],
+        "repeat": 3,
+    },
+}
+
+PRIOR_SUBMISSION_BYTES = 2 * KB
+SHARED_EVERY = 50  # every Nth prior submission copies a passage of the documents under test
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "pe", "da", "gu", "ho", "ze", "fi", "ba", "wo")
+
+
+def _parse_size(value):
+    value = value.strip().upper()
+    for suffix, factor in (("MB", MB), ("KB", KB), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def _size_label(size):
+    if size >= MB and size % MB == 0:
+        return f"{size // MB}MB"
+    if size >= KB and size % KB == 0:
+        return f"{size // KB}KB"
+    return f"{size}B"
+
+
+def _percentile(sorted_values, pct):
+    """Linear-interpolated percentile of an already sorted list"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+# -------------------
+# Synthetic corpus
+# -------------------
+class Corpus:
+    """Deterministic documents and prior-submission folders, cached on disk"""
+
+    def __init__(self, cache_dir, seed):
+        self.root = os.path.join(cache_dir, f"seed-{seed}")
+        self.seed = seed
+        rng = random.Random(seed)
+        self.vocabulary = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(5000)]
+        os.makedirs(os.path.join(self.root, "docs"), exist_ok=True)
+
+    def text(self, size, seed=None):
+        """Prose-like text of `size` bytes"""
+        rng = random.Random(self.seed if seed is None else seed)
+        parts = []
+        total = 0
+        while total < size:
+            sentence = " ".join(rng.choice(self.vocabulary) for _ in range(rng.randint(6, 18))).capitalize() + ". "
+            if rng.random() < 0.1:
+                sentence += "\n\n"
+            parts.append(sentence)
+            total += len(sentence)
+        return "".join(parts)[:size]
+
+    def document(self, fmt, size):
+        """Path of a `size` document in `fmt`; raises ImportError if it can't be generated here"""
+        path = os.path.join(self.root, "docs", f"doc_{_size_label(size)}.{fmt}")
+        if not os.path.exists(path):
+            partial = path + ".part"
+            if fmt in ("png", "jpg"):
+                _write_image(partial, fmt, size, self.seed)
+            else:
+                WRITERS[fmt](partial, self.text(size))
+            os.replace(partial, path)
+        return path
+
+    def prior_submissions(self, count):
+        """Directory whose uploads/ holds `count` earlier submissions"""
+        directory = os.path.join(self.root, f"corpus-{count}")
+        marker = os.path.join(directory, ".complete")
+        if os.path.exists(marker):
+            return directory
+        uploads = os.path.join(directory, "uploads")
+        os.makedirs(uploads, exist_ok=True)
+        shared = self.text(PRIOR_SUBMISSION_BYTES)
+        for i in range(count):
+            body = shared if i % SHARED_EVERY == 0 else self.text(PRIOR_SUBMISSION_BYTES, seed=self.seed + i + 1)
+            with open(os.path.join(uploads, f"{i % 20 + 1}_R{i:06d}_prior.txt"), "w", encoding="utf-8") as f:
+                f.write(body)
+        open(marker, "w").close()
+        return directory
+
+
+def _write_txt(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _write_docx(path, text):
+    import docx
+    document = docx.Document()
+    for paragraph in text.split("\n\n"):
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _write_pdf(path, text):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    c = canvas.Canvas(path, pagesize=letter)
+    width, height = letter
+    lines = textwrap.wrap(text, 110)
+    for start in range(0, len(lines), 70):
+        text_object = c.beginText(36, height - 36)
+        text_object.setFont("Helvetica", 7)
+        for line in lines[start:start + 70]:
+            text_object.textLine(line)
+        c.drawText(text_object)
+        c.showPage()
+    c.save()
+
+
+def _write_image(path, fmt, size, seed):
+    from PIL import Image
+    # Noise doesn't compress, so the file ends up close to width * height * 3 bytes
+    side = max(8, int((size / 3) ** 0.5))
+    image = Image.frombytes("RGB", (side, side), random.Random(seed).randbytes(side * side * 3))
+    image.save(path, format="PNG" if fmt == "png" else "JPEG", quality=95)
+
+
+WRITERS = {"txt": _write_txt, "docx": _write_docx, "pdf": _write_pdf}
+
+
+# -------------------
+# Measurement
+# -------------------
+def measure(func, args, repeat):
+    """Time `repeat` calls after a warm-up call, then one traced call for peak memory"""
+    _discard(func(*args))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+        _discard(result)
+    # Tracing slows the call down, so memory is measured on a separate run
+    tracemalloc.start()
+    try:
+        _discard(func(*args))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        "runs": repeat,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p90_ms": round(_percentile(timings, 90), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "max_ms": round(timings[-1], 3),
+        "peak_kb": peak // KB,
+    }
+
+
+def _discard(result):
+    """Remove highlight reports the plagiarism checker writes, so the corpus stays unchanged"""
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], str) and os.path.isfile(result[1]):
+        os.remove(result[1])
+
+
+def cases(detector_names, formats, sizes, corpus_sizes):
+    """Yield (key, detector, fmt, size, corpus_size) for the benchmark matrix"""
+    for size in sizes:
+        label = _size_label(size)
+        if "extract_text" in detector_names:
+            for fmt in formats:
+                yield f"extract_text/{fmt}/{label}", "extract_text", fmt, size, None
+        if "detect_ai_content" in detector_names:
+            yield f"detect_ai_content/text/{label}", "detect_ai_content", "text", size, None
+        for count in corpus_sizes:
+            if "check_text_plagiarism" in detector_names:
+                yield f"check_text_plagiarism/text/{label}/corpus={count}", "check_text_plagiarism", "text", size, count
+            if "check_file_plagiarism" in detector_names:
+                for fmt in formats:
+                    yield f"check_file_plagiarism/{fmt}/{label}/corpus={count}", "check_file_plagiarism", fmt, size, count
+
+
+def run(corpus, detector_names, formats, sizes, corpus_sizes, repeat):
+    results = {}
+    skipped_formats = set()
+    start_dir = os.getcwd()
+    try:
+        for key, name, fmt, size, count in cases(detector_names, formats, sizes, corpus_sizes):
+            if fmt == "text":
+                arg = corpus.text(size)
+            else:
+                if fmt in skipped_formats:
+                    continue
+                try:
+                    arg = corpus.document(fmt, size)
+                except ImportError as e:
+                    print(f"⚠️ Skipping {fmt}: {e}")
+                    skipped_formats.add(fmt)
+                    continue
+            if count is not None:
+                os.chdir(corpus.prior_submissions(count))
+            try:
+                results[key] = measure(detectors.get(name), (arg,), repeat)
+            except Exception as e:
+                print(f"❌ {key}: {e}")
+                continue
+            finally:
+                os.chdir(start_dir)
+            r = results[key]
+            print(f"{key:<60} p50 {r['p50_ms']:>10.2f} ms  p99 {r['p99_ms']:>10.2f} ms  peak {r['peak_kb']:>8} KB")
+    finally:
+        os.chdir(start_dir)
+    return results
+
+
+# -------------------
+# Baseline comparison
+# -------------------
+def load_baseline(path):
+    """The stored report at `path`, or None if no baseline has been recorded yet"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, metrics, tolerance, memory_tolerance, min_delta_ms, min_delta_kb):
+    """Return regression messages for cases that got slower or bigger than the baseline allows"""
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        for metric in metrics:
+            if metric == "peak_kb":
+                allowed, floor = memory_tolerance, min_delta_kb
+            else:
+                allowed, floor = tolerance, min_delta_ms
+            limit = max(previous[metric] * (1 + allowed), previous[metric] + floor)
+            if current[metric] > limit:
+                regressions.append(f"{key}: {metric} {current[metric]} > {previous[metric]} (limit {round(limit, 3)})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--detectors", help=f"comma-separated subset of {','.join(DETECTORS)}")
+    parser.add_argument("--formats", help=f"comma-separated subset of {','.join(FORMATS)}")
+    parser.add_argument("--sizes", help="document sizes, e.g. 1KB,1MB,16MB (overrides the preset)")
+    parser.add_argument("--corpus-sizes", help="prior submissions, e.g. 100,100000 (overrides the preset)")
+    parser.add_argument("--repeat", type=int, help="timed runs per case (overrides the preset)")
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(), "educheck-bench"))
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against this JSON baseline and fail on regressions")
+    parser.add_argument("--update-baseline", metavar="PATH", help="write this run as the new baseline")
+    # Tail percentiles of a handful of runs are mostly noise, so they are recorded but not gated by default
+    parser.add_argument("--metrics", default="p50_ms,peak_kb", help="metrics compared against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed latency growth (default 25%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed peak memory growth")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="ignore latency changes below this")
+    parser.add_argument("--min-delta-kb", type=int, default=256, help="ignore memory changes below this")
+    args = parser.parse_args(argv)
+
+    preset = PRESETS[args.preset]
+    detector_names = args.detectors.split(",") if args.detectors else list(DETECTORS)
+    formats = args.formats.split(",") if args.formats else list(FORMATS)
+    sizes = [_parse_size(s) for s in args.sizes.split(",")] if args.sizes else preset["sizes"]
+    corpus_sizes = [int(n) for n in args.corpus_sizes.split(",")] if args.corpus_sizes else preset["corpus_sizes"]
+    repeat = args.repeat or preset["repeat"]
+
+    for name in list(detector_names):
+        if not detectors.available(name):
+            print(f"⚠️ {name} is not importable here, skipping")
+            detector_names.remove(name)
+    if not detector_names:
+        raise SystemExit("❌ No detectors available to benchmark")
+
+    corpus = Corpus(args.cache_dir, args.seed)
+    results = run(corpus, detector_names, formats, sizes, corpus_sizes, repeat)
+    report = {
+        "meta": {
+            "created": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "preset": args.preset,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    for path in (args.out, args.update_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"✅ Wrote {len(results)} results to {path}")
+
+    if args.baseline:
+        baseline = load_baseline(args.baseline)
+        if baseline is None:
+            print(f"⚠️ Baseline {args.baseline} not found, skipping the comparison; record one with --update-baseline")
+            return 0
+        regressions = compare(results, baseline, args.metrics.split(","), args.tolerance, args.memory_tolerance,
+                              args.min_delta_ms, args.min_delta_kb)
+        missing = sorted(set(baseline.get("results", {})) - set(results))
+        if missing:
+            print(f"⚠️ {len(missing)} baseline cases did not run: {', '.join(missing[:5])}")
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.baseline}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Startup import budget for the web app.
+
+Imports the app in a fresh interpreter under `python -X importtime` and fails
+if startup takes longer than the budget or if a heavy detection stack is
+imported eagerly. Those stacks must stay behind detectors.py. The budget lives
+in IMPORT_BUDGET_MS below. tests/test_import_budget.py fails the test suite on a
+heavy import and warns when the budget is exceeded, since wall time varies
+between machines. The script fails on both and prints the breakdown:
+
+    python benchmarks/import_budget.py --module app
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative time allowed for `import app` in a fresh interpreter
+IMPORT_BUDGET_MS = 1500
+# Packages that only detection workers should ever import
+HEAVY_MODULES = ("cv2", "skimage", "imagehash", "fitz", "reportlab", "numpy", "docx", "PIL")
+
+# Run after the import; a failed optional import is logged by -X importtime but never lands here
+_REPORT_HEAVY = "import sys; print(','.join(sorted({{n.split('.')[0] for n in sys.modules}} & {heavy!r})))"
+
+
+def measure(module):
+    """Return ({module: cumulative_us}, [heavy packages loaded]) for importing `module` in a clean interpreter"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    code = f"import {module}; " + _REPORT_HEAVY.format(heavy=set(HEAVY_MODULES))
+    # Importing app creates and sets up its database; keep that out of the checkout
+    with tempfile.TemporaryDirectory() as scratch:
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'app.db')}"
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, env=env, cwd=scratch
+        )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+    # The last line is ours; the app may print its own startup messages before it
+    last_line = (proc.stdout.splitlines() or [""])[-1]
+    heavy = [name for name in last_line.split(",") if name]
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue  # header row
+        timings[parts[2].strip()] = cumulative
+    return timings, heavy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help=f"maximum cumulative import time (default: {IMPORT_BUDGET_MS})")
+    parser.add_argument("--top", type=int, default=10, help="show the N slowest imports")
+    args = parser.parse_args(argv)
+
+    timings, heavy = measure(args.module)
+    total_ms = timings.get(args.module, 0) / 1000
+
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    top_level = {name: us for name, us in timings.items() if "." not in name}
+    for name, us in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if total_ms > args.budget_ms:
+        print(f"❌ Startup import budget exceeded by {total_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if not failed:
+        print("✅ Import budget OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
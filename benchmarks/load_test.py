@@ -0,0 +1,511 @@
+"""Deadline-surge load test for the web tier.
+
+Virtual users upload submissions, poll their dashboards and grade through the
+page routes and the REST API, in a configurable mix, against either
+
+- a running server:  gunicorn -c gunicorn.conf.py app:app
+                     python benchmarks/load_test.py --url http://127.0.0.1:8000 --users 50 --duration 120
+- the Flask test client in this process (threads share one app, so SQLite
+  locking is real):  DATABASE_URL=sqlite:////tmp/load.db python benchmarks/load_test.py --users 20
+
+Setup signs up a teacher, students and assignments through the normal forms,
+tagged with a run id so repeated runs don't collide. The report has
+throughput, p50/p99 latency and errors per action, with lock timeouts
+counted separately, plus a per-interval timeline that includes the detection
+queue depth (submissions still queued or processing in the database).
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from http.cookiejar import CookieJar
+from urllib import error as urlerror
+from urllib import request as urlrequest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+KB = 1024
+DEFAULT_MIX = "submit=30,api_submit=10,poll=35,dashboard=10,grade=10,analytics=5"
+DEFAULT_UPLOAD_SIZES = "4KB=40,64KB=40,512KB=15,2MB=5"
+LOCK_MARKERS = (b"database is locked", b"database table is locked", b"QueuePool limit",
+                b"lock timeout", b"could not obtain lock", b"statement timeout")
+
+
+def _parse_size(value):
+    value = value.strip().upper()
+    for suffix, factor in (("MB", 1024 * KB), ("KB", KB), ("B", 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def _parse_weights(spec, parse_key=str):
+    pairs = [item.split("=") for item in spec.split(",") if item.strip()]
+    return [parse_key(key.strip()) for key, _ in pairs], [float(weight) for _, weight in pairs]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+# -------------------
+# Transports
+# -------------------
+class HttpSession:
+    """Cookie-keeping HTTP client on urllib, one per virtual user identity"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urlrequest.build_opener(urlrequest.HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, form=None, files=None, json_body=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if files:
+            data, content_type = _multipart(form or {}, files)
+            headers["Content-Type"] = content_type
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = "&".join(f"{_quote(k)}={_quote(v)}" for k, v in form.items()).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        req = urlrequest.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urlerror.HTTPError as e:
+            return e.code, e.read()
+
+
+class HttpTransport:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url
+        self.timeout = timeout
+
+    def session(self):
+        return HttpSession(self.base_url, self.timeout)
+
+    def queue_depth(self):
+        return None
+
+
+class ClientSession:
+    """Flask test client with the same request() interface as HttpSession"""
+
+    def __init__(self, app, errors):
+        self.client = app.test_client()
+        self.errors = errors
+
+    def request(self, method, path, form=None, files=None, json_body=None, headers=None):
+        self.errors.last = None
+        kwargs = {"method": method, "headers": headers or {}}
+        if files:
+            data = dict(form or {})
+            for field, (filename, content) in files.items():
+                data[field] = (io.BytesIO(content), filename)
+            kwargs.update(data=data, content_type="multipart/form-data")
+        elif json_body is not None:
+            kwargs["json"] = json_body
+        elif form is not None:
+            kwargs["data"] = form
+        response = self.client.open(path, **kwargs)
+        body = response.get_data()
+        # The 500 handler hides the exception, so surface it for error classification
+        if self.errors.last is not None:
+            body += b"\n" + str(self.errors.last).encode(errors="replace")
+        return response.status_code, body
+
+
+class ClientTransport:
+    def __init__(self, module):
+        from flask import got_request_exception
+        app_module = __import__(module)
+        self.app = app_module.app
+        self.db = app_module.db
+        self.errors = threading.local()
+        got_request_exception.connect(self._record_exception, self.app)
+        with self.app.app_context():
+            self.db.create_all()
+
+    def _record_exception(self, sender, exception, **extra):
+        self.errors.last = exception
+
+    def session(self):
+        return ClientSession(self.app, self.errors)
+
+    def queue_depth(self):
+        detection_queue = self.app.extensions.get("detection_queue")
+        return detection_queue.depth() if detection_queue else None
+
+
+def _quote(value):
+    from urllib.parse import quote_plus
+    return quote_plus(str(value))
+
+
+def _multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# -------------------
+# Recording
+# -------------------
+class Recorder:
+    """Thread-safe request samples and queue-depth samples, relative to the run start"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = []
+        self.depths = []
+        self._lock = threading.Lock()
+
+    def now(self):
+        return time.perf_counter() - self.started
+
+    def record(self, action, status, latency_ms, body=b""):
+        if status is None:
+            outcome = "transport_error"
+        elif status >= 500 and any(marker in body for marker in LOCK_MARKERS):
+            outcome = "lock_timeout"
+        elif status >= 500:
+            outcome = "server_error"
+        elif status >= 400:
+            outcome = "client_error"
+        else:
+            outcome = "ok"
+        with self._lock:
+            self.samples.append((self.now(), action, status, latency_ms, outcome))
+
+    def record_depth(self, depth):
+        with self._lock:
+            self.depths.append((self.now(), depth))
+
+
+def sample_queue_depth(recorder, transport, database_url, interval, stop):
+    """Sample queued/processing submissions (and the in-process queue) until `stop` is set"""
+    engine = None
+    if database_url:
+        from sqlalchemy import create_engine
+        engine = create_engine(database_url)
+    elif isinstance(transport, ClientTransport):
+        with transport.app.app_context():
+            engine = transport.db.engine
+    while not stop.wait(interval):
+        depth = {"in_process": transport.queue_depth()}
+        if engine is not None:
+            try:
+                with engine.connect() as conn:
+                    rows = conn.exec_driver_sql(
+                        "SELECT status, COUNT(*) FROM submission WHERE status IN ('queued', 'processing') GROUP BY status"
+                    ).all()
+                depth.update({status: count for status, count in rows})
+            except Exception as e:
+                depth["error"] = str(e)[:200]
+        recorder.record_depth(depth)
+
+
+# -------------------
+# Scenario
+# -------------------
+class Fixture:
+    """Accounts and assignments created for one run"""
+
+    def __init__(self, run_id):
+        self.run_id = run_id
+        self.teacher_email = f"load-{run_id}-teacher@example.com"
+        self.password = "load-test-password"
+        self.assignment_ids = []
+        self.students = []  # dicts: email, name, reg_no, id, token
+        self.teacher_token = None
+        self.submission_ids = []
+        self.lock = threading.Lock()
+
+
+def setup(transport, fixture, students, assignments, due_in_minutes):
+    teacher = transport.session()
+    teacher.request("POST", "/signup", form={"name": "Load Teacher", "email": fixture.teacher_email, "password": fixture.password})
+    teacher.request("POST", "/login", form={"email": fixture.teacher_email, "password": fixture.password})
+    due = (datetime.utcnow() + timedelta(minutes=due_in_minutes)).strftime("%Y-%m-%dT%H:%M")
+    for i in range(assignments):
+        teacher.request("POST", "/create", form={
+            "title": f"Load test {fixture.run_id} #{i + 1}",
+            "description": "Deadline surge load test",
+            "due_date": due
+        })
+
+    status, body = teacher.request("POST", "/api/auth/login", json_body={
+        "email": fixture.teacher_email, "password": fixture.password, "user_type": "teacher"
+    })
+    if status != 200:
+        raise SystemExit(f"❌ Teacher login failed ({status}): {body[:200]!r}")
+    fixture.teacher_token = json.loads(body)["access_token"]
+    status, body = teacher.request("GET", "/api/assignments", headers=_bearer(fixture.teacher_token))
+    fixture.assignment_ids = [a["id"] for a in json.loads(body) if fixture.run_id in a["title"]]
+    if not fixture.assignment_ids:
+        raise SystemExit("❌ Could not create assignments")
+
+    def create_student(i):
+        session = transport.session()
+        student = {"name": f"Load Student {i}", "reg_no": f"L{fixture.run_id}{i:05d}",
+                   "email": f"load-{fixture.run_id}-s{i}@example.com"}
+        session.request("POST", "/student/signup", form={**student, "password": fixture.password})
+        status, body = session.request("POST", "/api/auth/login", json_body={
+            "email": student["email"], "password": fixture.password, "user_type": "student"
+        })
+        if status == 200:
+            payload = json.loads(body)
+            student.update(id=payload["user_id"], token=payload["access_token"])
+            with fixture.lock:
+                fixture.students.append(student)
+
+    threads = [threading.Thread(target=create_student, args=(i,)) for i in range(students)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if not fixture.students:
+        raise SystemExit("❌ Could not create students")
+
+
+def _bearer(token):
+    return {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+
+
+def _upload(rng, size, student):
+    line = f"{student['name']} {student['reg_no']} {rng.random():.12f} " + " ".join(
+        rng.choice(("essay", "analysis", "result", "method", "figure", "data", "source", "claim")) for _ in range(12)
+    ) + "\n"
+    return (line * (size // len(line) + 1)).encode()[:size]
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, transport, fixture, args, stop):
+        super().__init__(name=f"vu-{index}", daemon=True)
+        self.rng = random.Random(index)
+        self.fixture = fixture
+        self.recorder = None
+        self.args = args
+        self.stop = stop
+        self.student = fixture.students[index % len(fixture.students)]
+        self.student_session = transport.session()
+        self.teacher_session = transport.session()
+        self.actions, self.weights = _parse_weights(args.mix)
+        self.sizes, self.size_weights = _parse_weights(args.upload_sizes, _parse_size)
+
+    def login(self):
+        """Log both sessions in; done before the clock starts, password hashing is not the load under test"""
+        self.student_session.request("POST", "/student/login", form={"email": self.student["email"], "password": self.fixture.password})
+        self.teacher_session.request("POST", "/login", form={"email": self.fixture.teacher_email, "password": self.fixture.password})
+
+    def timed(self, action, session, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            status, body = session.request(method, path, **kwargs)
+        except Exception as e:
+            self.recorder.record(action, None, (time.perf_counter() - start) * 1000, str(e).encode())
+            return None, b""
+        self.recorder.record(action, status, (time.perf_counter() - start) * 1000, body)
+        return status, body
+
+    def run(self):
+        while not self.stop.is_set():
+            action = self.rng.choices(self.actions, self.weights)[0]
+            getattr(self, f"do_{action}")()
+            if self.args.think_ms:
+                self.stop.wait(self.rng.expovariate(1000 / self.args.think_ms))
+
+    def do_submit(self):
+        assignment_id = self.rng.choice(self.fixture.assignment_ids)
+        size = self.rng.choices(self.sizes, self.size_weights)[0]
+        status, body = self.timed("submit", self.student_session, "POST", f"/submit/{assignment_id}", form={
+            "student_name": self.student["name"], "reg_no": self.student["reg_no"], "email": self.student["email"]
+        }, files={"file": (f"essay_{size}.txt", _upload(self.rng, size, self.student))},
+            headers={"Accept": "application/json"})
+        if status == 202:
+            self._remember(json.loads(body).get("submission_id"))
+
+    def do_api_submit(self):
+        status, body = self.timed("api_submit", self.student_session, "POST", "/api/submissions", json_body={
+            "assignment_id": self.rng.choice(self.fixture.assignment_ids),
+            "text_content": _upload(self.rng, 2 * KB, self.student).decode()
+        }, headers=_bearer(self.student["token"]))
+        if status == 201:
+            self._remember(json.loads(body).get("submission_id"))
+
+    def do_poll(self):
+        self.timed("poll_dashboard", self.student_session, "GET", "/student/dashboard")
+        self.timed("poll_api", self.student_session, "GET", f"/api/students/{self.student['id']}/submissions",
+                   headers=_bearer(self.student["token"]))
+
+    def do_dashboard(self):
+        self.timed("dashboard", self.teacher_session, "GET", "/dashboard")
+
+    def do_grade(self):
+        with self.fixture.lock:
+            submission_id = self.rng.choice(self.fixture.submission_ids) if self.fixture.submission_ids else None
+        if submission_id is None:
+            return self.do_dashboard()
+        self.timed("grade", self.teacher_session, "PUT", f"/api/submissions/{submission_id}/grade",
+                   json_body={"grade": self.rng.choice("ABCDF"), "feedback": "Load test feedback"},
+                   headers=_bearer(self.fixture.teacher_token))
+
+    def do_analytics(self):
+        self.timed("analytics", self.teacher_session, "GET", "/api/analytics/overview",
+                   headers=_bearer(self.fixture.teacher_token))
+
+    def _remember(self, submission_id):
+        if submission_id:
+            with self.fixture.lock:
+                self.fixture.submission_ids.append(submission_id)
+
+
+# -------------------
+# Report
+# -------------------
+def summarize(recorder, duration, interval):
+    by_action = defaultdict(list)
+    for sample in recorder.samples:
+        by_action[sample[1]].append(sample)
+
+    def stats(samples):
+        latencies = sorted(s[3] for s in samples)
+        outcomes = defaultdict(int)
+        for s in samples:
+            outcomes[s[4]] += 1
+        return {
+            "count": len(samples),
+            "throughput_rps": round(len(samples) / duration, 2) if duration else 0,
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0,
+            "outcomes": dict(outcomes),
+        }
+
+    timeline = []
+    buckets = defaultdict(list)
+    for sample in recorder.samples:
+        buckets[int(sample[0] // interval)].append(sample)
+    depths = {int(t // interval): depth for t, depth in recorder.depths}
+    for bucket in range(int(duration // interval) + 1):
+        samples = buckets.get(bucket, [])
+        latencies = sorted(s[3] for s in samples)
+        timeline.append({
+            "t": round(bucket * interval, 1),
+            "rps": round(len(samples) / interval, 2),
+            "p50_ms": round(_percentile(latencies, 50), 2),
+            "p99_ms": round(_percentile(latencies, 99), 2),
+            "errors": sum(1 for s in samples if s[4] != "ok"),
+            "lock_timeouts": sum(1 for s in samples if s[4] == "lock_timeout"),
+            "queue_depth": depths.get(bucket),
+        })
+
+    return {
+        "duration_s": round(duration, 2),
+        "total": stats(recorder.samples),
+        "actions": {action: stats(samples) for action, samples in sorted(by_action.items())},
+        "timeline": timeline,
+    }
+
+
+def print_report(report):
+    print(f"\n{'action':<16}{'count':>8}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'locks':>7}")
+    rows = list(report["actions"].items()) + [("TOTAL", report["total"])]
+    for action, s in rows:
+        errors = sum(n for outcome, n in s["outcomes"].items() if outcome != "ok")
+        print(f"{action:<16}{s['count']:>8}{s['throughput_rps']:>9}{s['p50_ms']:>10}{s['p99_ms']:>10}"
+              f"{errors:>8}{s['outcomes'].get('lock_timeout', 0):>7}")
+    print(f"\n{'t (s)':>7}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}{'locks':>7}  queue depth")
+    for point in report["timeline"]:
+        depth = point["queue_depth"] or {}
+        depth_text = ", ".join(f"{k}={v}" for k, v in depth.items() if v is not None) or "-"
+        print(f"{point['t']:>7}{point['rps']:>9}{point['p50_ms']:>10}{point['p99_ms']:>10}"
+              f"{point['errors']:>8}{point['lock_timeouts']:>7}  {depth_text}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server; without it the Flask test client is used")
+    parser.add_argument("--app-module", default="app", help="module exposing `app` and `db` for test-client runs")
+    parser.add_argument("--database-url", help="database to sample queue depth from (defaults to the app's in test-client runs)")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--students", type=int, help="distinct student accounts (default: one per user)")
+    parser.add_argument("--assignments", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load after ramp-up starts")
+    parser.add_argument("--ramp", type=float, default=5, help="seconds over which users start")
+    parser.add_argument("--think-ms", type=float, default=200, help="mean pause between a user's actions")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"action weights (default {DEFAULT_MIX})")
+    parser.add_argument("--upload-sizes", default=DEFAULT_UPLOAD_SIZES, help=f"upload size weights (default {DEFAULT_UPLOAD_SIZES})")
+    parser.add_argument("--due-in-minutes", type=float, default=5, help="assignment due date relative to start")
+    parser.add_argument("--interval", type=float, default=1, help="timeline and queue sampling interval (s)")
+    parser.add_argument("--timeout", type=float, default=60, help="HTTP request timeout (s)")
+    parser.add_argument("--out", help="write the report as JSON")
+    args = parser.parse_args(argv)
+
+    transport = HttpTransport(args.url, args.timeout) if args.url else ClientTransport(args.app_module)
+    fixture = Fixture(uuid.uuid4().hex[:8])
+    print(f"⏳ Setting up run {fixture.run_id} against {args.url or 'the test client'}...")
+    setup(transport, fixture, args.students or args.users, args.assignments, args.due_in_minutes)
+
+    stop = threading.Event()
+    users = [VirtualUser(i, transport, fixture, args, stop) for i in range(args.users)]
+    logins = [threading.Thread(target=user.login) for user in users]
+    for thread in logins:
+        thread.start()
+    for thread in logins:
+        thread.join()
+
+    recorder = Recorder()
+    sampler = threading.Thread(
+        target=sample_queue_depth, args=(recorder, transport, args.database_url, args.interval, stop), daemon=True
+    )
+    sampler.start()
+    print(f"🚀 {args.users} users for {args.duration:.0f}s (mix: {args.mix})")
+    for i, user in enumerate(users):
+        user.recorder = recorder
+        user.start()
+        if args.ramp and i < len(users) - 1:
+            time.sleep(args.ramp / len(users))
+    stop.wait(max(0, args.duration - recorder.now()))
+    stop.set()
+    for user in users:
+        user.join(timeout=args.timeout)
+    duration = recorder.now()
+
+    report = summarize(recorder, duration, args.interval)
+    report["config"] = {k: v for k, v in vars(args).items()}
+    report["run_id"] = fixture.run_id
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Wrote report to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
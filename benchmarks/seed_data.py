@@ -0,0 +1,427 @@
+"""Deterministic high-volume data seeder for scale and performance testing.
+
+Fills an empty database with teachers, students, assignments and submissions.
+Each submission has either pasted text or an uploaded .txt file in
+UPLOAD_FOLDER. It also gets a content hash, a late flag, plagiarism/AI
+results, and for many of them a grade and feedback. A small share reuses a
+common text, so duplicate lookups and plagiarism hits have real work to do.
+
+Pasted text and feedback go to the compressed submission_body table, as
+written by the app. Rows are generated in fixed blocks of BLOCK rows, each from its own
+random.Random seeded with (--seed, table, block). The output therefore depends
+only on --seed, the population sizes and --start. It does not depend on
+--workers or --commit-rows. Blocks are built (and their files written) by a
+multiprocessing pool. The main process inserts them in order with executemany
+and commits every --commit-rows rows. Run from the repository root:
+
+    python benchmarks/seed_data.py --preset small --reset
+    DATABASE_URL=sqlite:////data/scale.db python benchmarks/seed_data.py --preset large --reset --workers 8
+    python benchmarks/seed_data.py --teachers 200 --students 50000 --submissions 2000000 --file-share 0
+
+Every account's password is --password (default "password123"). Its hash is
+computed once with a salt derived from --seed. Submission indexes are dropped
+for the load and rebuilt afterwards unless --keep-indexes is given. The
+change-log triggers are suspended, so seeded rows don't enter the change
+feed. The search indexes are built in one pass after the load. Planner
+statistics are refreshed at the end.
+"""
+import argparse
+import hashlib
+import importlib
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from multiprocessing import Pool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import column, func, insert, select, table  # noqa: E402
+
+from models import compress_text  # noqa: E402
+
+BLOCK = 10000
+KB = 1024
+
+PRESETS = {
+    "small": {"teachers": 20, "students": 2000, "assignments_per_teacher": 5, "submissions": 50000},
+    "medium": {"teachers": 500, "students": 100000, "assignments_per_teacher": 10, "submissions": 1000000},
+    "large": {"teachers": 5000, "students": 1000000, "assignments_per_teacher": 10, "submissions": 20000000},
+}
+
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Akash", "Ananya", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Nikhil",
+    "Priya", "Rahul", "Riya", "Rohan", "Saanvi", "Sneha", "Tanvi", "Varun", "Vikram", "Zara",
+    "Alex", "Emma", "Liam", "Noah", "Olivia", "Sofia", "Lucas", "Mia", "Omar", "Yara",
+)
+LAST_NAMES = (
+    "Sharma", "Verma", "Iyer", "Reddy", "Nair", "Gupta", "Kapoor", "Mehta", "Joshi", "Rao",
+    "Patel", "Singh", "Das", "Bose", "Khan", "Smith", "Garcia", "Chen", "Müller", "Silva",
+    "Kowalski", "Okafor", "Tanaka", "Haddad", "Novak", "Rossi", "Dubois", "Larsen", "Costa", "Ahmed",
+)
+SUBJECTS = (
+    "Data Structures", "Operating Systems", "Thermodynamics", "Organic Chemistry", "Linear Algebra",
+    "World History", "Microeconomics", "Database Systems", "Signals and Systems", "Technical Writing",
+)
+TASKS = ("Essay", "Lab Report", "Problem Set", "Case Study", "Project Proposal", "Literature Review")
+GRADES = ("A+", "A", "A-", "B+", "B", "B-", "C+", "C", "D", "F")
+FEEDBACK = (
+    "Clear structure and well supported arguments.",
+    "Good analysis, but the conclusion needs more evidence.",
+    "Please cite your sources consistently.",
+    "Several calculations are incorrect; see the marked steps.",
+    "Excellent work, particularly the discussion section.",
+    "The introduction does not state the problem clearly.",
+    "Needs proofreading; many grammatical errors.",
+    "Solid effort. Expand on the limitations next time.",
+)
+SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "pe", "da", "gu", "ho", "ze", "fi", "ba", "wo")
+
+SHARED_TEXTS = 500  # pool of texts that duplicated submissions copy
+
+# Set in every process by _init_worker
+_plan = None
+
+
+def _init_worker(plan):
+    global _plan
+    _plan = plan
+
+
+def _rng(name, block):
+    return random.Random(f"{_plan['seed']}:{name}:{block}")
+
+
+@lru_cache(maxsize=1)
+def _sentences():
+    """Sentence pool the texts are drawn from; large enough that unrelated texts barely overlap"""
+    rng = random.Random(f"{_plan['seed']}:vocabulary")
+    vocabulary = [
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+        for _ in range(3000)
+    ]
+    return [
+        " ".join(rng.choices(vocabulary, k=rng.randint(6, 18))).capitalize() + "."
+        for _ in range(50000)
+    ]
+
+
+def _text(rng, size):
+    """Roughly `size` bytes of sentence-shaped filler"""
+    # ~60 bytes per sentence
+    return " ".join(rng.choices(_sentences(), k=max(1, size // 60)))
+
+
+@lru_cache(maxsize=SHARED_TEXTS)
+def _shared_text(index):
+    rng = random.Random(f"{_plan['seed']}:shared:{index}")
+    return _text(rng, rng.randint(_plan["text_min"], _plan["text_max"]))
+
+
+def password_hash(password, seed):
+    """A werkzeug-compatible pbkdf2 hash with a salt derived from the seed"""
+    iterations = 600000
+    salt = hashlib.sha256(f"{seed}:salt".encode()).hexdigest()[:16]
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), iterations).hex()
+    return f"pbkdf2:sha256:{iterations}${salt}${digest}"
+
+
+def student_identity(student_id):
+    """(name, reg_no, email) of a seeded student, derived from the id alone"""
+    index = student_id - 1
+    name = f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]}"
+    return name, f"REG{student_id:07d}", f"student{student_id}@example.edu"
+
+
+def assignment_due(assignment_id):
+    """Due dates spread over a year from --start, a function of the id alone"""
+    start = _plan["start"]
+    return start + timedelta(hours=(assignment_id * 7919) % (365 * 24), minutes=59)
+
+
+def _teachers(block, first_id, count):
+    rng = _rng("teacher", block)
+    rows = []
+    for teacher_id in range(first_id, first_id + count):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        rows.append({
+            "id": teacher_id,
+            "name": name,
+            "email": f"teacher{teacher_id}@example.edu",
+            "password": _plan["password_hash"],
+            "created_at": _plan["start"] - timedelta(days=rng.randint(30, 400)),
+            "immediate_alerts": rng.random() < 0.1,
+        })
+    return [("teacher", rows)]
+
+
+def _students(block, first_id, count):
+    rows = []
+    for student_id in range(first_id, first_id + count):
+        name, reg_no, email = student_identity(student_id)
+        rows.append({
+            "id": student_id,
+            "name": name,
+            "reg_no": reg_no,
+            "email": email,
+            "password": _plan["password_hash"],
+        })
+    return [("student", rows)]
+
+
+def _assignments(block, first_id, count):
+    rng = _rng("assignment", block)
+    per_teacher = _plan["assignments_per_teacher"]
+    rows = []
+    for assignment_id in range(first_id, first_id + count):
+        due_date = assignment_due(assignment_id)
+        rows.append({
+            "id": assignment_id,
+            "title": f"{rng.choice(SUBJECTS)} {rng.choice(TASKS)} {assignment_id}",
+            "description": _text(rng, rng.randint(200, 1500)),
+            "due_date": due_date,
+            "created_at": due_date - timedelta(days=rng.randint(3, 30)),
+            "teacher_id": (assignment_id - 1) // per_teacher + 1,
+        })
+    return [("assignment", rows)]
+
+
+def _submissions(block, first_id, count):
+    rng = _rng("submission", block)
+    plan = _plan
+    rows = []
+    bodies = []
+    for submission_id in range(first_id, first_id + count):
+        student_id = rng.randint(1, plan["students"])
+        assignment_id = rng.randint(1, plan["assignments"])
+        name, reg_no, email = student_identity(student_id)
+        due_date = assignment_due(assignment_id)
+        is_late = rng.random() < plan["late_share"]
+        if is_late:
+            submitted_at = due_date + timedelta(seconds=rng.randint(1, 3 * 24 * 3600))
+        else:
+            submitted_at = due_date - timedelta(seconds=rng.randint(0, 7 * 24 * 3600))
+
+        duplicate = rng.random() < plan["duplicate_share"]
+        if duplicate:
+            content = _shared_text(rng.randrange(SHARED_TEXTS))
+            plagiarism = rng.randint(80, 100)
+        else:
+            content = _text(rng, rng.randint(plan["text_min"], plan["text_max"]))
+            plagiarism = min(100, int(rng.expovariate(1 / 12)))
+        encoded = content.encode("utf-8")
+
+        text_content = file_path = None
+        if rng.random() < plan["file_share"]:
+            file_path = os.path.join(plan["upload_folder"], f"{assignment_id}_{reg_no}_{submission_id}.txt")
+            with open(file_path, "wb") as fh:
+                fh.write(encoded)
+        else:
+            text_content = content
+
+        graded = rng.random() < plan["graded_share"]
+        feedback = rng.choice(FEEDBACK) if graded and rng.random() < 0.6 else None
+        if text_content is not None or feedback is not None:
+            # Compressed here, in the pool, rather than by the inserting process
+            bodies.append({
+                "submission_id": submission_id,
+                "text_content": compress_text(text_content),
+                "feedback": compress_text(feedback),
+            })
+        rows.append({
+            "id": submission_id,
+            "student_name": name,
+            "student_email": email,
+            "reg_no": reg_no,
+            "submitted_at": submitted_at,
+            "is_late": is_late,
+            "plagiarism": plagiarism,
+            "ai_detected": rng.random() < 0.08,
+            "file_path": file_path,
+            "assignment_id": assignment_id,
+            "student_id": student_id,
+            "grade": rng.choice(GRADES) if graded else None,
+            "needs_review": plagiarism >= plan["review_threshold"],
+            "status": "processed",
+            "content_hash": hashlib.sha256(encoded).hexdigest(),
+            "detection_completeness": "complete",
+        })
+    return [("submission", rows), ("submission_body", bodies)]
+
+
+BUILDERS = {
+    "teacher": _teachers,
+    "student": _students,
+    "assignment": _assignments,
+    "submission": _submissions,
+}
+
+
+def _build(task):
+    """(row count, [(table, rows), ...]) for one block"""
+    name, block, first_id, count = task
+    return count, BUILDERS[name](block, first_id, count)
+
+
+def _tasks(name, total):
+    for block, first in enumerate(range(0, total, BLOCK)):
+        yield name, block, first + 1, min(BLOCK, total - first)
+
+
+def _parse_range_kb(value):
+    low, _, high = value.partition("-")
+    low = int(float(low) * KB)
+    high = int(float(high) * KB) if high else low
+    if low <= 0 or high < low:
+        raise argparse.ArgumentTypeError(f"invalid size range: {value}")
+    return low, high
+
+
+def seed(app, db, plan, workers, commit_rows, keep_indexes):
+    """Insert the planned population; returns {table: rows}"""
+    from changes import drop_change_triggers, install_change_triggers
+    from search import drop_search_triggers, install_search, rebuild_search
+    from db_profile import run_maintenance
+    from models import Assignment, Student, Submission, Teacher
+
+    models = {"teacher": Teacher, "student": Student, "assignment": Assignment, "submission": Submission}
+    statements = {name: insert(model.__table__) for name, model in models.items()}
+    # Bodies arrive already compressed, so insert them without CompressedText's bind processing
+    statements["submission_body"] = insert(
+        table("submission_body", column("submission_id"), column("text_content"), column("feedback"))
+    )
+    totals = {
+        "teacher": plan["teachers"],
+        "student": plan["students"],
+        "assignment": plan["assignments"],
+        "submission": plan["submissions"],
+    }
+
+    with app.app_context():
+        engine = db.engine
+        for model in models.values():
+            existing = db.session.execute(select(func.count()).select_from(model)).scalar()
+            if existing:
+                raise SystemExit(f"❌ Table {model.__tablename__} already has {existing} rows; use --reset")
+
+        deferred = [] if keep_indexes else list(Submission.__table__.indexes)
+        for index in deferred:
+            index.drop(bind=engine)
+        # Seeded rows are history, not changes: clients pick them up with a full sync
+        change_feed = engine.dialect.name == "sqlite"
+        if change_feed:
+            with engine.begin() as conn:
+                drop_change_triggers(conn)
+                # Indexed in one pass at the end instead of row by row
+                drop_search_triggers(conn)
+
+        inserted = {}
+        with Pool(workers, initializer=_init_worker, initargs=(plan,)) as pool:
+            for name in models:
+                total = totals[name]
+                started = time.perf_counter()
+                done = pending = 0
+                # Ordered results keep ids and insertion order independent of the worker count
+                for count, parts in pool.imap(_build, _tasks(name, total)):
+                    for target, rows in parts:
+                        if rows:
+                            db.session.execute(statements[target], rows)
+                    done += count
+                    pending += count
+                    if pending >= commit_rows:
+                        db.session.commit()
+                        pending = 0
+                        rate = done / (time.perf_counter() - started)
+                        print(f"🌱 {name}: {done:,}/{total:,} ({rate:,.0f} rows/s)")
+                db.session.commit()
+                inserted[name] = done
+                print(f"✅ {name}: {done:,} rows in {time.perf_counter() - started:.1f}s")
+
+        for index in deferred:
+            started = time.perf_counter()
+            index.create(bind=engine)
+            print(f"✅ Rebuilt {index.name} in {time.perf_counter() - started:.1f}s")
+        if change_feed:
+            with engine.begin() as conn:
+                install_change_triggers(conn)
+                started = time.perf_counter()
+                install_search(conn)
+                rebuild_search(conn)
+            print(f"✅ Rebuilt search indexes in {time.perf_counter() - started:.1f}s")
+
+    print(run_maintenance(app, db))
+    return inserted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-module", default="app", help="module exposing `app` and `db`")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--teachers", type=int)
+    parser.add_argument("--students", type=int)
+    parser.add_argument("--assignments-per-teacher", type=int)
+    parser.add_argument("--submissions", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", default="2025-01-01", help="date the assignment due dates are spread from (YYYY-MM-DD)")
+    parser.add_argument("--text-kb", type=_parse_range_kb, default="1-8", help="submission text size range in KB (default 1-8)")
+    parser.add_argument("--file-share", type=float, default=0.3, help="share of submissions uploaded as files")
+    parser.add_argument("--late-share", type=float, default=0.12)
+    parser.add_argument("--graded-share", type=float, default=0.6)
+    parser.add_argument("--duplicate-share", type=float, default=0.03, help="share copying a common text")
+    parser.add_argument("--review-threshold", type=int, default=int(os.environ.get("PLAGIARISM_THRESHOLD", 50)))
+    parser.add_argument("--upload-folder", help="where files are written (default: the app's UPLOAD_FOLDER)")
+    parser.add_argument("--password", default="password123", help="password of every seeded account")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="generator processes")
+    parser.add_argument("--commit-rows", type=int, default=200000, help="rows per transaction")
+    parser.add_argument("--keep-indexes", action="store_true", help="don't drop submission indexes during the load")
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args(argv)
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    module = importlib.import_module(args.app_module)
+    app, db = module.app, module.db
+
+    upload_folder = args.upload_folder or app.config["UPLOAD_FOLDER"]
+    os.makedirs(upload_folder, exist_ok=True)
+    plan = {
+        "seed": args.seed,
+        "start": datetime.strptime(args.start, "%Y-%m-%d"),
+        "teachers": sizes["teachers"],
+        "students": sizes["students"],
+        "assignments_per_teacher": sizes["assignments_per_teacher"],
+        "assignments": sizes["teachers"] * sizes["assignments_per_teacher"],
+        "submissions": sizes["submissions"],
+        "text_min": args.text_kb[0],
+        "text_max": args.text_kb[1],
+        "file_share": args.file_share,
+        "late_share": args.late_share,
+        "graded_share": args.graded_share,
+        "duplicate_share": args.duplicate_share,
+        "review_threshold": args.review_threshold,
+        "upload_folder": upload_folder,
+        "password_hash": password_hash(args.password, args.seed),
+    }
+
+    if args.reset:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+        print("✅ Tables recreated")
+
+    started = time.perf_counter()
+    inserted = seed(app, db, plan, max(1, args.workers), args.commit_rows, args.keep_indexes)
+    total = sum(inserted.values())
+    print(f"✅ Seeded {total:,} rows in {time.perf_counter() - started:.1f}s "
+          f"(seed {args.seed}); every password is {args.password!r}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Change feed: a sequence number for every submission and assignment write.
+
+SQLite triggers append a change_log row whenever a submission or assignment
+is inserted, updated or deleted, and whenever feedback or pasted text is
+written to submission_body. ORM flushes, set-based bulk updates and raw SQL
+are therefore all recorded. SQLite has a single writer and AUTOINCREMENT
+never reuses a number, so `seq` follows commit order. A client that has seen
+seq N finds every later change after N. Two kinds of write are not logged:
+updates that change nothing tracked, and the text migration moving old
+in-row text.
+
+changes_since() backs GET /api/changes?since=<seq>. Each changed record is
+returned once, with its current state and the union of the fields that
+changed. A mirror therefore stays in sync with payloads proportional to
+what changed.
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import event, func, inspect, or_, select, text
+
+from models import Assignment, ChangeLog, Submission, SubmissionBody, db
+from read_models import assignment_dict, submission_rows
+
+# Bumped whenever the tracked columns change; install_change_triggers() drops older versions
+TRIGGER_PREFIX = "change_log_v3_"
+# In-row text columns emptied by the text migration; changes to them are not changes
+_LEGACY_COLUMNS = ("text_content", "feedback")
+_SUBMISSION_TEACHER = "(SELECT teacher_id FROM assignment WHERE id = {row}.assignment_id)"
+
+
+def _tracked(table, exclude=()):
+    return [c.name for c in table.columns if not c.primary_key and c.name not in exclude]
+
+
+def _changed(columns):
+    return " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in columns)
+
+
+def _fields(columns):
+    cases = " || ".join(f"CASE WHEN NEW.{c} IS NOT OLD.{c} THEN '{c},' ELSE '' END" for c in columns)
+    return f"rtrim({cases}, ',')"
+
+
+def _log(entity, entity_id, op, fields, teacher_id, student_id):
+    return (
+        "INSERT INTO change_log (entity, entity_id, op, fields, teacher_id, student_id, changed_at) "
+        f"VALUES ('{entity}', {entity_id}, '{op}', {fields}, {teacher_id}, {student_id}, CURRENT_TIMESTAMP);"
+    )
+
+
+def trigger_ddl():
+    """{trigger name: CREATE TRIGGER statement} for the SQLite change log"""
+    submission_columns = _tracked(Submission.__table__, exclude=_LEGACY_COLUMNS)
+    assignment_columns = _tracked(Assignment.__table__)
+    body_columns = ["text_content", "feedback"]
+    new_teacher = _SUBMISSION_TEACHER.format(row="NEW")
+    body_teacher = (
+        "(SELECT a.teacher_id FROM submission s JOIN assignment a ON a.id = s.assignment_id "
+        "WHERE s.id = NEW.submission_id)"
+    )
+    body_student = "(SELECT student_id FROM submission WHERE id = NEW.submission_id)"
+    # A body inserted while the submission row still holds that text is the migration moving it
+    body_new = " OR ".join(
+        f"(NEW.{c} IS NOT NULL AND (SELECT {c} FROM submission WHERE id = NEW.submission_id) IS NULL)"
+        for c in body_columns
+    )
+    body_new_fields = "rtrim(" + " || ".join(
+        f"CASE WHEN NEW.{c} IS NOT NULL THEN '{c},' ELSE '' END" for c in body_columns
+    ) + ", ',')"
+
+    statements = {
+        "submission_insert": (
+            "AFTER INSERT ON submission",
+            _log("submission", "NEW.id", "insert", "NULL", new_teacher, "NEW.student_id"),
+        ),
+        "submission_update": (
+            f"AFTER UPDATE ON submission WHEN {_changed(submission_columns)}",
+            _log("submission", "NEW.id", "update", _fields(submission_columns), new_teacher, "NEW.student_id"),
+        ),
+        "submission_delete": (
+            "AFTER DELETE ON submission",
+            _log("submission", "OLD.id", "delete", "NULL", _SUBMISSION_TEACHER.format(row="OLD"), "OLD.student_id"),
+        ),
+        "body_insert": (
+            f"AFTER INSERT ON submission_body WHEN {body_new}",
+            _log("submission", "NEW.submission_id", "update", body_new_fields, body_teacher, body_student),
+        ),
+        "body_update": (
+            f"AFTER UPDATE ON submission_body WHEN {_changed(body_columns)}",
+            _log("submission", "NEW.submission_id", "update", _fields(body_columns), body_teacher, body_student),
+        ),
+        "assignment_insert": (
+            "AFTER INSERT ON assignment",
+            _log("assignment", "NEW.id", "insert", "NULL", "NEW.teacher_id", "NULL"),
+        ),
+        "assignment_update": (
+            f"AFTER UPDATE ON assignment WHEN {_changed(assignment_columns)}",
+            _log("assignment", "NEW.id", "update", _fields(assignment_columns), "NEW.teacher_id", "NULL"),
+        ),
+        "assignment_delete": (
+            "AFTER DELETE ON assignment",
+            _log("assignment", "OLD.id", "delete", "NULL", "OLD.teacher_id", "NULL"),
+        ),
+    }
+    return {
+        TRIGGER_PREFIX + name: f"CREATE TRIGGER IF NOT EXISTS {TRIGGER_PREFIX}{name} {when} BEGIN {body} END"
+        for name, (when, body) in statements.items()
+    }
+
+
+def install_change_triggers(connection):
+    statements = trigger_ddl()
+    existing = connection.execute(text(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'change_log_v%'"
+    )).scalars().all()
+    for name in existing:
+        if name not in statements:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    for ddl in statements.values():
+        connection.execute(text(ddl))
+
+
+def drop_change_triggers(connection):
+    """Drop the triggers, e.g. around a bulk load that clients pick up with a full sync"""
+    for name in trigger_ddl():
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def _on_create_all(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        install_change_triggers(connection)
+
+
+def head_seq():
+    return db.session.execute(select(func.max(ChangeLog.seq))).scalar() or 0
+
+
+def changes_since(since, limit, student_id=None, teacher_id=None):
+    """Records changed after `since`, coalesced per record, oldest change first.
+
+    `next` is the seq to pass as `since` on the following call. With
+    `more` the page was full and the client should call again at once.
+    `reset` means changes after `since` were pruned (or `since` is from
+    another database). The client must then reload everything and continue
+    from `next`.
+    """
+    head = head_seq()
+    oldest = db.session.execute(select(func.min(ChangeLog.seq))).scalar()
+    if since > head or (oldest is not None and since < oldest - 1):
+        return {"since": since, "next": head, "more": False, "reset": True, "changes": []}
+
+    query = select(ChangeLog).where(ChangeLog.seq > since, ChangeLog.seq <= head)
+    if student_id is not None:
+        query = query.where(or_(ChangeLog.entity == "assignment", ChangeLog.student_id == student_id))
+    if teacher_id is not None:
+        query = query.where(ChangeLog.teacher_id == teacher_id)
+    rows = db.session.execute(query.order_by(ChangeLog.seq).limit(limit)).scalars().all()
+    more = len(rows) == limit
+    # A short page has seen everything up to head, including changes filtered out
+    next_seq = rows[-1].seq if more else head
+
+    entries = {}
+    for row in rows:
+        key = (row.entity, row.entity_id)
+        entry = entries.get(key)
+        if entry is None:
+            entry = entries[key] = {"entity": row.entity, "id": row.entity_id, "op": row.op, "fields": set()}
+        elif row.op == "delete":
+            entry["op"] = "delete"
+        elif entry["op"] == "delete":
+            entry["op"] = "insert"  # deleted, then the id was reused
+        entry["seq"] = row.seq
+        if row.fields:
+            entry["fields"].update(row.fields.split(","))
+
+    records = _load_records(
+        [e["id"] for e in entries.values() if e["entity"] == "submission" and e["op"] != "delete"],
+        [e["id"] for e in entries.values() if e["entity"] == "assignment" and e["op"] != "delete"],
+    )
+    changes = []
+    for entry in sorted(entries.values(), key=lambda e: e["seq"]):
+        record = records.get((entry["entity"], entry["id"]))
+        op = "delete" if record is None else entry["op"]
+        changes.append({
+            "seq": entry["seq"],
+            "entity": entry["entity"],
+            "id": entry["id"],
+            "op": op,
+            "fields": sorted(entry["fields"]) if op == "update" else None,
+            "record": record,
+        })
+    return {"since": since, "next": next_seq, "more": more, "reset": False, "changes": changes}
+
+
+def _load_records(submission_ids, assignment_ids, chunk_size=500):
+    records = {}
+    for start in range(0, len(submission_ids), chunk_size):
+        for row in submission_rows(Submission.id.in_(submission_ids[start:start + chunk_size])):
+            records[("submission", row.id)] = row
+    for start in range(0, len(assignment_ids), chunk_size):
+        for assignment in Assignment.query.filter(Assignment.id.in_(assignment_ids[start:start + chunk_size])):
+            records[("assignment", assignment.id)] = assignment_dict(assignment)
+    return records
+
+
+def prune_changes(retention_days):
+    """Delete change_log rows older than `retention_days`, always keeping the newest"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = ChangeLog.query.filter(
+        ChangeLog.changed_at < cutoff, ChangeLog.seq < head_seq()
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def init_changes(app):
+    """Install the change-log triggers (SQLite) and `flask prune-changes`"""
+    app.config.setdefault("CHANGES_PAGE_SIZE", 500)
+    app.config.setdefault("CHANGELOG_RETENTION_DAYS", 7)
+
+    with app.app_context():
+        engine = db.engine
+        app.extensions["changes"] = engine.dialect.name == "sqlite"
+        if not app.extensions["changes"]:
+            print(f"⚠️ Change feed needs SQLite triggers; /api/changes is disabled on {engine.dialect.name}")
+            return
+        if not event.contains(db.metadata, "after_create", _on_create_all):
+            event.listen(db.metadata, "after_create", _on_create_all)
+        # Existing databases: add the log table and triggers now
+        tables = inspect(engine).get_table_names()
+        if "submission" in tables and "assignment" in tables:
+            with engine.begin() as conn:
+                ChangeLog.__table__.create(bind=conn, checkfirst=True)
+                SubmissionBody.__table__.create(bind=conn, checkfirst=True)
+                install_change_triggers(conn)
+
+    @app.cli.command("prune-changes")
+    @click.option("--days", type=int, default=None, help="Keep this many days (default CHANGELOG_RETENTION_DAYS)")
+    def prune_changes_command(days):
+        """Delete old change-log rows; clients further behind get reset=true"""
+        days = app.config["CHANGELOG_RETENTION_DAYS"] if days is None else days
+        click.echo(f"✅ Pruned {prune_changes(days)} change-log rows")
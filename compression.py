@@ -0,0 +1,155 @@
+"""Response compression negotiated from Accept-Encoding.
+
+Text-like responses (HTML, JSON, CSS, JS, CSV, plain text) at least
+COMPRESS_MIN_SIZE bytes long are sent with brotli when the client accepts it
+and the brotli package is installed, and with gzip otherwise. Streamed
+responses are compressed chunk by chunk with a sync flush after every chunk,
+so each piece still reaches the client as soon as it is produced.
+
+Compressed bodies are cached by (encoding, digest of the uncompressed body)
+in an LRU bounded by COMPRESS_CACHE_BYTES. The same list or dashboard served
+to many clients is compressed once. Hashing is far cheaper than compressing.
+File downloads (send_file) are left alone: they are mostly compressed
+formats already.
+"""
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from metrics import record_cache
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html", "text/plain", "text/css", "text/csv", "text/xml", "text/javascript",
+    "text/event-stream", "application/json", "application/javascript", "application/xml",
+    "image/svg+xml",
+}
+
+
+class CompressedCache:
+    """Thread-safe LRU of compressed bodies, bounded by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def choose_encoding(accept_encodings):
+    """"br", "gzip" or None for a request's Accept-Encoding"""
+    br = accept_encodings.quality("br") if BROTLI_AVAILABLE else 0
+    gz = accept_encodings.quality("gzip")
+    if br > 0 and br >= gz:
+        return "br"
+    if gz > 0:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config["COMPRESS_BROTLI_QUALITY"])
+    # mtime=0 keeps the bytes (and any cached copy) identical for identical input
+    return gzip.compress(data, compresslevel=config["COMPRESS_LEVEL"], mtime=0)
+
+
+def _compress_stream(chunks, encoding, config):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config["COMPRESS_BROTLI_QUALITY"])
+        for chunk in chunks:
+            out = compressor.process(chunk) + compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+    # wbits=31: zlib stream with a gzip header and trailer
+    compressor = zlib.compressobj(config["COMPRESS_LEVEL"], zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or "Content-Encoding" in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def init_compression(app):
+    """Compress eligible responses and keep an LRU of compressed bodies"""
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BROTLI_QUALITY", 5)
+    app.config.setdefault("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024)
+    if not app.config["COMPRESS_ENABLED"]:
+        return
+
+    cache = CompressedCache(app.config["COMPRESS_CACHE_BYTES"])
+    app.extensions["compressed_cache"] = cache
+
+    @app.after_request
+    def compress_response(response):
+        if request.method == "HEAD" or not _compressible(response):
+            return response
+        # The body depends on Accept-Encoding from here on, whatever we decide
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            response.response = _compress_stream(response.iter_encoded(), encoding, app.config)
+            if hasattr(original, "close"):
+                response.call_on_close(original.close)
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            return response
+
+        data = response.get_data()
+        if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+        key = (encoding, hashlib.blake2b(data, digest_size=16).digest())
+        body = cache.get(key)
+        record_cache("compressed_responses", body is not None)
+        if body is None:
+            body = compress(data, encoding, app.config)
+            cache.put(key, body)
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+        return response
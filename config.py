@@ -2,7 +2,143 @@ import os
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    return value.lower() in ("1", "true", "yes") if value not in (None, "") else default
+
+
+def engine_options(database_uri):
+    """Engine options for the configured database.
+
+    SQLite gets a driver-level lock timeout (the pragmas are applied per
+    connection by db_profile.py). Server databases get pool sizing,
+    pre-ping and a per-statement timeout.
+    """
+    statement_timeout_ms = _env_int("DB_STATEMENT_TIMEOUT_MS", 30000)
+
+    if database_uri.startswith("sqlite"):
+        return {"connect_args": {"timeout": _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000}}
+
+    options = {
+        "pool_size": _env_int("DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 20),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": True,
+    }
+    if database_uri.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout_ms}"}
+    elif database_uri.startswith("mysql"):
+        options["connect_args"] = {"init_command": f"SET SESSION max_execution_time={statement_timeout_ms}"}
+    return options
+
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BASE_DIR, 'app.db')
+    # Relative SQLite paths resolve inside the Flask instance folder
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///app.db")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = "supersecretkey"
+    SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
+    # Adjusts the APP_PROFILE feature set, e.g. "-ai,-preview" (see features.py)
+    APP_FEATURES = os.environ.get("APP_FEATURES", "")
+
+    # SQLite connection pragmas
+    SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    SQLITE_CACHE_SIZE_KB = _env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024)
+    SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+
+    # Scheduled ANALYZE/VACUUM (seconds, 0 disables the in-process timer)
+    DB_MAINTENANCE_INTERVAL = _env_int("DB_MAINTENANCE_INTERVAL", 0)
+    DB_VACUUM_FREE_RATIO = float(os.environ.get("DB_VACUUM_FREE_RATIO", "0.2"))
+    # Add missing tables, columns and indexes to an older database at startup
+    SCHEMA_AUTO_UPGRADE = _env_bool("SCHEMA_AUTO_UPGRADE", True)
+
+    # Email (Flask-Mail) and the outbox dispatcher
+    MAIL_SERVER = os.environ.get("MAIL_SERVER", "localhost")
+    MAIL_PORT = _env_int("MAIL_PORT", 25)
+    MAIL_USE_TLS = _env_bool("MAIL_USE_TLS", False)
+    MAIL_USERNAME = os.environ.get("MAIL_USERNAME")
+    MAIL_PASSWORD = os.environ.get("MAIL_PASSWORD")
+    MAIL_DEFAULT_SENDER = os.environ.get("MAIL_DEFAULT_SENDER", "noreply@assignmentmanager.com")
+    OUTBOX_DISPATCHER_ENABLED = _env_bool("OUTBOX_DISPATCHER_ENABLED", True)
+    OUTBOX_BATCH_SIZE = _env_int("OUTBOX_BATCH_SIZE", 100)
+    OUTBOX_MAX_ATTEMPTS = _env_int("OUTBOX_MAX_ATTEMPTS", 6)
+    MAIL_DOMAIN_RATE_PER_MINUTE = _env_int("MAIL_DOMAIN_RATE_PER_MINUTE", 120)
+    # Minutes to coalesce late/plagiarism alerts per teacher and assignment, 0 sends each immediately
+    ALERT_DIGEST_WINDOW = _env_int("ALERT_DIGEST_WINDOW", 15)
+
+    # Deadline reminders: minutes before due_date, e.g. "1440,60"
+    REMINDERS_ENABLED = _env_bool("REMINDERS_ENABLED", True)
+    REMINDER_OFFSETS = [int(m) for m in os.environ.get("REMINDER_OFFSETS", "1440,60").split(",") if m.strip()]
+
+    # REST API bearer tokens (signed with SECRET_KEY unless API_TOKEN_SECRET is set)
+    API_TOKEN_SECRET = os.environ.get("API_TOKEN_SECRET")
+    API_TOKEN_TTL = _env_int("API_TOKEN_TTL", 3600)
+
+    # Submission admission control: slots that start detection at once, the rest is queued
+    DETECTION_WORKERS = _env_int("DETECTION_WORKERS", 2)
+    SUBMIT_MAX_INFLIGHT = _env_int("SUBMIT_MAX_INFLIGHT", 4)
+    SUBMIT_MAX_INFLIGHT_PER_ASSIGNMENT = _env_int("SUBMIT_MAX_INFLIGHT_PER_ASSIGNMENT", 2)
+    SUBMIT_RATE_PER_ASSIGNMENT = float(os.environ.get("SUBMIT_RATE_PER_ASSIGNMENT", "2"))
+    SUBMIT_BURST_PER_ASSIGNMENT = _env_int("SUBMIT_BURST_PER_ASSIGNMENT", 5)
+    # Load shedding: defer image analysis, AI scoring and reports past these thresholds
+    DETECTION_SHED_QUEUE_DEPTH = _env_int("DETECTION_SHED_QUEUE_DEPTH", 20)
+    DETECTION_SHED_LOAD_PER_CPU = float(os.environ.get("DETECTION_SHED_LOAD_PER_CPU", "1.5"))
+    # Seconds after which a submission still "processing" is taken from its (dead) worker
+    DETECTION_CLAIM_TIMEOUT = _env_int("DETECTION_CLAIM_TIMEOUT", 900)
+    # Import detection stacks when detection workers start instead of on first use
+    DETECTORS_PRELOAD = _env_bool("DETECTORS_PRELOAD", False)
+
+    # Per-request SQL accounting: log requests slower or chattier than this, and N+1 loops
+    SLOW_REQUEST_MS = _env_int("SLOW_REQUEST_MS", 500)
+    SLOW_REQUEST_QUERIES = _env_int("SLOW_REQUEST_QUERIES", 50)
+    N_PLUS_ONE_THRESHOLD = _env_int("N_PLUS_ONE_THRESHOLD", 10)
+    QUERY_AUDIT_HEADERS = _env_bool("QUERY_AUDIT_HEADERS", False)
+
+    # On-demand profiling: "X-Profile: <token>" or a sampled fraction of logged-in requests
+    PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+    PROFILE_FOLDER = os.environ.get("PROFILE_FOLDER", "profiles")
+    PROFILE_MAX_COUNT = _env_int("PROFILE_MAX_COUNT", 50)
+    PROFILE_MAX_AGE_HOURS = _env_int("PROFILE_MAX_AGE_HOURS", 72)
+
+    # gzip/brotli for text responses of at least COMPRESS_MIN_SIZE bytes
+    COMPRESS_ENABLED = _env_bool("COMPRESS_ENABLED", True)
+    COMPRESS_MIN_SIZE = _env_int("COMPRESS_MIN_SIZE", 1024)
+    COMPRESS_LEVEL = _env_int("COMPRESS_LEVEL", 6)
+    COMPRESS_BROTLI_QUALITY = _env_int("COMPRESS_BROTLI_QUALITY", 5)
+    COMPRESS_CACHE_BYTES = _env_int("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024)
+
+    # GET /api/changes page size and change-log retention for `flask prune-changes`
+    CHANGES_PAGE_SIZE = _env_int("CHANGES_PAGE_SIZE", 500)
+    CHANGELOG_RETENTION_DAYS = _env_int("CHANGELOG_RETENTION_DAYS", 7)
+
+    # /dashboard/live Server-Sent Events; each open stream holds a server thread
+    LIVE_POLL_INTERVAL = float(os.environ.get("LIVE_POLL_INTERVAL", "2"))
+    LIVE_KEEPALIVE_SECONDS = _env_int("LIVE_KEEPALIVE_SECONDS", 15)
+    LIVE_STREAM_SECONDS = _env_int("LIVE_STREAM_SECONDS", 300)
+    LIVE_MAX_STREAMS = _env_int("LIVE_MAX_STREAMS", 2)
+    # Submission progress: handle lifetime and the longest long-poll wait
+    PROGRESS_HANDLE_TTL = _env_int("PROGRESS_HANDLE_TTL", 24 * 3600)
+    PROGRESS_MAX_WAIT = _env_int("PROGRESS_MAX_WAIT", 25)
+    # Streams and long-polls open at once per process, each holding a server thread
+    PROGRESS_MAX_STREAMS = _env_int("PROGRESS_MAX_STREAMS", 2)
+
+    # Full-text search: results per page and pages merged per maintenance run
+    SEARCH_PAGE_SIZE = _env_int("SEARCH_PAGE_SIZE", 20)
+    SEARCH_MERGE_PAGES = _env_int("SEARCH_MERGE_PAGES", 500)
+
+    # Bulk grading: ids per UPDATE statement, below SQLite's bound-parameter limit
+    BULK_CHUNK_SIZE = _env_int("BULK_CHUNK_SIZE", 500)
+    # POST /api/batch: operations accepted per request, applied in one transaction
+    BATCH_MAX_OPERATIONS = _env_int("BATCH_MAX_OPERATIONS", 1000)
+
+    # Prometheus /metrics (optionally behind a bearer token)
+    METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
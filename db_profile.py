@@ -0,0 +1,89 @@
+"""Database engine profile: per-connection SQLite pragmas and scheduled maintenance"""
+import threading
+import time
+
+import click
+from sqlalchemy import event, text
+
+
+def _is_sqlite(engine):
+    return engine.dialect.name == "sqlite"
+
+
+def _apply_sqlite_pragmas(config):
+    """Build a connect listener that tunes every new SQLite connection"""
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+            # Negative cache_size is in KiB rather than pages
+            cursor.execute(f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}")
+            cursor.execute(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+        finally:
+            cursor.close()
+    return on_connect
+
+
+def init_db_profile(app, db):
+    """Attach the engine profile to the app's database engine"""
+    app.config.setdefault("SQLITE_BUSY_TIMEOUT_MS", 5000)
+    app.config.setdefault("SQLITE_CACHE_SIZE_KB", 64 * 1024)
+    app.config.setdefault("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+    app.config.setdefault("DB_MAINTENANCE_INTERVAL", 0)
+    app.config.setdefault("DB_VACUUM_FREE_RATIO", 0.2)
+
+    with app.app_context():
+        engine = db.engine
+        if _is_sqlite(engine) and engine.url.database not in (None, "", ":memory:"):
+            event.listen(engine, "connect", _apply_sqlite_pragmas(app.config))
+
+    @app.cli.command("db-maintenance")
+    def db_maintenance_command():
+        """Run ANALYZE (and VACUUM when fragmented) once, e.g. from cron"""
+        click.echo(run_maintenance(app, db))
+
+    if app.config["DB_MAINTENANCE_INTERVAL"] > 0:
+        start_maintenance_scheduler(app, db, app.config["DB_MAINTENANCE_INTERVAL"])
+
+
+def run_maintenance(app, db):
+    """Refresh planner statistics and reclaim free pages if worthwhile"""
+    with app.app_context():
+        engine = db.engine
+        # VACUUM cannot run inside a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if _is_sqlite(engine):
+                # Extra steps registered by other modules, e.g. search index merging
+                extra = [task(conn) for task in app.extensions.get("maintenance_tasks", ())]
+                conn.execute(text("PRAGMA optimize"))
+                conn.execute(text("ANALYZE"))
+                page_count = conn.execute(text("PRAGMA page_count")).scalar() or 0
+                freelist = conn.execute(text("PRAGMA freelist_count")).scalar() or 0
+                vacuumed = page_count > 0 and freelist / page_count >= app.config["DB_VACUUM_FREE_RATIO"]
+                if vacuumed:
+                    conn.execute(text("VACUUM"))
+                conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+                return "\n".join([f"✅ ANALYZE done, {freelist}/{page_count} free pages, vacuumed={vacuumed}", *extra])
+
+            conn.execute(text("ANALYZE"))
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("VACUUM (ANALYZE)"))
+            return f"✅ ANALYZE done on {engine.dialect.name}"
+
+
+def start_maintenance_scheduler(app, db, interval):
+    """Run maintenance every `interval` seconds on a daemon thread"""
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                print(run_maintenance(app, db))
+            except Exception as e:
+                print(f"⚠️ Database maintenance failed: {e}")
+
+    thread = threading.Thread(target=loop, name="db-maintenance", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,97 @@
+"""Registry of detection and preview functions, imported on first use.
+
+The plagiarism checker pulls in cv2, scikit-image, imagehash and PyMuPDF, and
+reports need reportlab. Together they cost seconds of import time and hundreds
+of MB per process, so nothing here is imported until a function is first
+called. Processes that only serve logins and dashboards never pay for them.
+Detection workers, or a gunicorn master with --preload, can call preload()
+to load them once up front.
+"""
+import importlib
+import importlib.util
+import threading
+
+from metrics import record_cache
+
+# name -> (module, attribute)
+_REGISTRY = {
+    "extract_text": ("plagiarism.plagiarism_checker", "extract_text"),
+    "check_file_plagiarism": ("plagiarism.plagiarism_checker", "check_file_plagiarism"),
+    "check_text_plagiarism": ("plagiarism.plagiarism_checker", "check_text_plagiarism"),
+    "detect_ai_content": ("utils.ai_detection", "detect_ai_content"),
+    "generate_file_preview": ("utils.file_preview", "generate_file_preview"),
+    "get_file_info": ("utils.file_preview", "get_file_info"),
+    "init_mail": ("utils.email_service", "init_mail"),
+    "pdf_canvas": ("reportlab.pdfgen.canvas", "Canvas"),
+    "letter_pagesize": ("reportlab.lib.pagesizes", "letter"),
+}
+
+_loaded = {}
+_missing = set()
+_lock = threading.Lock()
+
+
+def register(name, module, attribute):
+    """Add or replace a lazily imported detector"""
+    with _lock:
+        _REGISTRY[name] = (module, attribute)
+        _loaded.pop(name, None)
+
+
+def get(name):
+    """Return the named function, importing its module on first use"""
+    try:
+        function = _loaded[name]
+        record_cache("detectors", True)
+        return function
+    except KeyError:
+        record_cache("detectors", False)
+    module, attribute = _REGISTRY[name]
+    with _lock:
+        if name not in _loaded:
+            _loaded[name] = getattr(importlib.import_module(module), attribute)
+        return _loaded[name]
+
+
+def available(name):
+    """True if the detector's module can be imported in this environment"""
+    try:
+        get(name)
+        return True
+    except ImportError:
+        return False
+
+
+def module_of(name):
+    """Module the named detector is imported from"""
+    return _REGISTRY[name][0]
+
+
+def installed(name):
+    """True if the detector's package is installed; nothing is imported to find out.
+
+    Only the top-level package is looked up. A module that is present but
+    fails to import is caught when it is first used, see optional().
+    """
+    if name in _loaded:
+        return True
+    try:
+        return importlib.util.find_spec(_REGISTRY[name][0].split(".")[0]) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def optional(name):
+    """The named function, or None if it can't be imported here; warns once per detector"""
+    try:
+        return get(name)
+    except ImportError as e:
+        if name not in _missing:
+            _missing.add(name)
+            print(f"⚠️ {name} not available, skipping it: {e}")
+        return None
+
+
+def preload(names=None):
+    """Import detectors now, e.g. in detection workers or before forking; returns those that loaded"""
+    return [name for name in (names or list(_REGISTRY)) if available(name)]
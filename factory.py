@@ -0,0 +1,142 @@
+"""Application factory: one app, with feature modules switched on per profile.
+
+    app = create_app("minimal")
+    app = create_app("full", APP_FEATURES="-ai")
+
+Profiles are defined in features.py. The old app_*.py entry points are now
+thin wrappers that call create_app() with their profile.
+"""
+import gc
+import os
+
+from flask import Flask
+from sqlalchemy.orm import configure_mappers
+
+import detectors
+import views
+from changes import init_changes
+from compression import init_compression
+from config import Config
+from db_profile import init_db_profile
+from features import PROFILES, resolve_features, unavailable_features
+from live import init_live
+from metrics import init_metrics
+from models import db
+from pipeline import init_pipeline
+from progress import init_progress
+from profiling import init_profiling
+from query_audit import init_query_audit
+from schema import init_schema
+from search import init_search
+from serialization import init_json
+from submission_text import init_submission_text
+
+
+def create_app(profile=None, **overrides):
+    """Build an app for `profile` (default: APP_PROFILE or "full"); overrides are config keys"""
+    profile = profile or os.environ.get("APP_PROFILE", "full")
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["UPLOAD_FOLDER"] = "uploads"
+    app.config["REPORT_FOLDER"] = "reports"
+    app.config["MAX_CONTENT_LENGTH"] = views.MAX_FILE_SIZE
+    app.config.update(overrides)
+    init_json(app)
+
+    features = resolve_features(profile, app.config.get("APP_FEATURES"))
+    if PROFILES[profile].get("plagiarism_module"):
+        for name in ("extract_text", "check_file_plagiarism", "check_text_plagiarism"):
+            detectors.register(name, PROFILES[profile]["plagiarism_module"], name)
+    # Degraded mode: run without the features whose packages aren't installed here
+    for name, missing in sorted(unavailable_features(features).items()):
+        print(f"⚠️ Feature '{name}' disabled, not installed: {', '.join(sorted({detectors.module_of(d) for d in missing}))}")
+        features -= {name}
+    app.config["APP_PROFILE"] = profile
+    app.config["FEATURES"] = features
+    app.config["TEMPLATES"] = dict(PROFILES[profile]["templates"])
+
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+    os.makedirs(app.config["REPORT_FOLDER"], exist_ok=True)
+
+    # Initialize db with app
+    db.init_app(app)
+    init_db_profile(app, db)
+    # Older databases get the new columns before any trigger or query uses them
+    init_schema(app)
+    init_metrics(app)
+    init_query_audit(app, db)
+    init_profiling(app)
+    init_compression(app)
+    init_submission_text(app)
+    # Registers a per-connection SQL function, so it comes before anything connects
+    init_search(app)
+    init_changes(app)
+    init_live(app)
+    init_progress(app)
+
+    # Email service, the outbox dispatcher that sends through it and deadline reminders
+    if "email" in features:
+        from outbox import init_outbox
+        from reminders import init_reminders
+        detectors.get("init_mail")(app)
+        init_outbox(app)
+        init_reminders(app)
+
+    # Inline detection is capped per process and per assignment; overflow is queued
+    init_pipeline(app)
+
+    views.init_app(app)
+    if "api" in features:
+        from api import api
+        app.register_blueprint(api)
+
+    return app
+
+
+# -------------------
+# Pre-fork (gunicorn --preload)
+# -------------------
+def warm_up(app):
+    """Do one-off work in the master so forked workers share it copy-on-write.
+
+    Imports the detection stacks the profile uses, compiles templates and
+    configures mappers, then moves everything allocated so far into the
+    permanent GC generation so collections in the workers don't touch (and
+    copy) those pages.
+    """
+    names = []
+    if "plagiarism" in app.config["FEATURES"]:
+        names += ["extract_text", "check_file_plagiarism", "check_text_plagiarism"]
+    if "ai" in app.config["FEATURES"]:
+        names.append("detect_ai_content")
+    if "reports" in app.config["FEATURES"]:
+        names += ["pdf_canvas", "letter_pagesize"]
+    if "preview" in app.config["FEATURES"]:
+        names += ["generate_file_preview", "get_file_info"]
+    loaded = detectors.preload(names) if names else []
+
+    with app.app_context():
+        configure_mappers()
+        templates = set(app.config["TEMPLATES"].values())
+        try:
+            templates.update(app.jinja_env.list_templates())
+        except TypeError:
+            pass  # loader can't enumerate, compile the page templates only
+        for name in sorted(templates):
+            try:
+                app.jinja_env.get_template(name)
+            except Exception as e:
+                print(f"⚠️ Template {name} not precompiled: {e}")
+        # Connections must not be shared with the workers
+        db.engine.dispose()
+
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+
+def after_fork(app):
+    """Per-worker setup after a pre-loaded fork"""
+    with app.app_context():
+        # Drop pooled connections inherited from the master without closing them under its feet
+        db.engine.dispose(close=False)
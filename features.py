@@ -0,0 +1,82 @@
+"""Feature profiles for the app factory.
+
+Each profile is the set of optional feature modules one of the old app_*.py
+variants shipped with, plus the templates it rendered. APP_FEATURES adjusts a
+profile without editing code, e.g. "-ai,-preview" or "+email". A feature whose
+modules aren't installed is switched off when the app is created, as the old
+variants did with their try/except imports.
+"""
+from flask import current_app
+
+import detectors
+
+FEATURES = ("plagiarism", "ai", "reports", "email", "preview", "api")
+
+DEFAULT_TEMPLATES = {
+    "dashboard": "dashboard_analytics.html",
+    "student_dashboard": "student_dashboard.html",
+    "submission_form": "submission_form.html",
+}
+
+COMPLETE_TEMPLATES = {
+    "dashboard": "dashboard_complete.html",
+    "student_dashboard": "student_dashboard_complete.html",
+    "submission_form": "submission_form_complete.html",
+}
+
+PROFILES = {
+    "full": {"features": set(FEATURES), "templates": DEFAULT_TEMPLATES},
+    "complete": {"features": set(FEATURES), "templates": COMPLETE_TEMPLATES},
+    # Same as "complete" but with the checker that avoids the image stack
+    "complete_fixed": {
+        "features": set(FEATURES),
+        "templates": COMPLETE_TEMPLATES,
+        "plagiarism_module": "plagiarism.plagiarism_checker_simple",
+    },
+    "minimal": {"features": {"plagiarism", "ai", "reports"}, "templates": DEFAULT_TEMPLATES},
+    "basic": {"features": set(), "templates": DEFAULT_TEMPLATES},
+}
+
+
+def resolve_features(profile, spec=None):
+    """Return the profile's features adjusted by a "+name,-name" spec"""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown app profile '{profile}', expected one of {', '.join(PROFILES)}")
+    features = set(PROFILES[profile]["features"])
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name = item.lstrip("+-")
+        if name not in FEATURES:
+            raise ValueError(f"Unknown feature '{name}', expected one of {', '.join(FEATURES)}")
+        if item.startswith("-"):
+            features.discard(name)
+        else:
+            features.add(name)
+    return frozenset(features)
+
+
+# Registry names (detectors.py) each feature calls; the email feature also needs Flask-Mail
+FEATURE_DETECTORS = {
+    "plagiarism": ("extract_text", "check_file_plagiarism", "check_text_plagiarism"),
+    "ai": ("detect_ai_content",),
+    "reports": ("pdf_canvas", "letter_pagesize"),
+    "email": ("init_mail",),
+    "preview": ("generate_file_preview", "get_file_info"),
+}
+
+
+def unavailable_features(features):
+    """{feature: [missing detector names]} for the features whose modules aren't installed"""
+    missing = {}
+    for name in features:
+        absent = [detector for detector in FEATURE_DETECTORS.get(name, ()) if not detectors.installed(detector)]
+        if absent:
+            missing[name] = absent
+    return missing
+
+
+def enabled(name):
+    """True if the feature is switched on for the current app"""
+    return name in current_app.config.get("FEATURES", FEATURES)
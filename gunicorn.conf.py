@@ -0,0 +1,51 @@
+"""gunicorn settings: load the app once in the master, then fork the workers.
+
+    APP_PROFILE=full gunicorn -c gunicorn.conf.py app:app
+
+With preload_app the detection stacks, templates and mappers are imported in
+the master (factory.warm_up) and shared copy-on-write by every worker.
+"""
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+# Live dashboard and progress streams each hold a thread: LIVE_MAX_STREAMS (2) +
+# PROGRESS_MAX_STREAMS (2) + 4 left for ordinary requests
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+preload_app = True
+
+# Multiprocess metrics start from an empty directory, stale files from the last run
+# would be summed in. This runs when the config is read, before the app is preloaded.
+_metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if _metrics_dir:
+    os.makedirs(_metrics_dir, exist_ok=True)
+    for _name in os.listdir(_metrics_dir):
+        os.remove(os.path.join(_metrics_dir, _name))
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded and before workers are forked"""
+    import factory
+    app = server.app.wsgi()
+    loaded = factory.warm_up(app)
+    server.log.info("Preloaded detectors: %s", ", ".join(loaded) or "none")
+    streams = app.config.get("LIVE_MAX_STREAMS", 0) + app.config.get("PROGRESS_MAX_STREAMS", 0)
+    if streams >= server.cfg.threads:
+        server.log.warning("LIVE_MAX_STREAMS + PROGRESS_MAX_STREAMS = %d leaves no threads for ordinary "
+                           "requests; raise GUNICORN_THREADS above %d", streams, server.cfg.threads)
+
+
+def post_fork(server, worker):
+    import factory
+    factory.after_fork(worker.app.wsgi())
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges from /metrics"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        try:
+            from prometheus_client import multiprocess
+        except ImportError:
+            return
+        multiprocess.mark_process_dead(worker.pid)
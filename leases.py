@@ -0,0 +1,40 @@
+"""Database leases that let exactly one process run a singleton background job"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SchedulerLease
+
+
+def acquire_lease(name, holder, ttl_seconds):
+    """Take or renew the lease `name` for `holder`; returns True while we hold it"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    result = db.session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name,
+               or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now))
+        .values(holder=holder, expires_at=expires_at)
+    )
+    if result.rowcount:
+        db.session.commit()
+        return True
+
+    if db.session.get(SchedulerLease, name) is not None:
+        db.session.rollback()
+        return False
+    try:
+        db.session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Another process created the lease first
+        db.session.rollback()
+        return False
+
+
+def release_lease(name, holder):
+    """Give the lease up early so another process can take over without waiting for expiry"""
+    SchedulerLease.query.filter_by(name=name, holder=holder).delete(synchronize_session=False)
+    db.session.commit()
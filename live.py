@@ -0,0 +1,278 @@
+"""Live dashboard updates over Server-Sent Events.
+
+GET /dashboard/live streams the logged-in teacher's submission and
+assignment changes as small JSON events: "submitted", "detection",
+"graded", "updated", "deleted" and "assignment". Each event's id is its
+change-log seq. A reconnecting browser sends Last-Event-ID and resumes
+exactly where it stopped.
+
+The change log (changes.py) is the source of truth. One poller thread per
+process reads new change_log rows and wakes only the streams of the teachers
+they belong to. A commit in this process wakes the poller at once (the
+in-process pub/sub). Writes from other workers or the CLI are picked up by
+the next LIVE_POLL_INTERVAL poll. An idle stream costs no queries: it sleeps
+until its teacher has a change, sending a keepalive comment every
+LIVE_KEEPALIVE_SECONDS.
+
+Each open stream holds a server thread. Streams end after
+LIVE_STREAM_SECONDS (the browser reconnects by itself), and at most
+LIVE_MAX_STREAMS are open per process. Submission progress streams have
+their own pool (progress.py), so GUNICORN_THREADS must cover both pools
+plus ordinary requests.
+"""
+import threading
+import time
+from collections import Counter
+
+from flask import Response, current_app, has_app_context, jsonify, request, session
+from sqlalchemy import event, select
+
+from changes import changes_since, head_seq
+from metrics import LIVE_STREAMS
+from models import ChangeLog, db
+
+DETECTION_FIELDS = {"status", "stage", "plagiarism", "ai_detected", "detection_completeness", "report_path"}
+GRADE_FIELDS = {"grade", "feedback"}
+
+
+class LiveFeed:
+    """Per-process pub/sub: topic -> newest change-log seq seen for it.
+
+    A topic nobody waits on is forgotten once it has been quiet for
+    `retention` seconds, so the map holds the recently active teachers and
+    submissions rather than every one the process has ever seen. A waiter
+    reads its cursor just before it waits, so it can't be behind a forgotten
+    change unless that gap exceeds `retention`.
+    """
+
+    def __init__(self, app, poll_interval, retention=120):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._latest = {}
+        self._published = {}  # topic -> monotonic time of its last change
+        self._waiting = Counter()
+        self._pruned = time.monotonic()
+        self._head = None
+        self._changed = threading.Condition()
+        self._wake = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def notify(self):
+        """Something was committed here; poll the change log now"""
+        self._wake.set()
+
+    def publish(self, topic, seq):
+        with self._changed:
+            if seq > self._latest.get(topic, 0):
+                self._latest[topic] = seq
+                self._published[topic] = time.monotonic()
+                self._changed.notify_all()
+
+    def wait(self, topic, after, timeout):
+        """Block until `topic` has a change after seq `after`; False on timeout"""
+        with self._changed:
+            self._waiting[topic] += 1
+            try:
+                return self._changed.wait_for(lambda: self._latest.get(topic, 0) > after, timeout)
+            finally:
+                self._waiting[topic] -= 1
+                if not self._waiting[topic]:
+                    del self._waiting[topic]
+
+    def prune(self, now=None):
+        """Forget topics quiet for `retention` seconds that nobody waits on; returns how many"""
+        now = time.monotonic() if now is None else now
+        with self._changed:
+            stale = [topic for topic, published in self._published.items()
+                     if now - published >= self.retention and topic not in self._waiting]
+            for topic in stale:
+                del self._latest[topic]
+                del self._published[topic]
+            self._pruned = now
+        return len(stale)
+
+    def poll(self):
+        """Publish the change-log rows written since the last poll, by anyone"""
+        with self.app.app_context():
+            if self._head is None:
+                self._head = head_seq()
+                return
+            rows = db.session.execute(
+                select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.teacher_id)
+                .where(ChangeLog.seq > self._head)
+                .order_by(ChangeLog.seq)
+            ).all()
+        for row in rows:
+            if row.teacher_id is not None:
+                self.publish(("teacher", row.teacher_id), row.seq)
+            if row.entity == "submission":
+                self.publish(("submission", row.entity_id), row.seq)
+            self._head = row.seq
+        if time.monotonic() - self._pruned >= self.retention:
+            self.prune()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Live feed poll failed: {e}")
+
+    def start(self):
+        if self._thread:
+            return
+        with self._lock:
+            if self._thread:
+                return
+            self.poll()
+            self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+            self._thread.start()
+
+
+def _after_commit(session):
+    if has_app_context():
+        feed = current_app.extensions.get("live")
+        if feed is not None:
+            feed.notify()
+
+
+def event_name(change):
+    """SSE event type for one coalesced change from changes_since()"""
+    if change["entity"] == "assignment":
+        return "assignment"
+    if change["op"] in ("insert", "delete"):
+        return "submitted" if change["op"] == "insert" else "deleted"
+    fields = set(change["fields"] or ())
+    if fields & GRADE_FIELDS:
+        return "graded"
+    if fields & DETECTION_FIELDS:
+        return "detection"
+    return "updated"
+
+
+def sse(event, data, json, event_id=None):
+    """One Server-Sent Events message"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _cursor(default):
+    """Last-Event-ID from a reconnecting EventSource, else ?since=, else `default`"""
+    for value in (request.headers.get("Last-Event-ID"), request.args.get("since")):
+        if value is not None:
+            try:
+                return max(0, int(value))
+            except ValueError:
+                pass
+    return default
+
+
+def stream_changes(app, feed, topic, since, read, render):
+    """Generator of SSE text for `topic`, from seq `since` until LIVE_STREAM_SECONDS pass.
+
+    `read(cursor)` returns a changes_since() page and `render(page)` the SSE
+    messages for it.
+    """
+    LIVE_STREAMS.inc()
+    try:
+        # Ask the browser to reconnect quickly when the stream ends
+        yield f"retry: {app.config['LIVE_RETRY_MS']}\n\n"
+        deadline = time.monotonic() + app.config["LIVE_STREAM_SECONDS"]
+        cursor = since
+        while True:
+            with app.app_context():
+                page = read(cursor)
+                messages = render(page)
+            cursor = page["next"]
+            if messages:
+                yield messages
+            if page["more"]:
+                continue
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                if feed.wait(topic, cursor, min(app.config["LIVE_KEEPALIVE_SECONDS"], remaining)):
+                    break
+                if time.monotonic() >= deadline:
+                    return
+                # A failed write here is how a closed browser tab is noticed
+                yield ": keepalive\n\n"
+    finally:
+        LIVE_STREAMS.dec()
+
+
+def event_stream_response(body):
+    return Response(body, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: pass events through unbuffered
+    })
+
+
+def dashboard_live():
+    """Server-Sent Events for the logged-in teacher's dashboard"""
+    teacher_id = session.get("teacher_id")
+    if teacher_id is None:
+        return jsonify({"error": "Authentication required"}), 401
+    feed = current_app.extensions.get("live")
+    if feed is None:
+        return jsonify({"error": "Live updates need the change feed (SQLite)"}), 501
+    slots = current_app.extensions["live_slots"]
+    if not slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many live streams, retry later"})
+        response.headers["Retry-After"] = str(current_app.config["LIVE_RETRY_MS"] // 1000 or 1)
+        return response, 503
+
+    try:
+        app = current_app._get_current_object()
+        feed.start()
+        since = _cursor(head_seq())
+        page_size = app.config["CHANGES_PAGE_SIZE"]
+        db.session.remove()  # don't hold this request's connection for the whole stream
+    except Exception:
+        slots.release()
+        raise
+
+    def read(cursor):
+        return changes_since(cursor, page_size, teacher_id=teacher_id)
+
+    def render(page):
+        if page["reset"]:
+            return sse("reset", {"next": page["next"]}, app.json, page["next"])
+        return "".join(
+            sse(event_name(change), {
+                "entity": change["entity"],
+                "id": change["id"],
+                "fields": change["fields"],
+                "record": change["record"],
+            }, app.json, change["seq"])
+            for change in page["changes"]
+        )
+
+    response = event_stream_response(stream_changes(app, feed, ("teacher", teacher_id), since, read, render))
+    # Runs even if the stream never started, unlike a finally in the generator
+    response.call_on_close(slots.release)
+    return response
+
+
+def init_live(app):
+    """Serve /dashboard/live from the change log, woken by commits in this process"""
+    app.config.setdefault("LIVE_POLL_INTERVAL", 2.0)
+    app.config.setdefault("LIVE_KEEPALIVE_SECONDS", 15)
+    app.config.setdefault("LIVE_STREAM_SECONDS", 300)
+    app.config.setdefault("LIVE_MAX_STREAMS", 2)
+    app.config.setdefault("LIVE_RETRY_MS", 3000)
+    # Seconds a quiet teacher's or submission's topic is kept for late waiters
+    app.config.setdefault("LIVE_TOPIC_RETENTION", 120)
+
+    app.add_url_rule("/dashboard/live", "dashboard_live", dashboard_live)
+    if not app.extensions.get("changes"):
+        return
+    app.extensions["live"] = LiveFeed(app, app.config["LIVE_POLL_INTERVAL"], app.config["LIVE_TOPIC_RETENTION"])
+    app.extensions["live_slots"] = threading.BoundedSemaphore(app.config["LIVE_MAX_STREAMS"])
+    if not event.contains(db.session, "after_commit", _after_commit):
+        event.listen(db.session, "after_commit", _after_commit)
@@ -0,0 +1,148 @@
+"""Prometheus metrics for the web tier, the submission pipeline and the outbox.
+
+Metrics are module-level and cheap to update (a lock and a float add per
+observation). If PROMETHEUS_MULTIPROC_DIR is set before start-up,
+prometheus_client keeps each process's values in mmap'd files in that
+directory and /metrics adds up every gunicorn worker. gunicorn.conf.py empties
+the directory on start and marks dead workers. Without prometheus_client
+installed every metric is a no-op and /metrics is not registered.
+"""
+import hmac
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Response, abort, current_app, g, request
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client import multiprocess
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+
+
+class _NoopMetric:
+    """Stand-in with the prometheus_client interface used below"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+
+if not METRICS_AVAILABLE:
+    Counter = Gauge = Histogram = _NoopMetric
+
+STAGES = ("save", "hash", "extract", "plagiarism", "ai", "report", "commit", "notify")
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "educheck_pipeline_stage_seconds", "Time spent in each submission pipeline stage",
+    ["stage"], buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "educheck_http_request_seconds", "Request latency by endpoint", ["method", "endpoint"]
+)
+REQUESTS_TOTAL = Counter(
+    "educheck_http_requests_total", "Requests by endpoint and status", ["method", "endpoint", "status"]
+)
+REQUEST_QUERIES = Histogram(
+    "educheck_http_request_queries", "SQL statements per request by endpoint", ["endpoint"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+SUBMISSIONS_TOTAL = Counter(
+    "educheck_submissions_total", "Submissions by admission path (inline or queued)", ["path"]
+)
+DETECTION_QUEUE_DEPTH = Gauge(
+    "educheck_detection_queue_depth", "Submissions waiting in detection queues", multiprocess_mode="livesum"
+)
+DETECTION_WORKERS = Gauge(
+    "educheck_detection_workers", "Detection worker threads", multiprocess_mode="livesum"
+)
+DETECTION_WORKERS_BUSY = Gauge(
+    "educheck_detection_workers_busy", "Detection worker threads processing a submission", multiprocess_mode="livesum"
+)
+LIVE_STREAMS = Gauge(
+    "educheck_live_streams", "Open Server-Sent Events streams", multiprocess_mode="livesum"
+)
+CACHE_REQUESTS_TOTAL = Counter(
+    "educheck_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ["cache", "result"]
+)
+SMTP_MESSAGES_TOTAL = Counter(
+    "educheck_smtp_messages_total", "Outbox delivery outcomes (sent, retry, failed, rate_limited)", ["outcome"]
+)
+SMTP_CONNECTION_ERRORS_TOTAL = Counter(
+    "educheck_smtp_connection_errors_total", "SMTP connections that failed mid-batch"
+)
+
+# Export every stage from the start, not only once it has been hit
+for _stage in STAGES:
+    PIPELINE_STAGE_SECONDS.labels(_stage)
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage into educheck_pipeline_stage_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS_TOTAL.labels(cache, "hit" if hit else "miss").inc()
+
+
+def metrics_view():
+    """Prometheus text exposition, aggregated over all worker processes"""
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    """Time every request and expose /metrics"""
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_TOKEN", None)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    if not METRICS_AVAILABLE:
+        print("⚠️ prometheus_client not installed, /metrics disabled")
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            # Endpoint names, not paths, keep the label set bounded
+            endpoint = request.endpoint or "unmatched"
+            REQUEST_SECONDS.labels(request.method, endpoint).observe(time.perf_counter() - started)
+            REQUESTS_TOTAL.labels(request.method, endpoint, str(response.status_code)).inc()
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
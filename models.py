@@ -1,22 +1,44 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+import zlib
 
 db = SQLAlchemy()
 
+
+def compress_text(value):
+    return None if value is None else zlib.compress(value.encode("utf-8"))
+
+
+def decompress_text(value):
+    return None if value is None else zlib.decompress(value).decode("utf-8")
+
+
+class CompressedText(db.TypeDecorator):
+    """Text stored zlib-compressed; str in Python, bytes in the database"""
+    impl = db.LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
 class Teacher(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)  # hashed password
     name = db.Column(db.String(120), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    immediate_alerts = db.Column(db.Boolean, default=False)  # opt out of digest emails
 
 
 class Assignment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    due_date = db.Column(db.DateTime, nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     teacher_id = db.Column(db.Integer, db.ForeignKey("teacher.id"), nullable=False)
     submissions = db.relationship("Submission", backref="assignment", lazy=True)
@@ -31,6 +53,13 @@ class Student(db.Model):
 
 
 class Submission(db.Model):
+    __table_args__ = (
+        # Serves per-student dashboard lookups and the latest-per-assignment window query
+        db.Index("ix_submission_student_assignment", "student_id", "assignment_id", "submitted_at"),
+        # A retried POST finds the submission it already created (NULL keys never collide)
+        db.Index("ux_submission_idempotency", "assignment_id", "idempotency_key", unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     student_name = db.Column(db.String(120), nullable=False)
     student_email = db.Column(db.String(120), nullable=True)
@@ -41,11 +70,59 @@ class Submission(db.Model):
     plagiarism = db.Column(db.Integer, default=0)
     ai_detected = db.Column(db.Boolean, default=False)
     file_path = db.Column(db.String(300), nullable=True)
-    text_content = db.Column(db.Text, nullable=True)
     assignment_id = db.Column(db.Integer, db.ForeignKey("assignment.id"), nullable=False)
     student_id = db.Column(db.Integer, db.ForeignKey("student.id"), nullable=True)
     grade = db.Column(db.String(10), nullable=True)
-    feedback = db.Column(db.Text, nullable=True)
+    needs_review = db.Column(db.Boolean, default=False)  # flagged for manual plagiarism review
+    report_path = db.Column(db.String(300), nullable=True)
+    status = db.Column(db.String(20), default="processed")  # queued, processing, processed, failed
+    claimed_at = db.Column(db.DateTime, nullable=True)  # when a detection worker took it for processing
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 for exact duplicates
+    # "provisional" while expensive detectors are deferred under load, "running" during catch-up
+    detection_completeness = db.Column(db.String(20), default="complete")
+    # Pipeline step for progress streams: queued, hash, plagiarism, ai, report, done
+    stage = db.Column(db.String(20), nullable=True)
+    idempotency_key = db.Column(db.String(64), nullable=True)  # SHA-256 of the client's key or the upload
+    # Large text lives in SubmissionBody. These are the old in-row columns, read only as a
+    # fallback until `flask migrate-submission-text` has moved and emptied them.
+    legacy_text_content = db.deferred(db.Column("text_content", db.Text, nullable=True))
+    legacy_feedback = db.deferred(db.Column("feedback", db.Text, nullable=True))
+    body = db.relationship("SubmissionBody", uselist=False, lazy="select", cascade="all, delete-orphan")
+
+    def _body(self):
+        if self.body is None:
+            self.body = SubmissionBody()
+        return self.body
+
+    @property
+    def text_content(self):
+        if self.body is not None and self.body.text_content is not None:
+            return self.body.text_content
+        return self.legacy_text_content
+
+    @text_content.setter
+    def text_content(self, value):
+        self._body().text_content = value
+        self.legacy_text_content = None
+
+    @property
+    def feedback(self):
+        if self.body is not None and self.body.feedback is not None:
+            return self.body.feedback
+        return self.legacy_feedback
+
+    @feedback.setter
+    def feedback(self, value):
+        self._body().feedback = value
+        self.legacy_feedback = None
+
+    @property
+    def extracted_text(self):
+        return self.body.extracted_text if self.body is not None else None
+
+    @extracted_text.setter
+    def extracted_text(self, value):
+        self._body().extracted_text = value
 
     def to_dict(self):
         return {
@@ -61,5 +138,89 @@ class Submission(db.Model):
             "report_path": getattr(self, 'report_path', None),
             "assignment_id": self.assignment_id,
             "grade": self.grade,
-            "feedback": self.feedback
+            "feedback": self.feedback,
+            "needs_review": self.needs_review,
+            "status": self.status,
+            "detection_completeness": self.detection_completeness
         }
+
+
+class SubmissionBody(db.Model):
+    """Pasted text and feedback of a submission, out of the hot submission row and compressed"""
+    submission_id = db.Column(db.Integer, db.ForeignKey("submission.id"), primary_key=True)
+    text_content = db.Column(CompressedText, nullable=True)
+    feedback = db.Column(CompressedText, nullable=True)
+    # Text extracted from the uploaded file, kept for full-text search (search.py)
+    extracted_text = db.deferred(db.Column(CompressedText, nullable=True))
+
+
+class ChangeLog(db.Model):
+    """One row per write to a submission or assignment, numbered in commit order (changes.py)"""
+    # AUTOINCREMENT: sequence numbers are never reused, even after pruning
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # submission, assignment
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False)  # insert, update, delete
+    fields = db.Column(db.String(400), nullable=True)  # comma-separated columns changed by an update
+    teacher_id = db.Column(db.Integer, nullable=True)  # owner of the assignment
+    student_id = db.Column(db.Integer, nullable=True)
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class EmailOutbox(db.Model):
+    """Outgoing email written in the same transaction as the change that triggered it"""
+    __table_args__ = (
+        db.Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)  # feedback, late_submission, plagiarism, ...
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(64), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+
+class PendingAlert(db.Model):
+    """Teacher alert buffered until its (teacher, assignment) digest window closes"""
+    __table_args__ = (
+        db.Index("ix_pending_alert_group", "teacher_id", "assignment_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    teacher_id = db.Column(db.Integer, db.ForeignKey("teacher.id"), nullable=False)
+    assignment_id = db.Column(db.Integer, db.ForeignKey("assignment.id"), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # late_submission, plagiarism
+    student_name = db.Column(db.String(120), nullable=False)
+    plagiarism_score = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class ReminderSent(db.Model):
+    """One row per deadline reminder batch, so no process sends the same reminder twice"""
+    assignment_id = db.Column(db.Integer, db.ForeignKey("assignment.id"), primary_key=True)
+    offset_minutes = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Integer, nullable=False, default=0)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SchedulerLease(db.Model):
+    """Named lease held by at most one process at a time for singleton background jobs"""
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+class RevokedToken(db.Model):
+    """API bearer tokens revoked before their expiry"""
+    jti = db.Column(db.String(32), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,163 @@
+"""Notification emails, queued into the outbox inside the caller's transaction.
+
+Nothing here talks to SMTP: rows are added to the current session and become
+visible to the dispatcher (outbox.py) only when the caller commits, so a
+rolled-back grade or submission never sends an email.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func
+
+from features import enabled
+from models import db, EmailOutbox, PendingAlert, Teacher, Assignment
+
+
+def _row(kind, recipient, subject, body):
+    now = datetime.utcnow()
+    return {
+        "kind": kind,
+        "recipient": recipient,
+        "subject": subject,
+        "body": body,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    }
+
+
+def _insert(rows):
+    """Add outbox rows to the session; a no-op when the email feature is off"""
+    if not rows or not enabled("email"):
+        return 0
+    db.session.bulk_insert_mappings(EmailOutbox, rows)
+    return len(rows)
+
+
+def _feedback_row(email, name, assignment_title, grade, feedback):
+    body = (
+        f"Hello {name},\n\n"
+        f"Your submission for '{assignment_title}' has been reviewed.\n\n"
+        f"Grade: {grade or 'Not graded'}\n"
+        f"Feedback: {feedback or 'No feedback provided'}\n"
+    )
+    return _row("feedback", email, f"Feedback available: {assignment_title}", body)
+
+
+def queue_feedback_notification(email, name, assignment_title, grade, feedback):
+    """Queue a feedback email for one student"""
+    _insert([_feedback_row(email, name, assignment_title, grade, feedback)])
+
+
+def queue_feedback_notifications(recipients, grade, feedback):
+    """Queue one feedback email per (email, name, assignment_title) as a single batch insert"""
+    rows = [_feedback_row(email, name, title, grade, feedback) for email, name, title in recipients if email]
+    return _insert(rows)
+
+
+def queue_graded_notifications(graded):
+    """Queue one feedback email per (email, name, assignment_title, grade, feedback) as a single batch insert"""
+    rows = [_feedback_row(email, name, title, grade, feedback) for email, name, title, grade, feedback in graded if email]
+    return _insert(rows)
+
+
+def queue_deadline_reminders(recipients, assignment_title, due_date):
+    """Queue a deadline reminder per (email, name) as a single batch insert"""
+    rows = [_row(
+        "deadline_reminder",
+        email,
+        f"Reminder: {assignment_title} is due {due_date:%d %b %Y %I:%M %p} UTC",
+        f"Hello {name},\n\n"
+        f"You have not submitted '{assignment_title}' yet. It is due on {due_date:%d %b %Y at %I:%M %p} UTC.\n"
+    ) for email, name in recipients if email]
+    return _insert(rows)
+
+
+def queue_late_submission_alert(teacher_email, teacher_name, student_name, assignment_title):
+    """Queue a late-submission alert for the assignment's teacher"""
+    body = (
+        f"Hello {teacher_name},\n\n"
+        f"{student_name} submitted '{assignment_title}' after the due date.\n"
+    )
+    _insert([
+        _row("late_submission", teacher_email, f"Late submission: {assignment_title}", body)
+    ])
+
+
+def queue_plagiarism_alert(teacher_email, teacher_name, student_name, assignment_title, plagiarism_score):
+    """Queue a high-plagiarism alert for the assignment's teacher"""
+    body = (
+        f"Hello {teacher_name},\n\n"
+        f"{student_name}'s submission for '{assignment_title}' scored "
+        f"{plagiarism_score}% on the plagiarism check and may need review.\n"
+    )
+    _insert([
+        _row("plagiarism", teacher_email, f"Plagiarism alert: {assignment_title}", body)
+    ])
+
+
+def record_teacher_alert(teacher, assignment, kind, student_name, plagiarism_score=None):
+    """Buffer a late/plagiarism alert for the digest, or queue it now for teachers who opted in"""
+    if not enabled("email"):
+        return
+    if teacher.immediate_alerts or not current_app.config.get("ALERT_DIGEST_WINDOW"):
+        if kind == "late_submission":
+            queue_late_submission_alert(teacher.email, teacher.name, student_name, assignment.title)
+        else:
+            queue_plagiarism_alert(teacher.email, teacher.name, student_name, assignment.title, plagiarism_score)
+        return
+    db.session.add(PendingAlert(
+        teacher_id=teacher.id,
+        assignment_id=assignment.id,
+        kind=kind,
+        student_name=student_name,
+        plagiarism_score=plagiarism_score
+    ))
+
+
+def _digest_row(teacher, assignment_title, alerts):
+    late = [a for a in alerts if a.kind == "late_submission"]
+    flagged = [a for a in alerts if a.kind == "plagiarism"]
+    lines = [f"Hello {teacher.name},", "", f"Activity on '{assignment_title}' since {alerts[0].created_at:%Y-%m-%d %H:%M} UTC:", ""]
+    if late:
+        lines.append(f"Late submissions ({len(late)}):")
+        lines.extend(f"  - {a.student_name} at {a.created_at:%Y-%m-%d %H:%M}" for a in late)
+        lines.append("")
+    if flagged:
+        lines.append(f"High plagiarism scores ({len(flagged)}):")
+        lines.extend(f"  - {a.student_name}: {a.plagiarism_score}%" for a in flagged)
+        lines.append("")
+    subject = f"{len(alerts)} alerts for {assignment_title}"
+    return _row("alert_digest", teacher.email, subject, "\n".join(lines))
+
+
+def flush_alert_digests():
+    """Turn every buffered group whose window has closed into one outbox message.
+
+    Returns the number of digests queued. Safe to run from several processes:
+    a group is only emitted by the flusher whose DELETE removes all of its alerts.
+    """
+    window_minutes = current_app.config.get("ALERT_DIGEST_WINDOW") or 0
+    cutoff = datetime.utcnow() - timedelta(minutes=window_minutes)
+    due_groups = db.session.query(PendingAlert.teacher_id, PendingAlert.assignment_id) \
+        .group_by(PendingAlert.teacher_id, PendingAlert.assignment_id) \
+        .having(func.min(PendingAlert.created_at) <= cutoff).all()
+
+    queued = 0
+    for teacher_id, assignment_id in due_groups:
+        alerts = PendingAlert.query.filter_by(teacher_id=teacher_id, assignment_id=assignment_id) \
+            .order_by(PendingAlert.created_at).all()
+        ids = [a.id for a in alerts]
+        deleted = PendingAlert.query.filter(PendingAlert.id.in_(ids)).delete(synchronize_session=False)
+        if deleted != len(ids):
+            # Another process flushed this group concurrently
+            db.session.rollback()
+            continue
+        teacher = Teacher.query.get(teacher_id)
+        assignment_title = db.session.query(Assignment.title).filter_by(id=assignment_id).scalar()
+        if teacher and teacher.email:
+            _insert([_digest_row(teacher, assignment_title, alerts)])
+            queued += 1
+        db.session.commit()
+    return queued
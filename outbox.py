@@ -0,0 +1,198 @@
+"""Background dispatcher that drains the email outbox over one kept-alive SMTP connection"""
+import os
+import random
+import smtplib
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask_mail import Mail, Message
+from sqlalchemy import or_, and_, update
+
+from metrics import SMTP_CONNECTION_ERRORS_TOTAL, SMTP_MESSAGES_TOTAL
+from models import db, EmailOutbox
+from notifications import flush_alert_digests
+from ratelimit import KeyedBuckets
+
+# Failures that only concern one message; anything else is treated as a broken connection
+_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+def _domain(address):
+    return address.rsplit("@", 1)[-1].lower()
+
+
+class OutboxDispatcher:
+    """Claims due outbox rows and sends them in batches, safe to run in several processes"""
+
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.batch_size = config["OUTBOX_BATCH_SIZE"]
+        self.poll_interval = config["OUTBOX_POLL_INTERVAL"]
+        self.max_attempts = config["OUTBOX_MAX_ATTEMPTS"]
+        self.backoff_base = config["OUTBOX_BACKOFF_BASE"]
+        self.backoff_max = config["OUTBOX_BACKOFF_MAX"]
+        self.claim_timeout = config["OUTBOX_CLAIM_TIMEOUT"]
+
+        def bucket(per_minute):
+            # Allow a burst of ten seconds' worth of messages
+            return per_minute / 60.0, max(1, per_minute // 6)
+
+        self.domains = KeyedBuckets(
+            *bucket(config["MAIL_DOMAIN_RATE_PER_MINUTE"]),
+            overrides={domain: bucket(rate) for domain, rate in config["MAIL_DOMAIN_RATE_LIMITS"].items()}
+        )
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _mail(self):
+        return self.app.extensions.get("mail") or Mail(self.app)
+
+    def _claimable(self, now):
+        stale = now - timedelta(seconds=self.claim_timeout)
+        return or_(
+            and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+            # Rows left behind by a dispatcher that died mid-batch
+            and_(EmailOutbox.status == "sending", EmailOutbox.claimed_at < stale)
+        )
+
+    def claim_batch(self):
+        """Atomically mark a batch of due rows as ours and return them"""
+        now = datetime.utcnow()
+        ids = [row.id for row in db.session.query(EmailOutbox.id)
+               .filter(self._claimable(now))
+               .order_by(EmailOutbox.next_attempt_at)
+               .limit(self.batch_size)]
+        if not ids:
+            return []
+        db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(ids), self._claimable(now))
+            .values(status="sending", claimed_by=self.worker_id, claimed_at=now)
+        )
+        db.session.commit()
+        return EmailOutbox.query.filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.claimed_by == self.worker_id,
+            EmailOutbox.status == "sending"
+        ).all()
+
+    def _release(self, row, delay, error=None):
+        row.status = "pending"
+        row.claimed_by = None
+        row.claimed_at = None
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        if error is not None:
+            row.last_error = str(error)[:500]
+
+    def _retry(self, row, error):
+        row.attempts += 1
+        if row.attempts >= self.max_attempts:
+            row.status = "failed"
+            row.claimed_by = None
+            row.last_error = str(error)[:500]
+            SMTP_MESSAGES_TOTAL.labels("failed").inc()
+            print(f"❌ Giving up on email {row.id} to {row.recipient}: {error}")
+            return
+        SMTP_MESSAGES_TOTAL.labels("retry").inc()
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (row.attempts - 1))
+        self._release(row, delay * random.uniform(1.0, 1.2), error)
+
+    def dispatch_once(self):
+        """Send one batch; returns the number of messages delivered"""
+        with self.app.app_context():
+            flush_alert_digests()
+            rows = self.claim_batch()
+            if not rows:
+                return 0
+
+            sent = 0
+            try:
+                with self._mail().connect() as conn:
+                    for row in rows:
+                        bucket = self.domains.get(_domain(row.recipient))
+                        if not bucket.try_acquire():
+                            # Over the domain's rate: try again later without burning an attempt
+                            self._release(row, bucket.wait_time())
+                            SMTP_MESSAGES_TOTAL.labels("rate_limited").inc()
+                            continue
+                        try:
+                            conn.send(Message(row.subject, recipients=[row.recipient], body=row.body))
+                        except _MESSAGE_ERRORS as e:
+                            self._retry(row, e)
+                            continue
+                        row.status = "sent"
+                        row.sent_at = datetime.utcnow()
+                        row.claimed_by = None
+                        SMTP_MESSAGES_TOTAL.labels("sent").inc()
+                        sent += 1
+            except Exception as e:
+                SMTP_CONNECTION_ERRORS_TOTAL.inc()
+                print(f"❌ SMTP connection failed: {e}")
+                for row in rows:
+                    if row.status == "sending":
+                        self._retry(row, e)
+
+            db.session.commit()
+            return sent
+
+    def run(self):
+        """Dispatch until stopped, sleeping only when the outbox is drained"""
+        while not self._stop.is_set():
+            try:
+                sent = self.dispatch_once()
+            except Exception as e:
+                print(f"❌ Outbox dispatch failed: {e}")
+                sent = 0
+            if not sent:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="outbox-dispatcher", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_outbox(app):
+    """Configure the outbox dispatcher and its CLI command"""
+    app.config.setdefault("OUTBOX_DISPATCHER_ENABLED", True)
+    app.config.setdefault("OUTBOX_BATCH_SIZE", 100)
+    app.config.setdefault("OUTBOX_POLL_INTERVAL", 5)
+    app.config.setdefault("OUTBOX_MAX_ATTEMPTS", 6)
+    app.config.setdefault("OUTBOX_BACKOFF_BASE", 30)
+    app.config.setdefault("OUTBOX_BACKOFF_MAX", 3600)
+    app.config.setdefault("OUTBOX_CLAIM_TIMEOUT", 600)
+    app.config.setdefault("MAIL_DOMAIN_RATE_PER_MINUTE", 120)
+    app.config.setdefault("MAIL_DOMAIN_RATE_LIMITS", {})
+    app.config.setdefault("ALERT_DIGEST_WINDOW", 15)
+
+    dispatcher = OutboxDispatcher(app)
+    app.extensions["outbox"] = dispatcher
+
+    @app.cli.command("outbox-dispatch")
+    @click.option("--once", is_flag=True, help="Send one batch and exit")
+    def outbox_dispatch_command(once):
+        """Run the email outbox dispatcher in the foreground"""
+        if once:
+            click.echo(f"✅ Sent {dispatcher.dispatch_once()} emails")
+        else:
+            dispatcher.run()
+
+    if app.config["OUTBOX_DISPATCHER_ENABLED"]:
+        # Started by the first request so CLI commands and seed scripts don't spawn it
+        @app.before_request
+        def start_outbox_dispatcher():
+            dispatcher.start()
+
+    return dispatcher
@@ -0,0 +1,481 @@
+"""Submission processing pipeline: plagiarism check, AI detection, report and teacher alerts.
+
+A submission row is written as soon as the upload is stored (status "queued").
+Detection then runs either inline, when admission control lets the request
+through, or later on this process's DetectionQueue workers. Either way
+process_submission claims the row first, so each submission is processed once.
+A claim older than DETECTION_CLAIM_TIMEOUT belongs to a worker that died, and
+the row is queued again.
+
+Under load (deep queue or saturated CPU) only the cheap checks run at once and
+the submission's detection_completeness stays "provisional" until the idle
+catch-up pass runs the expensive detectors.
+
+Each step is committed to Submission.stage as it starts, so progress streams
+in any process see it through the change log.
+"""
+import hashlib
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from sqlalchemy import or_, update
+from werkzeug.utils import secure_filename
+
+import detectors
+from admission import AdmissionController
+from features import enabled
+from metrics import DETECTION_QUEUE_DEPTH, DETECTION_WORKERS, DETECTION_WORKERS_BUSY, stage
+from models import db, Teacher, Submission
+from notifications import record_teacher_alert
+
+TEXT_EXTENSIONS = [".txt", ".doc", ".docx", ".pdf"]
+PLAGIARISM_ALERT_THRESHOLD = 50
+
+
+def generate_report_pdf(submission, report_path=None):
+    """Fallback report if highlight PDF is not available"""
+    if report_path is None:
+        report_path = submission.report_path
+
+    letter = detectors.get("letter_pagesize")
+    c = detectors.get("pdf_canvas")(report_path, pagesize=letter)
+    width, height = letter
+
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(100, height - 50, "Plagiarism Report")
+
+    c.setFont("Helvetica", 12)
+    c.drawString(50, height - 100, f"Student: {submission.student_name} ({submission.reg_no})")
+    c.drawString(50, height - 120, f"Email: {submission.student_email}")
+    c.drawString(50, height - 140, f"Assignment: {submission.assignment.title}")
+    c.drawString(50, height - 160, f"Submitted at: {submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S')}")
+    c.drawString(50, height - 180, f"Late: {'Yes' if submission.is_late else 'No'}")
+    c.drawString(50, height - 200, f"Plagiarism Score: {submission.plagiarism}%")
+    c.drawString(50, height - 220, f"AI Detected: {'Yes' if submission.ai_detected else 'No'}")
+
+    c.showPage()
+    c.save()
+
+
+def extract_file_text(file_path):
+    """Text of an uploaded document (None for images, or if extraction fails)"""
+    if os.path.splitext(file_path)[1].lower() not in TEXT_EXTENSIONS:
+        return None
+    try:
+        with stage("extract"):
+            return detectors.get("extract_text")(file_path) or None
+    except Exception:
+        return None
+
+
+def run_detection(file_path, text_data, progress=None, file_text=None):
+    """Return (plagiarism_score, highlight_report, ai_detected) for a file or pasted text.
+
+    Detectors whose feature is switched off for the app, or whose package
+    can't be imported here, are skipped.
+    `progress(stage)` is called as the "plagiarism" and "ai" steps start.
+    Pass `file_text` when the upload's text has already been extracted.
+    """
+    progress = progress or (lambda name: None)
+    plagiarism_score = 0
+    highlight_report = None
+    ai_detected = False
+    detect_ai = detectors.optional("detect_ai_content") if enabled("ai") else None
+
+    if file_path:
+        check_file = detectors.optional("check_file_plagiarism") if enabled("plagiarism") else None
+        if check_file:
+            progress("plagiarism")
+            with stage("plagiarism"):
+                plagiarism_score, highlight_report = check_file(file_path)
+        # If file is text-based, extract text for AI detection
+        if detect_ai and os.path.splitext(file_path)[1].lower() in TEXT_EXTENSIONS:
+            progress("ai")
+            if file_text is None:
+                file_text = extract_file_text(file_path)
+            try:
+                if file_text:
+                    with stage("ai"):
+                        ai_detected = detect_ai(file_text)
+            except Exception as e:
+                ai_detected = False
+    elif text_data:
+        check_text = detectors.optional("check_text_plagiarism") if enabled("plagiarism") else None
+        if check_text:
+            progress("plagiarism")
+            with stage("plagiarism"):
+                plagiarism_score, highlight_report = check_text(text_data)
+        if detect_ai:
+            progress("ai")
+            with stage("ai"):
+                ai_detected = detect_ai(text_data)
+
+    return plagiarism_score, highlight_report, ai_detected
+
+
+def claim_submission(submission_id):
+    """Move a queued submission to processing; False if another worker already has it"""
+    result = db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id, Submission.status == "queued")
+        .values(status="processing", stage="hash", claimed_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def enter_stage(submission, name):
+    """Commit the step a submission is starting so progress streams can report it"""
+    submission.stage = name
+    db.session.commit()
+
+
+def content_hash(file_path, text_data):
+    """SHA-256 of the uploaded file (or pasted text) for exact-duplicate lookups"""
+    digest = hashlib.sha256()
+    if file_path:
+        with open(file_path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                digest.update(chunk)
+    elif text_data:
+        digest.update(text_data.encode("utf-8"))
+    else:
+        return None
+    return digest.hexdigest()
+
+
+def find_exact_duplicate(submission):
+    """Id of an earlier submission with identical content, if any"""
+    if not submission.content_hash:
+        return None
+    return db.session.query(Submission.id).filter(
+        Submission.content_hash == submission.content_hash,
+        Submission.id < submission.id
+    ).order_by(Submission.id).limit(1).scalar()
+
+
+def system_overloaded(queue_depth, max_depth, max_load_per_cpu):
+    """True when the detection backlog or CPU load says expensive checks should wait"""
+    if queue_depth > max_depth:
+        return True
+    try:
+        load = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        # getloadavg is unavailable on Windows
+        return False
+    return load > max_load_per_cpu
+
+
+def _alert_teacher(submission, kind, plagiarism_score=None):
+    assignment = submission.assignment
+    teacher = db.session.get(Teacher, assignment.teacher_id)
+    if teacher and teacher.email:
+        record_teacher_alert(teacher, assignment, kind, submission.student_name, plagiarism_score)
+
+
+def _run_full_detection(submission, report_folder, duplicate_of, progress=None):
+    """Expensive stage: plagiarism/image analysis, AI scoring and the PDF report"""
+    # Extracted once: AI scoring reads it and full-text search indexes it
+    wants_text = enabled("ai") or current_app.extensions.get("search")
+    file_text = extract_file_text(submission.file_path) if submission.file_path and wants_text else None
+    if file_text:
+        submission.extracted_text = file_text
+    plagiarism_score, highlight_report, ai_detected = run_detection(
+        submission.file_path, submission.text_content, progress, file_text
+    )
+    submission.plagiarism = 100 if duplicate_of else int(plagiarism_score)
+    submission.ai_detected = ai_detected
+
+    submission.detection_completeness = "complete"
+    has_highlight = bool(highlight_report) and os.path.exists(highlight_report)
+    if not enabled("reports"):
+        if has_highlight:
+            os.remove(highlight_report)
+        return
+    if not has_highlight and detectors.optional("pdf_canvas") is None:
+        return  # the fallback report needs reportlab
+
+    # Save plagiarism report
+    assignment = submission.assignment
+    report_path = os.path.join(report_folder, f"report_{assignment.id}_{submission.id}_{secure_filename(submission.reg_no or '')}.pdf")
+    if progress:
+        progress("report")
+    with stage("report"):
+        if has_highlight:
+            # Use os.replace to overwrite if file exists
+            os.replace(highlight_report, report_path)
+        else:
+            # fallback simple report
+            generate_report_pdf(submission, report_path=report_path)
+    submission.report_path = report_path
+
+
+def process_submission(submission_id, report_folder, shed=False):
+    """Run detection for a queued submission and store scores, report and alerts.
+
+    With `shed` set only the cheap checks run now and the result is marked
+    provisional; catch_up_submission() finishes it when load allows.
+    """
+    if not claim_submission(submission_id):
+        return None
+    try:
+        return _process_claimed(submission_id, report_folder, shed)
+    except Exception:
+        db.session.rollback()
+        db.session.execute(update(Submission).where(Submission.id == submission_id).values(status="failed"))
+        db.session.commit()
+        raise
+
+
+def _process_claimed(submission_id, report_folder, shed):
+    submission = db.session.get(Submission, submission_id)
+
+    # Cheap checks always run immediately; the upload may have been hashed on arrival
+    with stage("hash"):
+        if not submission.content_hash:
+            submission.content_hash = content_hash(submission.file_path, submission.text_content)
+        duplicate_of = find_exact_duplicate(submission)
+
+    if shed:
+        submission.plagiarism = 100 if duplicate_of else 0
+        submission.detection_completeness = "provisional"
+    else:
+        _run_full_detection(submission, report_folder, duplicate_of, lambda name: enter_stage(submission, name))
+
+    # Teacher alerts are buffered into digests (or queued now) in the same transaction
+    with stage("notify"):
+        if submission.is_late:
+            _alert_teacher(submission, "late_submission")
+        if submission.plagiarism > PLAGIARISM_ALERT_THRESHOLD:
+            _alert_teacher(submission, "plagiarism", submission.plagiarism)
+
+    submission.status = "processed"
+    submission.stage = "done"
+    with stage("commit"):
+        db.session.commit()
+    return submission
+
+
+def catch_up_submission(submission_id, report_folder):
+    """Finish the deferred detectors for a provisional submission"""
+    result = db.session.execute(
+        update(Submission)
+        .where(Submission.id == submission_id, Submission.detection_completeness == "provisional")
+        .values(detection_completeness="running", claimed_at=datetime.utcnow())
+    )
+    db.session.commit()
+    if result.rowcount != 1:
+        return None
+
+    submission = db.session.get(Submission, submission_id)
+    provisional_score = submission.plagiarism
+    try:
+        _run_full_detection(submission, report_folder, find_exact_duplicate(submission))
+        # Alert only if the full check crossed the threshold the provisional pass did not
+        if submission.plagiarism > PLAGIARISM_ALERT_THRESHOLD >= provisional_score:
+            _alert_teacher(submission, "plagiarism", submission.plagiarism)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        db.session.execute(update(Submission).where(Submission.id == submission_id).values(detection_completeness="provisional"))
+        db.session.commit()
+        raise
+    return submission
+
+
+class DetectionQueue:
+    """Per-process worker pool for submissions accepted beyond the inline admission limit"""
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self.shed_queue_depth = app.config["DETECTION_SHED_QUEUE_DEPTH"]
+        self.shed_load_per_cpu = app.config["DETECTION_SHED_LOAD_PER_CPU"]
+        self.catch_up_interval = app.config["DETECTION_CATCH_UP_INTERVAL"]
+        self.claim_timeout = app.config["DETECTION_CLAIM_TIMEOUT"]
+        self.busy = 0
+        self.avg_seconds = 10.0  # moving average of processing time, seeds the ETA
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def depth(self):
+        """Submissions waiting or being processed by this process"""
+        return self._queue.qsize() + self.busy
+
+    def should_shed(self):
+        """Whether expensive detectors should be deferred right now"""
+        return system_overloaded(self.depth(), self.shed_queue_depth, self.shed_load_per_cpu)
+
+    def eta_seconds(self, position):
+        if not position:
+            return round(self.avg_seconds)  # already running
+        return round(self.avg_seconds * position / max(1, self.workers))
+
+    def enqueue(self, submission_id):
+        """Queue a stored submission; returns its position in this process's queue"""
+        self.start()
+        self._queue.put(submission_id)
+        DETECTION_QUEUE_DEPTH.set(self._queue.qsize())
+        return self.depth()
+
+    def record_duration(self, seconds):
+        with self._lock:
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+
+    def _work(self):
+        while True:
+            try:
+                submission_id = self._queue.get(timeout=self.catch_up_interval)
+            except queue.Empty:
+                # Idle: pick up work abandoned by dead workers, then finish deferred detectors
+                self.requeue_stale()
+                self.catch_up()
+                continue
+            DETECTION_QUEUE_DEPTH.set(self._queue.qsize())
+            self._process(submission_id)
+            self._queue.task_done()
+
+    def _process(self, submission_id):
+        with self._lock:
+            self.busy += 1
+        DETECTION_WORKERS_BUSY.inc()
+        started = time.monotonic()
+        with self.app.app_context():
+            try:
+                process_submission(submission_id, self.app.config["REPORT_FOLDER"], shed=self.should_shed())
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Processing submission {submission_id} failed: {e}")
+        self.record_duration(time.monotonic() - started)
+        with self._lock:
+            self.busy -= 1
+        DETECTION_WORKERS_BUSY.dec()
+
+    def run_now(self, submission_id, on_done=None):
+        """Process an admitted submission on its own thread, outside the request that stored it"""
+        def run():
+            try:
+                self._process(submission_id)
+            finally:
+                if on_done is not None:
+                    on_done()
+        threading.Thread(target=run, name=f"detection-now-{submission_id}", daemon=True).start()
+
+    def catch_up(self, limit=10):
+        """Run deferred detectors for provisional submissions while load stays low"""
+        done = 0
+        with self.app.app_context():
+            provisional = [row.id for row in db.session.query(Submission.id)
+                           .filter(Submission.detection_completeness == "provisional")
+                           .order_by(Submission.id).limit(limit)]
+            for submission_id in provisional:
+                if self.should_shed():
+                    break
+                try:
+                    if catch_up_submission(submission_id, self.app.config["REPORT_FOLDER"]):
+                        done += 1
+                except Exception as e:
+                    print(f"❌ Catch-up for submission {submission_id} failed: {e}")
+        return done
+
+    def requeue_stale(self):
+        """Queue again the submissions whose worker died mid-processing; returns their ids.
+
+        A claim older than DETECTION_CLAIM_TIMEOUT (or from before claims were
+        timestamped) is considered abandoned. The row goes back to "queued", so
+        claim_submission() still lets only one worker have it. An abandoned
+        catch-up ("running") goes back to "provisional" for catch_up() to retry.
+        """
+        stale = or_(Submission.claimed_at < datetime.utcnow() - timedelta(seconds=self.claim_timeout),
+                    Submission.claimed_at.is_(None))
+        with self.app.app_context():
+            caught_up = db.session.execute(
+                update(Submission)
+                .where(Submission.detection_completeness == "running", stale)
+                .values(detection_completeness="provisional", claimed_at=None)
+            ).rowcount
+            ids = [row.id for row in db.session.query(Submission.id)
+                   .filter(Submission.status == "processing", stale)]
+            if ids:
+                db.session.execute(
+                    update(Submission)
+                    .where(Submission.id.in_(ids), Submission.status == "processing", stale)
+                    .values(status="queued", stage="queued", claimed_at=None)
+                )
+            db.session.commit()
+        if caught_up:
+            print(f"♻️ Returned {caught_up} abandoned catch-ups to provisional")
+        if not ids:
+            return []
+        print(f"♻️ Re-queued {len(ids)} submissions abandoned mid-processing")
+        for submission_id in ids:
+            self._queue.put(submission_id)
+        return ids
+
+    def recover(self):
+        """Re-queue submissions left queued, or abandoned mid-processing, by a restarted process"""
+        with self.app.app_context():
+            for (submission_id,) in db.session.query(Submission.id).filter(Submission.status == "queued"):
+                self._queue.put(submission_id)
+        self.requeue_stale()
+
+    def start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                threading.Thread(target=self._work, name=f"detection-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+        if self.app.config["DETECTORS_PRELOAD"]:
+            detectors.preload()
+        self.recover()
+        DETECTION_QUEUE_DEPTH.set(self._queue.qsize())
+        DETECTION_WORKERS.inc(self.workers)
+        for thread in self._threads:
+            thread.start()
+
+
+def init_pipeline(app):
+    """Create the admission controller and detection queue for this process"""
+    app.config.setdefault("REPORT_FOLDER", "reports")
+    app.config.setdefault("DETECTION_WORKERS", 2)
+    app.config.setdefault("SUBMIT_MAX_INFLIGHT", 4)
+    app.config.setdefault("SUBMIT_MAX_INFLIGHT_PER_ASSIGNMENT", 2)
+    app.config.setdefault("SUBMIT_RATE_PER_ASSIGNMENT", 2.0)
+    app.config.setdefault("SUBMIT_BURST_PER_ASSIGNMENT", 5)
+    app.config.setdefault("DETECTION_SHED_QUEUE_DEPTH", 20)
+    app.config.setdefault("DETECTION_SHED_LOAD_PER_CPU", 1.5)
+    app.config.setdefault("DETECTION_CATCH_UP_INTERVAL", 30)
+    # Longer than the slowest detection run, or a live worker's submission is processed twice
+    app.config.setdefault("DETECTION_CLAIM_TIMEOUT", 900)
+    app.config.setdefault("DETECTORS_PRELOAD", False)
+
+    admission = AdmissionController(
+        max_inflight=app.config["SUBMIT_MAX_INFLIGHT"],
+        max_inflight_per_assignment=app.config["SUBMIT_MAX_INFLIGHT_PER_ASSIGNMENT"],
+        rate_per_assignment=app.config["SUBMIT_RATE_PER_ASSIGNMENT"],
+        burst_per_assignment=app.config["SUBMIT_BURST_PER_ASSIGNMENT"]
+    )
+    detection_queue = DetectionQueue(app, app.config["DETECTION_WORKERS"])
+    app.extensions["admission"] = admission
+    app.extensions["detection_queue"] = detection_queue
+
+    @app.cli.command("detection-catch-up")
+    def detection_catch_up_command():
+        """Finish deferred detection for provisional submissions"""
+        click.echo(f"✅ Completed {detection_queue.catch_up(limit=1000)} provisional submissions")
+
+    @app.before_request
+    def start_detection_queue():
+        detection_queue.start()
+
+    return admission, detection_queue
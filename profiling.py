@@ -0,0 +1,245 @@
+"""On-demand request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILING_TOKEN>` or is
+picked by PROFILE_SAMPLE_RATE, and only if the caller is logged in (session
+or bearer token). Anonymous traffic is never profiled. The request runs
+under cProfile while a sampler thread records its stack every few
+milliseconds. Each profile is stored as:
+
+- <id>.pstats     cProfile dump, for `python -m pstats` or snakeviz
+- <id>.collapsed  "frame;frame;frame count" lines, for flamegraph.pl or speedscope
+- <id>.json       request metadata
+
+/admin/profiles lists them and serves the files to callers presenting the
+same token. Only one request per process is profiled at a time, and old
+profiles are pruned to PROFILE_MAX_COUNT / PROFILE_MAX_AGE_HOURS.
+"""
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import abort, current_app, g, jsonify, request, send_from_directory, session
+
+from tokens import TokenError, verify_token
+
+_PROFILE_FILE = re.compile(r"^[\w\-]+\.(pstats|collapsed|json)$")
+_profiling = threading.Lock()
+
+
+class StackSampler:
+    """Collects collapsed stacks of one thread from a background thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _caller():
+    """'teacher:<id>' / 'student:<id>' for a logged-in caller, else None"""
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        secret = current_app.config.get("API_TOKEN_SECRET") or current_app.config["SECRET_KEY"]
+        try:
+            claims = verify_token(secret, auth_header[7:].strip())
+        except TokenError:
+            return None
+        return f"{claims['role']}:{claims['sub']}"
+    if session.get("teacher_id"):
+        return f"teacher:{session['teacher_id']}"
+    if session.get("student_id"):
+        return f"student:{session['student_id']}"
+    return None
+
+
+def _token_matches(value):
+    token = current_app.config.get("PROFILING_TOKEN")
+    return bool(token) and hmac.compare_digest(value or "", token)
+
+
+def _trigger():
+    """'header', 'sampled' or None"""
+    if _token_matches(request.headers.get("X-Profile")):
+        return "header"
+    rate = current_app.config["PROFILE_SAMPLE_RATE"]
+    if rate > 0 and random.random() < rate:
+        return "sampled"
+    return None
+
+
+def prune_profiles(folder, max_count, max_age_hours):
+    """Delete profiles beyond the newest `max_count` or older than `max_age_hours`"""
+    if not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - max_age_hours * 3600
+    metas = sorted((name for name in os.listdir(folder) if name.endswith(".json")), reverse=True)
+    removed = 0
+    for index, name in enumerate(metas):
+        path = os.path.join(folder, name)
+        try:
+            expired = index >= max_count or os.path.getmtime(path) < cutoff
+        except OSError:
+            continue  # pruned by another process
+        if not expired:
+            continue
+        profile_id = name[:-len(".json")]
+        for suffix in (".json", ".pstats", ".collapsed"):
+            try:
+                os.remove(os.path.join(folder, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+        removed += 1
+    return removed
+
+
+def _save(folder, profiler, sampler, meta):
+    os.makedirs(folder, exist_ok=True)
+    # Timestamp first so names sort by age
+    endpoint = re.sub(r"[^\w]", "_", meta["endpoint"])
+    profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint}-{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(folder, f"{profile_id}.pstats"))
+    with open(os.path.join(folder, f"{profile_id}.collapsed"), "w") as f:
+        f.write(sampler.collapsed())
+    # Metadata last: listings only show profiles whose files are complete
+    with open(os.path.join(folder, f"{profile_id}.json"), "w") as f:
+        json.dump(dict(meta, id=profile_id), f)
+    return profile_id
+
+
+def _require_admin():
+    """Admin routes exist only with a token configured, and need it as a bearer token"""
+    if not current_app.config.get("PROFILING_TOKEN"):
+        abort(404)
+    auth_header = request.headers.get("Authorization", "")
+    if not (auth_header.startswith("Bearer ") and _token_matches(auth_header[7:].strip())):
+        abort(401)
+
+
+def list_profiles():
+    _require_admin()
+    folder = current_app.config["PROFILE_FOLDER"]
+    profiles = []
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder), reverse=True):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(folder, name)) as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    return jsonify(profiles)
+
+
+def download_profile(filename):
+    _require_admin()
+    if not _PROFILE_FILE.match(filename):
+        abort(404)
+    return send_from_directory(os.path.abspath(current_app.config["PROFILE_FOLDER"]), filename, as_attachment=True)
+
+
+def init_profiling(app):
+    """Profile requests on demand and serve the stored profiles to admins"""
+    app.config.setdefault("PROFILING_TOKEN", None)
+    app.config.setdefault("PROFILE_SAMPLE_RATE", 0.0)
+    app.config.setdefault("PROFILE_FOLDER", "profiles")
+    app.config.setdefault("PROFILE_SAMPLE_INTERVAL_MS", 5)
+    app.config.setdefault("PROFILE_MAX_COUNT", 50)
+    app.config.setdefault("PROFILE_MAX_AGE_HOURS", 72)
+
+    app.add_url_rule("/admin/profiles", "list_profiles", list_profiles)
+    app.add_url_rule("/admin/profiles/<path:filename>", "download_profile", download_profile)
+
+    if not app.config["PROFILING_TOKEN"] and not app.config["PROFILE_SAMPLE_RATE"]:
+        return
+
+    @app.before_request
+    def start_profiling():
+        if request.endpoint in ("list_profiles", "download_profile", "metrics", "static"):
+            return
+        trigger = _trigger()
+        if trigger is None:
+            return
+        caller = _caller()
+        if caller is None:
+            return
+        # One profiled request per process keeps the overhead bounded
+        if not _profiling.acquire(blocking=False):
+            return
+        sampler = StackSampler(threading.get_ident(), app.config["PROFILE_SAMPLE_INTERVAL_MS"] / 1000)
+        profiler = cProfile.Profile()
+        g.profile = {"profiler": profiler, "sampler": sampler, "trigger": trigger,
+                     "caller": caller, "started": time.perf_counter()}
+        sampler.start()
+        profiler.enable()
+
+    @app.after_request
+    def stop_profiling(response):
+        state = g.pop("profile", None)
+        if state is None:
+            return response
+        try:
+            state["profiler"].disable()
+            state["sampler"].stop()
+            stats = g.get("query_stats")
+            meta = {
+                "method": request.method,
+                "path": request.path,
+                "endpoint": request.endpoint or "unmatched",
+                "status": response.status_code,
+                "caller": state["caller"],
+                "trigger": state["trigger"],
+                "duration_ms": round((time.perf_counter() - state["started"]) * 1000, 1),
+                "queries": stats.count if stats is not None else None,
+                "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            }
+            folder = app.config["PROFILE_FOLDER"]
+            profile_id = _save(folder, state["profiler"], state["sampler"], meta)
+            prune_profiles(folder, app.config["PROFILE_MAX_COUNT"], app.config["PROFILE_MAX_AGE_HOURS"])
+            if state["trigger"] == "header":
+                response.headers["X-Profile-Id"] = profile_id
+        except Exception as e:
+            print(f"⚠️ Saving request profile failed: {e}")
+        finally:
+            _profiling.release()
+        return response
+
+    @app.teardown_request
+    def abandon_profiling(exc):
+        # after_request doesn't run when the request raised before producing a response
+        state = g.pop("profile", None)
+        if state is not None:
+            state["profiler"].disable()
+            state["sampler"].stop()
+            _profiling.release()
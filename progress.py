@@ -0,0 +1,173 @@
+"""Progress of a stored submission, for the student waiting on it.
+
+POST /submit/<id> answers 202 at once with a handle: a signed token naming
+the submission. GET /submissions/<id>/progress?handle=<handle> then reports
+each pipeline step (queued, hash, plagiarism, ai, report) and the final
+scores:
+
+* With `Accept: text/event-stream`, it opens a Server-Sent Events stream of
+  "stage" events and one "done" or "failed" event, then the stream ends.
+* Otherwise it long-polls. Pass the last `stage` you saw and `wait=<seconds>`.
+  The JSON state comes back as soon as it differs, or after the wait.
+
+Stage changes reach any process through the change log (see live.py). No
+connection is held for longer than a wait or a stream, whichever process
+runs the detectors. Streams and waits take a slot from this module's own pool
+(PROGRESS_MAX_STREAMS per process), separate from the live dashboard's. When
+every slot is busy, the current state is returned at once and the client
+simply asks again.
+"""
+import threading
+import time
+
+from flask import current_app, g, jsonify, request, session
+from sqlalchemy import select
+
+from changes import head_seq
+from live import event_stream_response, sse
+from metrics import LIVE_STREAMS
+from models import Submission, db
+from tokens import TokenError, issue_token, verify_token
+
+DONE_STATUSES = ("processed", "failed")
+
+
+def _secret():
+    return current_app.config.get("API_TOKEN_SECRET") or current_app.config["SECRET_KEY"]
+
+
+def issue_handle(submission_id):
+    """Signed handle that lets its holder follow one submission's progress"""
+    token, _ = issue_token(_secret(), "submission", submission_id, current_app.config["PROGRESS_HANDLE_TTL"])
+    return token
+
+
+def _handle_allows(handle, submission_id):
+    try:
+        claims = verify_token(_secret(), handle)
+    except TokenError:
+        return False
+    return claims["role"] == "submission" and claims["sub"] == submission_id
+
+
+def progress_state(submission_id):
+    """The submission's status and step, with its scores once processed; None if missing"""
+    row = db.session.execute(
+        select(Submission.status, Submission.stage, Submission.plagiarism, Submission.ai_detected,
+               Submission.detection_completeness, Submission.report_path, Submission.is_late)
+        .where(Submission.id == submission_id)
+    ).first()
+    if row is None:
+        return None
+    state = {
+        "submission_id": submission_id,
+        "status": row.status,
+        "stage": row.stage or ("done" if row.status == "processed" else row.status),
+        "done": row.status in DONE_STATUSES,
+    }
+    if row.status == "processed":
+        state.update(
+            plagiarism=row.plagiarism,
+            ai_detected=row.ai_detected,
+            is_late=row.is_late,
+            provisional=row.detection_completeness != "complete",
+            report_ready=row.report_path is not None,
+        )
+    return state
+
+
+def _read(app, submission_id):
+    """(seq, state): the state as of change-log seq, so waits start from there"""
+    with app.app_context():
+        return head_seq(), progress_state(submission_id)
+
+
+def _stream(app, feed, submission_id, seq, state):
+    LIVE_STREAMS.inc()
+    try:
+        yield f"retry: {app.config['LIVE_RETRY_MS']}\n\n"
+        deadline = time.monotonic() + app.config["LIVE_STREAM_SECONDS"]
+        sent = None
+        while True:
+            if state is None:
+                yield sse("failed", {"submission_id": submission_id, "error": "Submission not found"}, app.json)
+                return
+            if (state["status"], state["stage"]) != sent:
+                sent = (state["status"], state["stage"])
+                event = ("failed" if state["status"] == "failed" else "done") if state["done"] else "stage"
+                yield sse(event, state, app.json, seq)
+            if state["done"]:
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if feed.wait(("submission", submission_id), seq, min(app.config["LIVE_KEEPALIVE_SECONDS"], remaining)):
+                seq, state = _read(app, submission_id)
+            else:
+                yield ": keepalive\n\n"
+    finally:
+        LIVE_STREAMS.dec()
+
+
+def submission_progress(submission_id):
+    """SSE stream or long-poll of one submission's pipeline progress"""
+    handle = request.args.get("handle") or request.headers.get("X-Submission-Handle", "")
+    if not (_handle_allows(handle, submission_id) or session.get("teacher_id") is not None):
+        owner = db.session.query(Submission.student_id).filter(Submission.id == submission_id).scalar()
+        if session.get("student_id") is None or session.get("student_id") != owner:
+            return jsonify({"error": "Authentication required"}), 401
+
+    app = current_app._get_current_object()
+    seq, state = head_seq(), progress_state(submission_id)
+    if state is None:
+        return jsonify({"error": "Submission not found"}), 404
+
+    feed = current_app.extensions.get("live")
+    slots = current_app.extensions["progress_slots"]
+    streaming = request.accept_mimetypes.best == "text/event-stream"
+    if state["done"] or feed is None or not slots.acquire(blocking=False):
+        # Nothing to wait for, or no thread to wait with: answer now, the client asks again
+        if streaming:
+            first = f"retry: {app.config['LIVE_RETRY_MS']}\n\n"
+            event = ("failed" if state["status"] == "failed" else "done") if state["done"] else "stage"
+            return event_stream_response([first, sse(event, state, app.json, seq)])
+        response = jsonify(state)
+        if not state["done"]:
+            response.headers["Retry-After"] = str(app.config["LIVE_RETRY_MS"] // 1000 or 1)
+        return response
+
+    try:
+        feed.start()
+        db.session.remove()  # don't hold this request's connection while waiting
+    except Exception:
+        slots.release()
+        raise
+
+    if streaming:
+        response = event_stream_response(_stream(app, feed, submission_id, seq, state))
+        response.call_on_close(slots.release)
+        return response
+
+    known = request.args.get("stage")
+    wait = min(request.args.get("wait", 0, type=float), app.config["PROGRESS_MAX_WAIT"])
+    started = time.monotonic()
+    deadline = started + max(0, wait)
+    try:
+        while known is not None and state["stage"] == known and not state["done"]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not feed.wait(("submission", submission_id), seq, remaining):
+                break
+            seq, state = _read(app, submission_id)
+    finally:
+        slots.release()
+    g.idle_seconds = time.monotonic() - started
+    return jsonify(state)
+
+
+def init_progress(app):
+    """Register GET /submissions/<id>/progress"""
+    app.config.setdefault("PROGRESS_HANDLE_TTL", 24 * 3600)
+    app.config.setdefault("PROGRESS_MAX_WAIT", 25)
+    app.config.setdefault("PROGRESS_MAX_STREAMS", 2)
+    app.extensions["progress_slots"] = threading.BoundedSemaphore(app.config["PROGRESS_MAX_STREAMS"])
+    app.add_url_rule("/submissions/<int:submission_id>/progress", "submission_progress", submission_progress)
@@ -0,0 +1,155 @@
+"""Per-request SQL accounting: statement counts, DB time and suspected N+1 loops.
+
+An engine listener records every statement into the QueryStats objects that
+are active on the current thread. A request pushes one in before_request.
+assert_max_queries() pushes another, so a test can bound one block:
+
+    with assert_max_queries(5):
+        client.get("/student/dashboard")
+
+Statements are fingerprinted with literals and IN-lists collapsed. The same
+fingerprint running many times in one request is reported as a likely N+1
+(a lazy load inside a loop). Slow, query-heavy or N+1 requests are logged.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, request
+from sqlalchemy import event
+
+from metrics import REQUEST_QUERIES
+
+_active = threading.local()
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """SQL with literals and parameter lists normalised, so repeated shapes compare equal"""
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = statement.replace("%s", "?")
+    statement = _PARAM_LIST.sub("(?...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """Statements executed while this object is active on a thread"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """[(fingerprint, times)] for statements run at least `threshold` times"""
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def describe(self, limit=5):
+        lines = [f"{self.count} queries, {self.seconds * 1000:.1f} ms in the database"]
+        lines.extend(f"  {n}x {fp[:200]}" for fp, n in self.fingerprints.most_common(limit))
+        return "\n".join(lines)
+
+
+def _stack():
+    stack = getattr(_active, "stack", None)
+    if stack is None:
+        stack = _active.stack = []
+    return stack
+
+
+def push_stats():
+    stats = QueryStats()
+    _stack().append(stats)
+    return stats
+
+
+def pop_stats(stats):
+    stack = _stack()
+    if stats in stack:
+        stack.remove(stats)
+
+
+@contextmanager
+def assert_max_queries(n):
+    """Fail with the statement breakdown if the block runs more than `n` queries"""
+    stats = push_stats()
+    try:
+        yield stats
+    finally:
+        pop_stats(stats)
+    if stats.count > n:
+        raise AssertionError(f"Expected at most {n} queries, got {stats.describe()}")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_active, "stack", None):
+        conn.info.setdefault("query_audit_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = getattr(_active, "stack", None)
+    started = conn.info.get("query_audit_started")
+    if not stack or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    for stats in stack:
+        stats.record(statement, elapsed)
+
+
+def init_query_audit(app, db):
+    """Count statements per request and log slow, query-heavy or N+1 requests"""
+    app.config.setdefault("QUERY_AUDIT_ENABLED", True)
+    app.config.setdefault("SLOW_REQUEST_MS", 500)
+    app.config.setdefault("SLOW_REQUEST_QUERIES", 50)
+    app.config.setdefault("N_PLUS_ONE_THRESHOLD", 10)
+    # X-Query-Count / X-DB-Time-Ms on every response, for load tests and local debugging
+    app.config.setdefault("QUERY_AUDIT_HEADERS", False)
+    if not app.config["QUERY_AUDIT_ENABLED"]:
+        return
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_query_audit():
+        g.query_stats = push_stats()
+        g.query_audit_started = time.perf_counter()
+
+    @app.after_request
+    def add_query_headers(response):
+        stats = g.get("query_stats")
+        if stats is not None and app.config["QUERY_AUDIT_HEADERS"]:
+            response.headers["X-Query-Count"] = str(stats.count)
+            response.headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.1f}"
+        return response
+
+    @app.teardown_request
+    def finish_query_audit(exc):
+        stats = g.pop("query_stats", None)
+        if stats is None:
+            return
+        pop_stats(stats)
+        # Time spent deliberately waiting (a long-poll, g.idle_seconds) isn't slowness
+        elapsed_ms = (time.perf_counter() - g.pop("query_audit_started") - g.pop("idle_seconds", 0)) * 1000
+        REQUEST_QUERIES.labels(request.endpoint or "unmatched").observe(stats.count)
+
+        repeated = stats.repeated(app.config["N_PLUS_ONE_THRESHOLD"])
+        if repeated:
+            fp, n = repeated[0]
+            print(f"⚠️ Possible N+1 in {request.method} {request.path}: {n}x {fp[:200]}")
+        if elapsed_ms > app.config["SLOW_REQUEST_MS"] or stats.count > app.config["SLOW_REQUEST_QUERIES"]:
+            print(f"⚠️ Slow request {request.method} {request.path}: {elapsed_ms:.0f} ms, {stats.describe(limit=3)}")
@@ -0,0 +1,90 @@
+"""Token-bucket rate limiting shared by the email dispatcher and request admission"""
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; returns True on success"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def is_full(self):
+        """True once the bucket has refilled to capacity, i.e. it is as good as a new one"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens >= self.capacity
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` would be available"""
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = tokens - self.tokens
+            return 0.0 if missing <= 0 or self.rate <= 0 else missing / self.rate
+
+
+class KeyedBuckets:
+    """Lazily created token buckets, one per key (e.g. per email domain or assignment).
+
+    A full bucket behaves exactly like a new one, so every `sweep_seconds`
+    get() drops the buckets that are full and have not been used since the
+    previous sweep. The map then holds only the recently active keys instead
+    of every key the process has ever seen.
+    """
+
+    def __init__(self, rate, capacity, overrides=None, sweep_seconds=60):
+        self.rate = rate
+        self.capacity = capacity
+        self.overrides = overrides or {}
+        self.sweep_seconds = sweep_seconds
+        self._buckets = {}
+        self._used = {}
+        self._swept = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def sweep(self, idle_seconds=None):
+        """Forget idle buckets that have refilled to capacity; returns how many"""
+        with self._lock:
+            return self._sweep(self.sweep_seconds if idle_seconds is None else idle_seconds)
+
+    def _sweep(self, idle_seconds):
+        now = time.monotonic()
+        idle = [key for key, bucket in self._buckets.items()
+                if now - self._used[key] >= idle_seconds and bucket.is_full()]
+        for key in idle:
+            del self._buckets[key]
+            del self._used[key]
+        self._swept = now
+        return len(idle)
+
+    def get(self, key):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._swept >= self.sweep_seconds:
+                self._sweep(self.sweep_seconds)
+            self._used[key] = now
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rate, capacity = self.overrides.get(key, (self.rate, self.capacity))
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            return bucket
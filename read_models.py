@@ -0,0 +1,165 @@
+"""Lightweight read path for submission lists.
+
+List pages and API lists don't need change tracking, relationships or the
+pasted text. submission_rows() runs one Core SELECT and keeps each row in a
+SubmissionRow with __slots__, far smaller than an ORM object plus its to_dict()
+copy. Templates can use a row as an object (`sub.grade`) or as the old dict
+(`sub["grade"]`). submitted_at is a LazyDate, formatted only when it is rendered
+or serialized, and feedback is decompressed only when it is read. Rows
+serialize through __json__() to exactly the Submission.to_dict() shape.
+"""
+from collections import namedtuple
+
+from sqlalchemy import LargeBinary, select, type_coerce
+
+from models import Assignment, Submission, SubmissionBody, db, decompress_text
+
+DATE_FORMAT = "%d %b %Y %I:%M %p"
+
+AssignmentRef = namedtuple("AssignmentRef", "id title")
+
+
+class LazyDate:
+    """A datetime that is formatted with DATE_FORMAT on first str()"""
+    __slots__ = ("value", "_text")
+
+    def __init__(self, value):
+        self.value = value
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = self.value.strftime(DATE_FORMAT)
+        return self._text
+
+    def __json__(self):
+        return str(self)
+
+    def __getattr__(self, name):
+        # strftime(), isoformat(), .year, ... as on the datetime itself
+        return getattr(self.value, name)
+
+    def __eq__(self, other):
+        return self.value == getattr(other, "value", other)
+
+    def __lt__(self, other):
+        return self.value < getattr(other, "value", other)
+
+    def __le__(self, other):
+        return self.value <= getattr(other, "value", other)
+
+    def __gt__(self, other):
+        return self.value > getattr(other, "value", other)
+
+    def __ge__(self, other):
+        return self.value >= getattr(other, "value", other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+
+_COLUMNS = (
+    Submission.id,
+    Submission.student_name,
+    Submission.student_email,
+    Submission.reg_no,
+    Submission.submitted_at,
+    Submission.is_late,
+    Submission.plagiarism,
+    Submission.ai_detected,
+    Submission.file_path,
+    Submission.report_path,
+    Submission.assignment_id,
+    Submission.grade,
+    Submission.needs_review,
+    Submission.status,
+    Submission.detection_completeness,
+    Submission.student_id,
+    Assignment.title,
+    # Raw compressed bytes; decompressed on first access
+    type_coerce(SubmissionBody.feedback, LargeBinary),
+    Submission.legacy_feedback,
+)
+
+
+class SubmissionRow:
+    """One submission as read for a list; read-only"""
+    __slots__ = (
+        "id", "student_name", "student_email", "reg_no", "submitted_at", "is_late", "plagiarism",
+        "ai_detected", "file_path", "report_path", "assignment_id", "grade", "needs_review", "status",
+        "detection_completeness", "student_id", "assignment_title", "_feedback", "_legacy_feedback",
+    )
+
+    def __init__(self, row):
+        (self.id, self.student_name, self.student_email, self.reg_no, submitted_at, self.is_late,
+         self.plagiarism, self.ai_detected, self.file_path, self.report_path, self.assignment_id,
+         self.grade, self.needs_review, self.status, self.detection_completeness, self.student_id,
+         self.assignment_title, self._feedback, self._legacy_feedback) = row
+        self.submitted_at = LazyDate(submitted_at) if submitted_at is not None else None
+
+    @property
+    def feedback(self):
+        if self._feedback is not None:
+            if isinstance(self._feedback, bytes):
+                self._feedback = decompress_text(self._feedback)
+            return self._feedback
+        return self._legacy_feedback
+
+    @property
+    def assignment(self):
+        return AssignmentRef(self.assignment_id, self.assignment_title)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __json__(self):
+        """Same keys as Submission.to_dict()"""
+        return {
+            "id": self.id,
+            "student_name": self.student_name,
+            "student_email": self.student_email,
+            "reg_no": self.reg_no,
+            "submitted_at": str(self.submitted_at) if self.submitted_at is not None else None,
+            "is_late": self.is_late,
+            "plagiarism": self.plagiarism,
+            "ai_detected": self.ai_detected,
+            "file_path": self.file_path,
+            "report_path": self.report_path,
+            "assignment_id": self.assignment_id,
+            "grade": self.grade,
+            "feedback": self.feedback,
+            "needs_review": self.needs_review,
+            "status": self.status,
+            "detection_completeness": self.detection_completeness
+        }
+
+    to_dict = __json__
+
+
+def assignment_dict(assignment):
+    """The API shape of an assignment"""
+    return {
+        "id": assignment.id,
+        "title": assignment.title,
+        "description": assignment.description,
+        "due_date": assignment.due_date.isoformat(),
+        "created_at": assignment.created_at.isoformat(),
+        "teacher_id": assignment.teacher_id
+    }
+
+
+def submission_rows(*criteria):
+    """SubmissionRows matching `criteria` (SQL expressions), in id order"""
+    statement = select(*_COLUMNS) \
+        .join(Assignment, Submission.assignment_id == Assignment.id) \
+        .outerjoin(SubmissionBody, SubmissionBody.submission_id == Submission.id) \
+        .where(*criteria) \
+        .order_by(Submission.id)
+    # Core execution on the session's connection: no ORM loading layer, same transaction
+    return [SubmissionRow(row) for row in db.session.connection().execute(statement)]
@@ -0,0 +1,167 @@
+"""Deadline reminder scheduler over Assignment.due_date.
+
+Only assignments due within the next window are loaded (via the due_date
+index) and their reminder times kept in a heap, so each tick is a heap peek
+rather than a scan. When a reminder fires, students without a submission are
+found with one anti-join (a submission counts if it is linked to the
+student's account, or was made anonymously with their reg no or email)
+and their emails are queued to the outbox in bulk.
+A database lease keeps the scheduler to one process at a time.
+"""
+import heapq
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from leases import acquire_lease, release_lease
+from models import db, Assignment, Student, Submission, ReminderSent
+from notifications import queue_deadline_reminders
+
+LEASE_NAME = "deadline-reminders"
+
+
+class ReminderScheduler:
+    def __init__(self, app):
+        config = app.config
+        self.app = app
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.offsets = sorted(config["REMINDER_OFFSETS"], reverse=True)  # minutes before due_date
+        self.window = timedelta(minutes=config["REMINDER_WINDOW"])
+        self.grace = timedelta(minutes=config["REMINDER_GRACE"])
+        self.lease_ttl = config["REMINDER_LEASE_TTL"]
+        self.heap = []
+        self._scheduled = set()
+        self._loaded_until = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def refill(self, now):
+        """Load reminder times that fall inside the next window"""
+        horizon = now + self.window
+        latest_offset = timedelta(minutes=self.offsets[0]) if self.offsets else timedelta(0)
+        upcoming = db.session.query(Assignment.id, Assignment.due_date).filter(
+            Assignment.due_date > now,
+            Assignment.due_date <= horizon + latest_offset
+        ).all()
+        done = {(row.assignment_id, row.offset_minutes) for row in db.session.query(
+            ReminderSent.assignment_id, ReminderSent.offset_minutes
+        ).filter(ReminderSent.assignment_id.in_([a.id for a in upcoming])).all()} if upcoming else set()
+
+        for assignment_id, due_date in upcoming:
+            for offset in self.offsets:
+                key = (assignment_id, offset)
+                remind_at = due_date - timedelta(minutes=offset)
+                # Reminders missed by more than the grace period (e.g. a 24h reminder
+                # for an assignment created an hour before its deadline) are skipped
+                if key in done or key in self._scheduled or not (now - self.grace <= remind_at <= horizon):
+                    continue
+                heapq.heappush(self.heap, (remind_at, assignment_id, offset))
+                self._scheduled.add(key)
+        self._loaded_until = horizon
+
+    def send(self, assignment_id, offset):
+        """Queue reminders for students who have not submitted; returns the recipient count"""
+        assignment = db.session.get(Assignment, assignment_id)
+        if assignment is None or assignment.due_date <= datetime.utcnow():
+            return 0
+        record = ReminderSent(assignment_id=assignment_id, offset_minutes=offset)
+        db.session.add(record)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return 0
+
+        # The public form stores no student_id, only what the student typed in
+        submitted_by = or_(
+            Submission.student_id == Student.id,
+            and_(Submission.student_id.is_(None),
+                 or_(Submission.reg_no == Student.reg_no, Submission.student_email == Student.email))
+        )
+        missing = db.session.query(Student.email, Student.name).outerjoin(
+            Submission,
+            and_(Submission.assignment_id == assignment_id, submitted_by)
+        ).filter(Submission.id.is_(None)).all()
+        record.recipients = queue_deadline_reminders(missing, assignment.title, assignment.due_date)
+        db.session.commit()
+        return record.recipients
+
+    def tick(self):
+        """Fire due reminders if we hold the lease; returns seconds until the next tick"""
+        now = datetime.utcnow()
+        if not acquire_lease(LEASE_NAME, self.holder, self.lease_ttl):
+            # Another process is scheduling; drop our heap so a takeover reloads fresh state
+            self.heap.clear()
+            self._scheduled.clear()
+            self._loaded_until = None
+            return self.lease_ttl / 2
+
+        if self._loaded_until is None or now >= self._loaded_until - self.window / 2:
+            self.refill(now)
+
+        while self.heap and self.heap[0][0] <= now:
+            remind_at, assignment_id, offset = heapq.heappop(self.heap)
+            self._scheduled.discard((assignment_id, offset))
+            count = self.send(assignment_id, offset)
+            if count:
+                print(f"📧 Queued {count} reminders for assignment {assignment_id} ({offset} min before due)")
+
+        next_refill = (self._loaded_until - self.window / 2 - now).total_seconds()
+        next_due = (self.heap[0][0] - now).total_seconds() if self.heap else next_refill
+        # Wake up in time to renew the lease as well
+        return max(1.0, min(next_due, next_refill, self.lease_ttl / 2))
+
+    def run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    delay = self.tick()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Reminder scheduler failed: {e}")
+                    delay = 30
+            self._stop.wait(delay)
+        with self.app.app_context():
+            release_lease(LEASE_NAME, self.holder)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="deadline-reminders", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def init_reminders(app):
+    """Configure the deadline reminder scheduler and its CLI command"""
+    app.config.setdefault("REMINDERS_ENABLED", True)
+    app.config.setdefault("REMINDER_OFFSETS", [24 * 60, 60])
+    app.config.setdefault("REMINDER_WINDOW", 15)
+    app.config.setdefault("REMINDER_GRACE", 30)
+    app.config.setdefault("REMINDER_LEASE_TTL", 120)
+
+    scheduler = ReminderScheduler(app)
+    app.extensions["reminders"] = scheduler
+
+    @app.cli.command("deadline-reminders")
+    def deadline_reminders_command():
+        """Run the deadline reminder scheduler in the foreground"""
+        scheduler.run()
+
+    if app.config["REMINDERS_ENABLED"]:
+        @app.before_request
+        def start_reminder_scheduler():
+            scheduler.start()
+
+    return scheduler
@@ -0,0 +1,89 @@
+"""Schema upgrades for databases created by an earlier version of the app.
+
+db.create_all() only creates missing tables. A database from before a model
+gained a column or an index keeps its old tables, and every query naming the
+new column fails. upgrade_schema() compares the models with the database and
+adds what is missing: tables, columns (ALTER TABLE ... ADD COLUMN, with the
+model's default so existing rows get it) and indexes. It never changes or
+drops anything, so running it again is a no-op.
+
+It runs at startup, before the change-log and search triggers that read the
+new columns are installed, and as `flask upgrade-db`.
+"""
+import click
+from sqlalchemy import inspect, literal
+
+from models import db
+
+
+def _column_ddl(column, dialect):
+    """`name TYPE [NOT NULL] [DEFAULT x]` for ALTER TABLE ... ADD COLUMN"""
+    ddl = f"{dialect.identifier_preparer.quote(column.name)} {column.type.compile(dialect=dialect)}"
+    default = None
+    if column.server_default is not None:
+        default = str(column.server_default.arg)
+    elif column.default is not None and column.default.is_scalar:
+        default = str(literal(column.default.arg, column.type).compile(
+            dialect=dialect, compile_kwargs={"literal_binds": True}
+        ))
+    # A NOT NULL column can only be added to a table with rows if it has a default
+    if not column.nullable and default is not None:
+        ddl += " NOT NULL"
+    if default is not None:
+        ddl += f" DEFAULT {default}"
+    return ddl
+
+
+def upgrade_schema(connection):
+    """Add the tables, columns and indexes the models have and the database lacks.
+
+    Returns a list of what was added, e.g. ["submission.needs_review", "index ix_..."].
+    """
+    dialect = connection.dialect
+    inspector = inspect(connection)
+    existing = set(inspector.get_table_names())
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing:
+            table.create(connection)
+            added.append(f"table {table.name}")
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {dialect.identifier_preparer.quote(table.name)} "
+                    f"ADD COLUMN {_column_ddl(column, dialect)}"
+                )
+                added.append(f"{table.name}.{column.name}")
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(connection)
+                added.append(f"index {index.name}")
+    return added
+
+
+def init_schema(app):
+    """Upgrade an existing database's schema at startup and register `flask upgrade-db`"""
+    app.config.setdefault("SCHEMA_AUTO_UPGRADE", True)
+
+    def upgrade():
+        with db.engine.begin() as conn:
+            return upgrade_schema(conn)
+
+    if app.config["SCHEMA_AUTO_UPGRADE"]:
+        with app.app_context():
+            # A new database is left to db.create_all()
+            if inspect(db.engine).get_table_names():
+                added = upgrade()
+                if added:
+                    print(f"🛠️ Upgraded the database schema: added {', '.join(added)}")
+            # Later init_* steps register per-connection hooks; don't pool this connection
+            db.engine.dispose()
+
+    @app.cli.command("upgrade-db")
+    def upgrade_db_command():
+        """Add the tables, columns and indexes this version needs to an existing database"""
+        added = upgrade()
+        click.echo(f"✅ Added {', '.join(added)}" if added else "✅ Schema is up to date")
@@ -0,0 +1,266 @@
+"""Full-text search over submissions and assignments (SQLite FTS5).
+
+submission_fts indexes each submission's pasted text, feedback and the text
+extracted from its upload. It is an external-content table over a view that
+decompresses submission_body, so the text is not stored twice. Only the
+snippets of the returned page are ever decompressed. assignment_fts indexes
+assignment titles and descriptions. Triggers keep both in step with every
+write. They call educheck_text(), a SQL function registered on the app's
+connections, so submission_body must be written through the app (or the
+`flask` CLI). Old in-row text is indexed once `flask
+migrate-submission-text` has moved it.
+
+Teachers search their own assignments' submissions; students search their own
+submissions. Searches are ranked by bm25. `flask db-maintenance` runs a
+bounded incremental merge of the index segments, and
+`flask search-optimize` does a full merge.
+"""
+import html
+import re
+
+import click
+from sqlalchemy import event, inspect, select, text
+
+from models import Assignment, Submission, db, decompress_text
+from read_models import assignment_dict, submission_rows
+
+SUBMISSION_COLUMNS = ("text_content", "feedback", "extracted_text")
+ASSIGNMENT_COLUMNS = ("title", "description")
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+# Snippet markers that cannot occur in escaped text; replaced with <mark> afterwards
+_OPEN, _CLOSE = "\x02", "\x03"
+
+
+def _sql_text(value):
+    """educheck_text(): the plain text of a CompressedText (or old plain) value"""
+    if value is None or isinstance(value, str):
+        return value
+    return decompress_text(value)
+
+
+def _register_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("educheck_text", 1, _sql_text, deterministic=True)
+
+
+def _body_values(row):
+    return ", ".join(f"educheck_text({row}.{c})" for c in SUBMISSION_COLUMNS)
+
+
+def search_ddl():
+    """{name: CREATE statement} for the search tables, view and triggers, in creation order"""
+    columns = ", ".join(SUBMISSION_COLUMNS)
+    assignment_columns = ", ".join(ASSIGNMENT_COLUMNS)
+    body_changed = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in SUBMISSION_COLUMNS)
+    assignment_changed = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in ASSIGNMENT_COLUMNS)
+    delete_body = (
+        f"INSERT INTO submission_fts(submission_fts, rowid, {columns}) "
+        f"VALUES ('delete', OLD.submission_id, {_body_values('OLD')});"
+    )
+    insert_body = f"INSERT INTO submission_fts(rowid, {columns}) VALUES (NEW.submission_id, {_body_values('NEW')});"
+    delete_assignment = (
+        f"INSERT INTO assignment_fts(assignment_fts, rowid, {assignment_columns}) "
+        f"VALUES ('delete', OLD.id, {', '.join('OLD.' + c for c in ASSIGNMENT_COLUMNS)});"
+    )
+    insert_assignment = (
+        f"INSERT INTO assignment_fts(rowid, {assignment_columns}) "
+        f"VALUES (NEW.id, {', '.join('NEW.' + c for c in ASSIGNMENT_COLUMNS)});"
+    )
+    return {
+        "submission_search_source": (
+            "CREATE VIEW IF NOT EXISTS submission_search_source AS "
+            f"SELECT submission_id, {', '.join(f'educheck_text({c}) AS {c}' for c in SUBMISSION_COLUMNS)} "
+            "FROM submission_body"
+        ),
+        "submission_fts": (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS submission_fts USING fts5({columns}, "
+            "content='submission_search_source', content_rowid='submission_id', tokenize='porter unicode61')"
+        ),
+        "assignment_fts": (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS assignment_fts USING fts5({assignment_columns}, "
+            "content='assignment', content_rowid='id', tokenize='porter unicode61')"
+        ),
+        "search_v1_body_insert": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_body_insert AFTER INSERT ON submission_body "
+            f"BEGIN {insert_body} END"
+        ),
+        "search_v1_body_update": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_body_update AFTER UPDATE ON submission_body "
+            f"WHEN {body_changed} BEGIN {delete_body} {insert_body} END"
+        ),
+        "search_v1_body_delete": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_body_delete AFTER DELETE ON submission_body "
+            f"BEGIN {delete_body} END"
+        ),
+        "search_v1_assignment_insert": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_assignment_insert AFTER INSERT ON assignment "
+            f"BEGIN {insert_assignment} END"
+        ),
+        "search_v1_assignment_update": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_assignment_update AFTER UPDATE ON assignment "
+            f"WHEN {assignment_changed} BEGIN {delete_assignment} {insert_assignment} END"
+        ),
+        "search_v1_assignment_delete": (
+            f"CREATE TRIGGER IF NOT EXISTS search_v1_assignment_delete AFTER DELETE ON assignment "
+            f"BEGIN {delete_assignment} END"
+        ),
+    }
+
+
+def install_search(connection):
+    """Create the search tables and triggers; returns True if the indexes were new"""
+    existing = connection.execute(text(
+        "SELECT count(*) FROM sqlite_master WHERE name IN ('submission_fts', 'assignment_fts')"
+    )).scalar()
+    for ddl in search_ddl().values():
+        connection.execute(text(ddl))
+    return existing < 2
+
+
+def drop_search_triggers(connection):
+    """Drop the triggers, e.g. around a bulk load followed by rebuild_search()"""
+    for name in search_ddl():
+        if name.startswith("search_v1_"):
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def rebuild_search(connection):
+    """Re-index everything from the source tables"""
+    connection.execute(text("INSERT INTO submission_fts(submission_fts) VALUES ('rebuild')"))
+    connection.execute(text("INSERT INTO assignment_fts(assignment_fts) VALUES ('rebuild')"))
+
+
+def merge_search(connection, pages=500):
+    """Incremental optimize: merge index segments, writing at most about `pages` pages per index"""
+    for table in ("submission_fts", "assignment_fts"):
+        connection.execute(text(f"INSERT INTO {table}({table}, rank) VALUES ('merge', :pages)"), {"pages": pages})
+    return f"✅ Search indexes merged ({pages} pages each)"
+
+
+def optimize_search(connection):
+    """Merge each index into a single segment (rewrites it; run off-peak)"""
+    for table in ("submission_fts", "assignment_fts"):
+        connection.execute(text(f"INSERT INTO {table}({table}) VALUES ('optimize')"))
+
+
+def fts_query(q):
+    """An FTS5 query matching all of the words (and "quoted phrases") in `q`.
+
+    Every term is quoted, so user input can never be a syntax error; a
+    trailing * keeps prefix matching. None if `q` has no terms.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(q or ""):
+        term = phrase if phrase else word
+        prefix = not phrase and term.endswith("*")
+        term = term.rstrip("*") if prefix else term
+        if term.strip():
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def _snippet(raw):
+    if raw is None:
+        return None
+    return html.escape(raw).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def _snippet_sql(table):
+    return f"snippet({table}, -1, char(2), char(3), '…', 16)"
+
+
+def search_submissions(q, limit, offset=0, teacher_id=None, student_id=None, columns=None):
+    """Ranked submissions matching `q`, optionally only in some of SUBMISSION_COLUMNS"""
+    match = fts_query(q)
+    if match is None:
+        return []
+    if columns:
+        match = "{" + " ".join(columns) + "} : (" + match + ")"
+    scope = ""
+    params = {"match": match, "limit": limit, "offset": offset}
+    if teacher_id is not None:
+        scope += " AND a.teacher_id = :teacher_id"
+        params["teacher_id"] = teacher_id
+    if student_id is not None:
+        scope += " AND s.student_id = :student_id"
+        params["student_id"] = student_id
+    hits = db.session.execute(text(
+        f"SELECT submission_fts.rowid AS id, submission_fts.rank AS rank, {_snippet_sql('submission_fts')} AS snippet "
+        "FROM submission_fts "
+        "JOIN submission s ON s.id = submission_fts.rowid "
+        "JOIN assignment a ON a.id = s.assignment_id "
+        f"WHERE submission_fts MATCH :match{scope} "
+        "ORDER BY submission_fts.rank LIMIT :limit OFFSET :offset"
+    ), params).all()
+    rows = {row.id: row for row in submission_rows(Submission.id.in_([hit.id for hit in hits]))} if hits else {}
+    return [
+        {"submission": rows[hit.id], "rank": hit.rank, "snippet": _snippet(hit.snippet)}
+        for hit in hits if hit.id in rows
+    ]
+
+
+def search_assignments(q, limit, offset=0, teacher_id=None):
+    """Ranked assignments matching `q`"""
+    match = fts_query(q)
+    if match is None:
+        return []
+    scope = ""
+    params = {"match": match, "limit": limit, "offset": offset}
+    if teacher_id is not None:
+        scope = " AND a.teacher_id = :teacher_id"
+        params["teacher_id"] = teacher_id
+    hits = db.session.execute(text(
+        f"SELECT a.id AS id, assignment_fts.rank AS rank, {_snippet_sql('assignment_fts')} AS snippet "
+        "FROM assignment_fts JOIN assignment a ON a.id = assignment_fts.rowid "
+        f"WHERE assignment_fts MATCH :match{scope} "
+        "ORDER BY assignment_fts.rank LIMIT :limit OFFSET :offset"
+    ), params).all()
+    assignments = {
+        a.id: a for a in Assignment.query.filter(Assignment.id.in_([hit.id for hit in hits]))
+    } if hits else {}
+    return [
+        {"assignment": assignment_dict(assignments[hit.id]), "rank": hit.rank, "snippet": _snippet(hit.snippet)}
+        for hit in hits if hit.id in assignments
+    ]
+
+
+def _on_create_all(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        install_search(connection)
+
+
+def init_search(app):
+    """Register educheck_text(), create the search indexes (SQLite) and the CLI commands"""
+    app.config.setdefault("SEARCH_PAGE_SIZE", 20)
+    app.config.setdefault("SEARCH_MERGE_PAGES", 500)
+
+    with app.app_context():
+        engine = db.engine
+        app.extensions["search"] = engine.dialect.name == "sqlite"
+        if not app.extensions["search"]:
+            print(f"⚠️ Full-text search needs SQLite FTS5; /api/search is disabled on {engine.dialect.name}")
+            return
+        # Before any connection is opened, so every pooled connection has the function
+        if not event.contains(engine, "connect", _register_functions):
+            event.listen(engine, "connect", _register_functions)
+        if not event.contains(db.metadata, "after_create", _on_create_all):
+            event.listen(db.metadata, "after_create", _on_create_all)
+        tables = inspect(engine).get_table_names()
+        if "submission_body" in tables and "assignment" in tables:
+            with engine.begin() as conn:
+                if install_search(conn):
+                    print("🔎 Building the search indexes")
+                    rebuild_search(conn)
+
+    app.extensions.setdefault("maintenance_tasks", []).append(
+        lambda conn: merge_search(conn, app.config["SEARCH_MERGE_PAGES"])
+    )
+
+    @app.cli.command("search-optimize")
+    @click.option("--rebuild", is_flag=True, help="Re-index everything from the source tables first")
+    def search_optimize_command(rebuild):
+        """Merge the full-text indexes into one segment each"""
+        with db.engine.begin() as conn:
+            if rebuild:
+                rebuild_search(conn)
+            optimize_search(conn)
+        click.echo("✅ Search indexes optimized")
@@ -0,0 +1,53 @@
+"""JSON encoding for responses: orjson when installed, the stdlib otherwise.
+
+Both paths produce the same documents as Flask's default provider: dates as
+HTTP dates, Decimal and UUID as strings, sorted keys. Objects with a
+__json__() method (the read models) serialize as its return value, so list
+endpoints can jsonify records without first building a dict per row.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(o):
+    if hasattr(o, "__json__"):
+        return o.__json__()
+    return DefaultJSONProvider.default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider that encodes compact responses with orjson"""
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self):
+        # Datetimes go through _default so they stay HTTP dates, as with the stdlib
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Anything beyond the compact defaults (indent, custom encoders) takes the stdlib path
+        if ORJSON_AVAILABLE and set(kwargs) <= {"separators"}:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        compact = not ((self.compact is None and self._app.debug) or self.compact is False)
+        if not (ORJSON_AVAILABLE and compact):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # bytes straight into the response, skipping a decode and re-encode
+        body = orjson.dumps(obj, default=self.default, option=self._orjson_options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Encode JSON responses with FastJSONProvider"""
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,140 @@
+"""Large submission text (pasted essays, feedback) kept outside the submission row.
+
+Submission.text_content and Submission.feedback read and write a
+SubmissionBody row, which is zlib-compressed and loaded only on demand, so
+dashboards and counts scan narrow rows. List pages that show feedback use
+list_options(): one extra SELECT for the whole page instead of one per row.
+
+Databases created before the split still hold the text in the submission row.
+`flask migrate-submission-text` moves it in small committed batches while
+the app keeps serving. Until a row is moved, reads fall back to the old
+columns, and values written through the app since the deploy are never
+overwritten.
+"""
+import time
+
+import click
+from sqlalchemy import exists, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import selectinload, undefer
+
+from models import CompressedText, Submission, SubmissionBody, db
+from schema import upgrade_schema
+
+
+def list_options():
+    """Loader options for submission lists that render feedback but not the pasted text"""
+    return (
+        selectinload(Submission.body).load_only(SubmissionBody.feedback),
+        undefer(Submission.legacy_feedback),
+    )
+
+
+def set_feedback(ids, feedback):
+    """Set the feedback of many submissions with set-based statements (no row loading).
+
+    The caller commits; ids should stay below the database's bound-parameter limit.
+    """
+    db.session.execute(
+        update(SubmissionBody)
+        .where(SubmissionBody.submission_id.in_(ids))
+        .values(feedback=feedback)
+    )
+    db.session.execute(
+        insert(SubmissionBody).from_select(
+            ["submission_id", "feedback"],
+            select(Submission.id, literal(feedback, CompressedText())).where(
+                Submission.id.in_(ids),
+                ~exists().where(SubmissionBody.submission_id == Submission.id)
+            )
+        )
+    )
+    db.session.execute(
+        update(Submission).where(Submission.id.in_(ids)).values(legacy_feedback=None)
+    )
+
+
+def _migrate_batch(rows):
+    ids = [row.id for row in rows]
+    bodies = {
+        body.submission_id: body
+        for body in SubmissionBody.query.filter(SubmissionBody.submission_id.in_(ids))
+    }
+    for row in rows:
+        body = bodies.get(row.id)
+        if body is None:
+            db.session.add(SubmissionBody(
+                submission_id=row.id,
+                text_content=row.legacy_text_content,
+                feedback=row.legacy_feedback
+            ))
+            continue
+        # A body written since the deploy is newer than the old column
+        if body.text_content is None:
+            body.text_content = row.legacy_text_content
+        if body.feedback is None:
+            body.feedback = row.legacy_feedback
+    db.session.execute(
+        update(Submission).where(Submission.id.in_(ids))
+        .values(legacy_text_content=None, legacy_feedback=None)
+    )
+    db.session.commit()
+
+
+def migrate_submission_text(batch_size=500, pause=0.05, retries=5):
+    """Move old in-row text into SubmissionBody, one short transaction per batch.
+
+    Sleeping `pause` seconds between batches leaves the write lock free for
+    the app. Returns the number of submissions moved.
+    """
+    # The columns the change-log triggers read must exist before the first batch
+    with db.engine.begin() as conn:
+        upgrade_schema(conn)
+    last_id = 0
+    moved = 0
+    while True:
+        rows = db.session.execute(
+            select(Submission.id, Submission.legacy_text_content, Submission.legacy_feedback)
+            .where(
+                Submission.id > last_id,
+                or_(Submission.legacy_text_content.isnot(None), Submission.legacy_feedback.isnot(None))
+            )
+            .order_by(Submission.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        for attempt in range(retries + 1):
+            try:
+                if rows:
+                    _migrate_batch(rows)
+                break
+            except (IntegrityError, OperationalError):
+                # The app wrote one of these bodies or held the lock; retry the batch
+                db.session.rollback()
+                if attempt == retries:
+                    raise
+                time.sleep(pause * 2 ** (attempt + 1))
+                rows = db.session.execute(
+                    select(Submission.id, Submission.legacy_text_content, Submission.legacy_feedback)
+                    .where(Submission.id.in_(ids))
+                    .order_by(Submission.id)
+                ).all()
+        last_id = ids[-1]
+        moved += len(ids)
+        print(f"📦 Moved text of {moved} submissions (up to id {last_id})")
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+def init_submission_text(app):
+    """Register `flask migrate-submission-text`"""
+    @app.cli.command("migrate-submission-text")
+    @click.option("--batch-size", default=500, show_default=True, help="Submissions per transaction")
+    @click.option("--pause", default=0.05, show_default=True, help="Seconds to sleep between batches")
+    def migrate_submission_text_command(batch_size, pause):
+        """Move pasted text and feedback out of the submission table, online"""
+        moved = migrate_submission_text(batch_size, pause)
+        click.echo(f"✅ Moved text of {moved} submissions; run `flask db-maintenance` to reclaim space")
@@ -0,0 +1,136 @@
+"""Shared fixtures: apps on a throwaway SQLite database, logged-in clients and seed data.
+
+The page templates are not part of this repository, so pages render small
+stand-ins that read the same attributes the real templates do. Anything a
+real template would lazy-load per row is therefore still counted by the
+query-count tests.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from jinja2 import DictLoader
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from factory import create_app  # noqa: E402
+from models import Assignment, Student, Submission, Teacher, db  # noqa: E402
+
+_DASHBOARD = (
+    "{% for a in assignments %}{{ a.title }}{% endfor %}"
+    "{% for s in submissions %}{{ s.assignment.title }} {{ s['grade'] }} {{ s.feedback }}{% endfor %}"
+)
+_STUDENT_DASHBOARD = (
+    "{{ student.name }}"
+    "{% for a in assignments %}{{ a.title }}{% set sub = submitted_assignments.get(a.id) %}"
+    "{% if sub %}{{ sub.grade }} {{ sub.feedback }}{% endif %}{% endfor %}"
+    "{% for s in submissions %}{{ s.assignment_title }} {{ s.feedback }}{% endfor %}"
+)
+PAGE_TEMPLATES = {
+    "dashboard_analytics.html": _DASHBOARD,
+    "dashboard_complete.html": _DASHBOARD,
+    "student_dashboard.html": _STUDENT_DASHBOARD,
+    "student_dashboard_complete.html": _STUDENT_DASHBOARD,
+}
+TEST_CONFIG = {
+    "TESTING": True,
+    "SECRET_KEY": "test",
+    "OUTBOX_DISPATCHER_ENABLED": False,
+    "REMINDERS_ENABLED": False,
+    "DETECTION_CATCH_UP_INTERVAL": 3600,
+}
+
+
+class _StubTemplates(DictLoader):
+    """PAGE_TEMPLATES, and an empty page for every other template"""
+
+    def get_source(self, environment, template):
+        if template in self.mapping:
+            return super().get_source(environment, template)
+        return "", None, lambda: True
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """create_app(profile, **config) on a new database in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    apps = []
+
+    def make(profile="full", create=True, **overrides):
+        config = dict(TEST_CONFIG, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}")
+        config.update(overrides)
+        app = create_app(profile, **config)
+        app.jinja_loader = _StubTemplates(PAGE_TEMPLATES)
+        if create:
+            with app.app_context():
+                db.create_all()
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+def login(app, teacher_id=None, student_id=None):
+    """A test client whose session is logged in as the teacher and/or student"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        if teacher_id is not None:
+            session["teacher_id"] = teacher_id
+        if student_id is not None:
+            session["student_id"] = student_id
+    return client
+
+
+def seed(app, teachers=1, assignments=2, submissions=3, students=1):
+    """Teachers with assignments, and submissions from `students` students to each.
+
+    Returns {"teachers": [ids], "students": [ids], "assignments": {teacher_id: [ids]},
+    "submissions": {teacher_id: [ids]}}.
+    """
+    ids = {"teachers": [], "students": [], "assignments": {}, "submissions": {}}
+    with app.app_context():
+        people = [
+            Student(name=f"Student {i}", reg_no=f"R{i:04d}", email=f"student{i}@example.com", password="x")
+            for i in range(students)
+        ]
+        db.session.add_all(people)
+        for t in range(teachers):
+            teacher = Teacher(email=f"teacher{t}@example.com", password="x", name=f"Teacher {t}")
+            db.session.add(teacher)
+            db.session.flush()
+            ids["teachers"].append(teacher.id)
+            ids["assignments"][teacher.id] = []
+            ids["submissions"][teacher.id] = []
+            for a in range(assignments):
+                assignment = Assignment(title=f"Essay {t}.{a}", description="Write", teacher_id=teacher.id,
+                                        due_date=datetime.utcnow() + timedelta(days=7))
+                db.session.add(assignment)
+                db.session.flush()
+                ids["assignments"][teacher.id].append(assignment.id)
+                for n in range(submissions):
+                    student = people[n % students] if people else None
+                    submission = Submission(
+                        student_name=student.name if student else f"Anon {n}",
+                        student_email=student.email if student else None,
+                        reg_no=student.reg_no if student else None,
+                        assignment_id=assignment.id,
+                        student_id=student.id if student else None,
+                        submitted_at=datetime.utcnow() - timedelta(minutes=n),
+                    )
+                    submission.feedback = f"Feedback {n}"
+                    db.session.add(submission)
+                    db.session.flush()
+                    ids["submissions"][teacher.id].append(submission.id)
+        db.session.commit()
+        ids["students"] = [student.id for student in people]
+    return ids
@@ -0,0 +1,70 @@
+"""AdmissionController: a rejected request keeps its assignment's rate budget, and idle buckets go"""
+import time
+
+from admission import AdmissionController
+from ratelimit import KeyedBuckets
+
+
+def test_rejection_for_a_full_process_does_not_spend_a_token():
+    admission = AdmissionController(max_inflight=1, max_inflight_per_assignment=2,
+                                    rate_per_assignment=0, burst_per_assignment=2)
+    assert admission.try_admit("busy")
+    for _ in range(5):
+        assert not admission.try_admit("quiet")
+
+    admission.release("busy")
+    # Both of the burst's tokens are still there
+    assert admission.try_admit("quiet")
+    admission.release("quiet")
+    assert admission.try_admit("quiet")
+    admission.release("quiet")
+    assert not admission.try_admit("quiet")
+
+
+def test_rejection_for_a_busy_assignment_does_not_spend_a_token():
+    admission = AdmissionController(max_inflight=4, max_inflight_per_assignment=1,
+                                    rate_per_assignment=0, burst_per_assignment=2)
+    assert admission.try_admit(1)
+    assert not admission.try_admit(1)
+    assert not admission.try_admit(1)
+
+    admission.release(1)
+    assert admission.try_admit(1)
+    admission.release(1)
+    # Two admissions used the burst of two; the rejections used nothing
+    assert not admission.try_admit(1)
+
+
+def test_buckets_of_idle_assignments_are_forgotten():
+    admission = AdmissionController(max_inflight=4, max_inflight_per_assignment=1,
+                                    rate_per_assignment=1000, burst_per_assignment=1)
+    for assignment_id in range(100):
+        assert admission.try_admit(assignment_id)
+        admission.release(assignment_id)
+    assert len(admission._buckets) == 100
+
+    time.sleep(0.01)  # refilled at 1000 tokens a second
+    assert admission._buckets.sweep(idle_seconds=0) == 100
+    assert len(admission._buckets) == 0
+    assert admission.try_admit(1)
+
+
+def test_a_bucket_still_refilling_is_kept():
+    buckets = KeyedBuckets(rate=0, capacity=2)
+    assert buckets.get("used").try_acquire()
+    buckets.get("untouched")
+
+    assert buckets.sweep(idle_seconds=0) == 1
+    # Evicting it would hand back the spent token
+    assert not buckets.get("used").try_acquire(2)
+
+
+def test_get_sweeps_idle_buckets_periodically():
+    buckets = KeyedBuckets(rate=1000, capacity=1, sweep_seconds=0.05)
+    for key in range(10):
+        buckets.get(key).try_acquire()
+    assert len(buckets) == 10
+
+    time.sleep(0.06)
+    buckets.get("new")
+    assert len(buckets) == 1
@@ -0,0 +1,106 @@
+"""POST /api/batch: per-operation results, ownership, atomic rollback and the size limit"""
+from models import EmailOutbox, Submission, db
+
+from conftest import login, seed
+
+
+def _state(app):
+    with app.app_context():
+        return {s.id: (s.grade, s.feedback, s.needs_review) for s in Submission.query}
+
+
+def test_each_operation_gets_a_result(app):
+    ids = seed(app, assignments=1, submissions=3)
+    a, b, c = ids["submissions"][ids["teachers"][0]]
+    client = login(app, teacher_id=ids["teachers"][0])
+
+    response = client.post("/api/batch", json={"notify": False, "operations": [
+        {"op": "grade", "submission_id": a, "grade": "A", "feedback": "Great", "ref": "row-1"},
+        {"op": "feedback", "submission_id": b, "feedback": "Needs sources"},
+        {"op": "flag", "submission_id": c, "needs_review": True},
+        {"op": "grade", "submission_id": c, "grade": ""},
+        {"op": "shout", "submission_id": c},
+        {"op": "grade", "grade": "B"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["applied"], body["failed"], body["notifications"]) == (3, 3, 0)
+    assert [(r["index"], r["status"]) for r in body["results"]] == [
+        (0, "ok"), (1, "ok"), (2, "ok"), (3, "error"), (4, "error"), (5, "error")
+    ]
+    assert body["results"][0]["ref"] == "row-1"
+    assert body["results"][3]["error"].startswith("grade must be")
+    assert body["results"][5]["error"] == "submission_id is required"
+    state = _state(app)
+    assert state[a] == ("A", "Great", False)
+    assert state[b] == (None, "Needs sources", False)
+    assert state[c] == (None, "Feedback 2", True)
+
+
+def test_other_teachers_submissions_are_not_found(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=1)
+    [mine], [theirs] = (ids["submissions"][teacher] for teacher in ids["teachers"])
+    before = _state(app)
+
+    response = login(app, teacher_id=ids["teachers"][0]).post("/api/batch", json={"operations": [
+        {"op": "grade", "submission_id": mine, "grade": "A"},
+        {"op": "grade", "submission_id": theirs, "grade": "F"},
+        {"op": "flag", "submission_id": theirs, "needs_review": True},
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["status"] for r in results] == ["ok", "error", "error"]
+    assert {r["error"] for r in results[1:]} == {"submission not found"}
+    assert _state(app)[theirs] == before[theirs]
+    assert _state(app)[mine][0] == "A"
+
+
+def test_atomic_batch_with_an_error_applies_nothing(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=2)
+    mine = ids["submissions"][ids["teachers"][0]]
+    theirs = ids["submissions"][ids["teachers"][1]]
+    # Grading would queue feedback emails; none may survive the rollback
+    app.config["FEATURES"] = app.config["FEATURES"] | {"email"}
+    with app.app_context():
+        db.session.query(Submission).update({Submission.student_email: "student@example.com"})
+        db.session.commit()
+    before = _state(app)
+
+    response = login(app, teacher_id=ids["teachers"][0]).post("/api/batch", json={"atomic": True, "operations": [
+        {"op": "grade", "submission_id": mine[0], "grade": "A", "feedback": "New"},
+        {"op": "feedback", "submission_id": mine[1], "feedback": "New"},
+        {"op": "grade", "submission_id": theirs[0], "grade": "F"},
+    ]})
+
+    assert response.status_code == 422
+    body = response.get_json()
+    assert body["applied"] == 0
+    assert [r["status"] for r in body["results"]] == ["skipped", "skipped", "error"]
+    assert _state(app) == before
+    with app.app_context():
+        assert EmailOutbox.query.count() == 0
+
+
+def test_batch_size_is_limited(make_app):
+    app = make_app(BATCH_MAX_OPERATIONS=3)
+    ids = seed(app, assignments=1, submissions=1)
+    [submission_id] = ids["submissions"][ids["teachers"][0]]
+    client = login(app, teacher_id=ids["teachers"][0])
+    op = {"op": "flag", "submission_id": submission_id, "is_late": True}
+
+    assert client.post("/api/batch", json={"operations": [op] * 4}).status_code == 413
+    with app.app_context():
+        assert not db.session.get(Submission, submission_id).is_late
+
+    assert client.post("/api/batch", json={"operations": [op] * 3}).status_code == 200
+    with app.app_context():
+        assert db.session.get(Submission, submission_id).is_late
+
+
+def test_batch_needs_a_teacher(app):
+    ids = seed(app, assignments=1, submissions=1)
+    client = login(app, student_id=ids["students"][0])
+    assert client.post("/api/batch", json={"operations": []}).status_code == 403
+    assert login(app, teacher_id=ids["teachers"][0]).post("/api/batch", json={"operations": []}).status_code == 400
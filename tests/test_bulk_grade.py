@@ -0,0 +1,62 @@
+"""Grading from the dashboard and the API only touches the logged-in teacher's submissions"""
+from models import Submission, db
+
+from conftest import login, seed
+
+
+def test_bulk_grade_ignores_other_teachers_submissions(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=2)
+    mine, theirs = (ids["submissions"][teacher] for teacher in ids["teachers"])
+    client = login(app, teacher_id=ids["teachers"][0])
+
+    response = client.post("/bulk-grade", data={
+        "action": "grade",
+        "submission_ids": [str(i) for i in mine + theirs],
+        "bulk_grade": "A",
+        "bulk_feedback": "Well done",
+    })
+
+    assert response.status_code == 302
+    assert "bulk_updated=2" in response.headers["Location"]
+    with app.app_context():
+        graded = {s.id: (s.grade, s.feedback) for s in Submission.query}
+        assert all(graded[i] == ("A", "Well done") for i in mine)
+        assert all(graded[i][0] is None and graded[i][1] != "Well done" for i in theirs)
+
+
+def test_bulk_flag_ignores_other_teachers_submissions(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=1)
+    theirs = ids["submissions"][ids["teachers"][1]]
+    client = login(app, teacher_id=ids["teachers"][0])
+
+    client.post("/bulk-grade", data={"action": "mark_plagiarism_review", "submission_ids": [str(i) for i in theirs]})
+
+    with app.app_context():
+        assert not any(db.session.get(Submission, i).needs_review for i in theirs)
+
+
+def test_api_grade_of_another_teachers_submission_is_not_found(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=1)
+    [mine], [theirs] = (ids["submissions"][teacher] for teacher in ids["teachers"])
+    client = login(app, teacher_id=ids["teachers"][0])
+
+    assert client.put(f"/api/submissions/{theirs}/grade", json={"grade": "F"}).status_code == 404
+    assert client.put(f"/api/submissions/{mine}/grade", json={"grade": "A"}).status_code == 200
+    with app.app_context():
+        assert db.session.get(Submission, theirs).grade is None
+        assert db.session.get(Submission, mine).grade == "A"
+
+
+def test_dashboard_grade_of_another_teachers_submission_is_ignored(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=1)
+    [mine], [theirs] = (ids["submissions"][teacher] for teacher in ids["teachers"])
+    client = login(app, teacher_id=ids["teachers"][0])
+
+    for submission_id in (mine, theirs):
+        response = client.post("/dashboard", data={"submission_id": submission_id, "grade": "B", "feedback": "Ok"})
+        assert response.status_code == 200
+
+    with app.app_context():
+        assert (db.session.get(Submission, mine).grade, db.session.get(Submission, mine).feedback) == ("B", "Ok")
+        assert db.session.get(Submission, theirs).grade is None
+        assert db.session.get(Submission, theirs).feedback == "Feedback 0"
@@ -0,0 +1,90 @@
+"""GET /api/changes is scoped to the caller and records writes through the triggers"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import Assignment, Submission, db
+
+from conftest import login, seed
+
+
+def changes(client, since=0):
+    response = client.get(f"/api/changes?since={since}")
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def summary(page):
+    return sorted((c["entity"], c["id"], c["op"]) for c in page["changes"])
+
+
+def test_each_caller_sees_only_their_own_changes(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=2, students=2)
+    for teacher_id in ids["teachers"]:
+        [assignment_id] = ids["assignments"][teacher_id]
+        assert summary(changes(login(app, teacher_id=teacher_id))) == sorted(
+            [("assignment", assignment_id, "insert")]
+            + [("submission", i, "insert") for i in ids["submissions"][teacher_id]]
+        )
+
+    student_id = ids["students"][0]
+    with app.app_context():
+        own = [s.id for s in Submission.query.filter_by(student_id=student_id)]
+    assert len(own) == 2
+    assert summary(changes(login(app, student_id=student_id))) == sorted(
+        [("assignment", a, "insert") for a in sum(ids["assignments"].values(), [])]
+        + [("submission", i, "insert") for i in own]
+    )
+
+
+def test_updates_and_deletes_come_through_the_triggers(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=3)
+    teacher_id, other_id = ids["teachers"]
+    graded, flagged, deleted = ids["submissions"][teacher_id]
+    client = login(app, teacher_id=teacher_id)
+    since = changes(client)["next"]
+
+    client.put(f"/api/submissions/{graded}/grade", json={"grade": "A", "feedback": "Clear"})
+    with app.app_context():
+        # Raw SQL and ORM deletes are recorded as well, not only writes through the API
+        db.session.execute(text("UPDATE submission SET needs_review = 1 WHERE id = :id"), {"id": flagged})
+        db.session.delete(db.session.get(Submission, deleted))
+        db.session.get(Assignment, ids["assignments"][other_id][0]).title = "Not yours"
+        db.session.get(Submission, ids["submissions"][other_id][0]).grade = "F"
+        db.session.commit()
+
+    page = changes(client, since)
+    by_id = {c["id"]: c for c in page["changes"] if c["entity"] == "submission"}
+    assert summary(page) == [("submission", graded, "update"), ("submission", flagged, "update"),
+                             ("submission", deleted, "delete")]
+    assert by_id[graded]["fields"] == ["feedback", "grade"]
+    assert (by_id[graded]["record"]["grade"], by_id[graded]["record"]["feedback"]) == ("A", "Clear")
+    assert by_id[flagged]["fields"] == ["needs_review"]
+    assert by_id[deleted]["record"] is None
+
+    # Nothing new after `next`
+    assert changes(client, page["next"])["changes"] == []
+    assert summary(changes(login(app, teacher_id=other_id), since)) == [
+        ("assignment", ids["assignments"][other_id][0], "update"),
+        ("submission", ids["submissions"][other_id][0], "update"),
+    ]
+
+
+def test_student_sees_their_submission_graded(app):
+    ids = seed(app, teachers=1, assignments=1, submissions=2, students=2)
+    teacher_id = ids["teachers"][0]
+    mine, theirs = ids["submissions"][teacher_id]
+    student = login(app, student_id=ids["students"][0])
+    since = changes(student)["next"]
+
+    teacher = login(app, teacher_id=teacher_id)
+    for submission_id in (mine, theirs):
+        teacher.put(f"/api/submissions/{submission_id}/grade", json={"grade": "B"})
+    with app.app_context():
+        db.session.add(Assignment(title="Lakes", description="Write", teacher_id=teacher_id,
+                                  due_date=datetime.utcnow() + timedelta(days=7)))
+        db.session.commit()
+
+    page = changes(student, since)
+    assert [(c["entity"], c["op"]) for c in page["changes"]] == [("submission", "update"), ("assignment", "insert")]
+    assert page["changes"][0]["id"] == mine
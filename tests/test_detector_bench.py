@@ -0,0 +1,40 @@
+"""Baseline comparison in benchmarks/detector_bench.py"""
+import json
+
+from benchmarks.detector_bench import compare, load_baseline
+
+BASELINE = {"results": {
+    "extract_text/txt/1KB": {"p50_ms": 10.0, "p99_ms": 20.0, "peak_kb": 1000},
+    "detect_ai_content/txt/1KB": {"p50_ms": 1.0, "p99_ms": 2.0, "peak_kb": 100},
+}}
+
+
+def _compare(results):
+    return compare(results, BASELINE, ["p50_ms", "peak_kb"], tolerance=0.25, memory_tolerance=0.25,
+                   min_delta_ms=2.0, min_delta_kb=256)
+
+
+def test_growth_past_the_tolerance_is_a_regression():
+    regressions = _compare({
+        "extract_text/txt/1KB": {"p50_ms": 13.0, "p99_ms": 90.0, "peak_kb": 1300},
+        "detect_ai_content/txt/1KB": {"p50_ms": 1.0, "p99_ms": 2.0, "peak_kb": 100},
+    })
+
+    assert regressions == [
+        "extract_text/txt/1KB: p50_ms 13.0 > 10.0 (limit 12.5)",
+        "extract_text/txt/1KB: peak_kb 1300 > 1000 (limit 1256)",
+    ]
+
+
+def test_small_absolute_changes_and_ungated_metrics_pass():
+    # +100% but under min_delta_ms; p99 isn't gated; a case missing from the baseline is ignored
+    assert _compare({
+        "detect_ai_content/txt/1KB": {"p50_ms": 2.9, "p99_ms": 50.0, "peak_kb": 300},
+        "extract_text/pdf/1KB": {"p50_ms": 500.0, "p99_ms": 500.0, "peak_kb": 9999},
+    }) == []
+
+
+def test_missing_baseline_loads_as_none(tmp_path):
+    assert load_baseline(str(tmp_path / "detector_baseline.json")) is None
+    (tmp_path / "detector_baseline.json").write_text(json.dumps(BASELINE))
+    assert load_baseline(str(tmp_path / "detector_baseline.json")) == BASELINE
@@ -0,0 +1,60 @@
+"""Profiles start in a degraded mode when optional packages are missing"""
+import sys
+
+import pytest
+
+import detectors
+from features import FEATURE_DETECTORS, PROFILES
+from models import Submission, db
+from pipeline import process_submission
+
+from conftest import seed
+
+OPTIONAL_PACKAGES = ("plagiarism", "utils", "reportlab", "cv2", "skimage", "imagehash", "fitz", "docx")
+
+
+@pytest.fixture
+def without_optional_packages(monkeypatch):
+    """Make every optional package unimportable, as on a plain `pip install flask` host"""
+    for name in list(sys.modules):
+        if name.split(".")[0] in OPTIONAL_PACKAGES:
+            monkeypatch.delitem(sys.modules, name)
+    for name in OPTIONAL_PACKAGES:
+        monkeypatch.setitem(sys.modules, name, None)
+    monkeypatch.setattr(detectors, "_REGISTRY", dict(detectors._REGISTRY))
+    monkeypatch.setattr(detectors, "_loaded", {})
+    monkeypatch.setattr(detectors, "_missing", set())
+
+
+@pytest.mark.parametrize("profile", sorted(PROFILES))
+def test_profile_starts_without_optional_packages(make_app, without_optional_packages, profile):
+    app = make_app(profile)
+
+    features = app.config["FEATURES"]
+    assert not features & set(FEATURE_DETECTORS)
+    assert ("api" in features) == ("api" in PROFILES[profile]["features"])
+    assert app.test_client().get("/").status_code in (200, 302)
+
+
+def test_missing_detector_skips_the_check(make_app, tmp_path, monkeypatch):
+    # The checker module exists but one of its dependencies doesn't
+    (tmp_path / "broken_checker.py").write_text("import not_installed_anywhere\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(detectors, "_REGISTRY", dict(detectors._REGISTRY))
+    monkeypatch.setattr(detectors, "_loaded", {})
+    monkeypatch.setattr(detectors, "_missing", set())
+    for name in FEATURE_DETECTORS["plagiarism"]:
+        detectors.register(name, "broken_checker", name)
+
+    app = make_app("basic", APP_FEATURES="+plagiarism")
+    assert "plagiarism" in app.config["FEATURES"]
+    ids = seed(app, assignments=1, submissions=1)
+    submission_id = ids["submissions"][ids["teachers"][0]][0]
+    with app.app_context():
+        queued = db.session.get(Submission, submission_id)
+        queued.text_content = "An essay about rivers"
+        queued.status = "queued"
+        db.session.commit()
+        submission = process_submission(submission_id, str(tmp_path))
+        assert submission.status == "processed"
+        assert submission.plagiarism == 0
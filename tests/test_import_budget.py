@@ -0,0 +1,17 @@
+"""Importing the web app loads no detection stack and stays near the startup budget"""
+import warnings
+
+from benchmarks.import_budget import IMPORT_BUDGET_MS, measure
+
+
+def test_app_import_is_within_budget():
+    timings, heavy = measure("app")
+
+    assert heavy == [], "detection stacks must be imported through detectors.py, not at startup"
+    # Wall time depends on the machine running the suite, so only warn
+    total_ms = timings["app"] / 1000
+    if total_ms > IMPORT_BUDGET_MS:
+        warnings.warn(
+            f"import app took {total_ms:.0f} ms, budget {IMPORT_BUDGET_MS} ms; "
+            "run `python benchmarks/import_budget.py` for the breakdown"
+        )
@@ -0,0 +1,45 @@
+"""LiveFeed keeps only the topics that are recent or have waiters"""
+import threading
+import time
+
+from live import LiveFeed
+
+from conftest import login, seed
+
+
+def test_quiet_topics_without_waiters_are_forgotten(app):
+    feed = LiveFeed(app, poll_interval=60, retention=30)
+    for n in range(1, 101):
+        feed.publish(("submission", n), n)
+    feed.publish(("teacher", 1), 100)
+
+    waiting = threading.Thread(target=feed.wait, args=(("submission", 7), 7, 2))
+    waiting.start()
+    while not feed._waiting:
+        time.sleep(0.01)
+
+    assert feed.prune(now=time.monotonic() + 10) == 0
+    assert feed.prune(now=time.monotonic() + 31) == 100
+    assert feed._latest == {("submission", 7): 7}
+
+    feed.publish(("submission", 7), 101)
+    waiting.join()
+    assert feed.prune(now=time.monotonic() + 31) == 1
+    assert feed._latest == feed._published == {}
+
+
+def test_polled_changes_are_forgotten_after_the_retention(app):
+    ids = seed(app, assignments=1, submissions=3)
+    teacher_id = ids["teachers"][0]
+    feed = LiveFeed(app, poll_interval=60, retention=60)
+    feed.poll()  # starts from the current head
+
+    teacher = login(app, teacher_id=teacher_id)
+    for submission_id in ids["submissions"][teacher_id]:
+        assert teacher.put(f"/api/submissions/{submission_id}/grade", json={"grade": "A"}).status_code == 200
+    feed.poll()
+
+    topics = {("teacher", teacher_id)} | {("submission", i) for i in ids["submissions"][teacher_id]}
+    assert set(feed._latest) == topics
+    assert feed.prune(now=time.monotonic() + 61) == len(topics)
+    assert feed._latest == {}
@@ -0,0 +1,198 @@
+"""OutboxDispatcher against a socket-level SMTP stand-in that records and fails on demand
+
+aiosmtpd is not a dependency, so SMTPStub speaks just enough SMTP over a real
+socket for Flask-Mail's smtplib connection to deliver, refuse and fail.
+"""
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from flask_mail import Mail
+
+from models import EmailOutbox, db
+from outbox import init_outbox
+
+
+class SMTPStub(socketserver.ThreadingTCPServer):
+    """Minimal SMTP server on 127.0.0.1 with an ephemeral port"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.port = self.server_address[1]
+        self.sent = []
+        self.refuse = set()  # recipients refused at RCPT TO with a 550
+        self.down = False  # greet with 421 and hang up
+        self.connections = 0
+        self._lock = threading.Lock()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        if server.down:
+            self.reply("421 Service not available")
+            return
+        with server._lock:
+            server.connections += 1
+        self.reply("220 stub ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250 stub")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address in server.refuse:
+                    self.reply("550 mailbox unavailable")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                with server._lock:
+                    server.sent.extend(recipients)
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:  # RSET, NOOP
+                recipients = []
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp():
+    server = SMTPStub()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(app, smtp):
+    app.config.update(
+        OUTBOX_BACKOFF_BASE=30, OUTBOX_MAX_ATTEMPTS=3, MAIL_DOMAIN_RATE_LIMITS={"slow.example": 6},
+        MAIL_SERVER="127.0.0.1", MAIL_PORT=smtp.port, MAIL_USE_TLS=False, MAIL_USE_SSL=False,
+        MAIL_USERNAME=None, MAIL_PASSWORD=None, MAIL_SUPPRESS_SEND=False,
+        MAIL_DEFAULT_SENDER="noreply@example.com",
+    )
+    dispatcher = init_outbox(app)
+    Mail(app)  # re-read the MAIL_* settings above into app.extensions["mail"]
+    return dispatcher, smtp
+
+
+def queue(app, *recipients):
+    with app.app_context():
+        rows = [EmailOutbox(kind="feedback", recipient=r, subject="Feedback", body="Graded") for r in recipients]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def rows(app):
+    with app.app_context():
+        return {row.recipient: row for row in EmailOutbox.query}
+
+
+def make_due(app, recipient):
+    """Pretend the backoff has elapsed for `recipient`"""
+    with app.app_context():
+        row = EmailOutbox.query.filter_by(recipient=recipient).one()
+        row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+
+def test_failed_message_is_retried_with_backoff_and_sent_message_is_not_resent(app, outbox):
+    dispatcher, mail = outbox
+    queue(app, "ok@example.com", "flaky@example.com")
+    mail.refuse.add("flaky@example.com")
+
+    before = datetime.utcnow()
+    assert dispatcher.dispatch_once() == 1
+    state = rows(app)
+    assert state["ok@example.com"].status == "sent"
+    flaky = state["flaky@example.com"]
+    assert (flaky.status, flaky.attempts, flaky.claimed_by) == ("pending", 1, None)
+    assert "mailbox unavailable" in flaky.last_error
+    # First retry waits OUTBOX_BACKOFF_BASE seconds, plus up to 20% jitter
+    assert before + timedelta(seconds=30) <= flaky.next_attempt_at <= datetime.utcnow() + timedelta(seconds=36)
+
+    # Not due yet, and the sent row is never picked up again
+    assert dispatcher.dispatch_once() == 0
+    assert mail.sent == ["ok@example.com"]
+
+    make_due(app, "flaky@example.com")
+    mail.refuse.discard("flaky@example.com")
+    assert dispatcher.dispatch_once() == 1
+    assert mail.sent == ["ok@example.com", "flaky@example.com"]
+    assert rows(app)["flaky@example.com"].status == "sent"
+    assert dispatcher.dispatch_once() == 0
+    assert mail.sent == ["ok@example.com", "flaky@example.com"]
+
+
+def test_backoff_doubles_and_gives_up_after_max_attempts(app, outbox):
+    dispatcher, mail = outbox
+    queue(app, "gone@example.com")
+    mail.refuse.add("gone@example.com")
+
+    delays = []
+    for _ in range(2):
+        started = datetime.utcnow()
+        dispatcher.dispatch_once()
+        delays.append((rows(app)["gone@example.com"].next_attempt_at - started).total_seconds())
+        make_due(app, "gone@example.com")
+    assert 30 <= delays[0] <= 36.5
+    assert 60 <= delays[1] <= 72.5
+
+    dispatcher.dispatch_once()
+    row = rows(app)["gone@example.com"]
+    assert (row.status, row.attempts) == ("failed", 3)
+    assert dispatcher.dispatch_once() == 0
+    assert mail.sent == []
+
+
+def test_connection_failure_retries_the_whole_batch(app, outbox):
+    dispatcher, mail = outbox
+    queue(app, "a@example.com", "b@example.org")
+    mail.down = True
+
+    assert dispatcher.dispatch_once() == 0
+    assert {(r.status, r.attempts) for r in rows(app).values()} == {("pending", 1)}
+
+    mail.down = False
+    make_due(app, "a@example.com")
+    make_due(app, "b@example.org")
+    assert mail.connections == 0
+    assert dispatcher.dispatch_once() == 2
+    assert sorted(mail.sent) == ["a@example.com", "b@example.org"]
+    assert mail.connections == 1
+
+
+def test_domain_rate_limit_defers_without_using_an_attempt(app, outbox):
+    dispatcher, mail = outbox
+    # 6 per minute allows a burst of one message to slow.example
+    queue(app, "one@slow.example", "two@slow.example", "other@example.com")
+
+    assert dispatcher.dispatch_once() == 2
+    assert "other@example.com" in mail.sent
+    [deferred] = [row for row in rows(app).values() if row.recipient not in mail.sent]
+    assert deferred.recipient.endswith("@slow.example")
+    assert (deferred.status, deferred.attempts) == ("pending", 0)
+    assert deferred.next_attempt_at > datetime.utcnow()
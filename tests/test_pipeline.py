@@ -0,0 +1,106 @@
+"""DetectionQueue recovery of submissions left behind by a dead process"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import pipeline
+from models import Submission, db
+from pipeline import catch_up_submission, claim_submission
+
+from conftest import seed
+
+
+def _queue_contents(detection_queue):
+    return sorted(detection_queue._queue.queue)
+
+
+def test_recover_requeues_stale_processing_claims(app):
+    ids = seed(app, assignments=1, submissions=4)
+    old, fresh, unstamped, done = ids["submissions"][ids["teachers"][0]]
+    timeout = app.config["DETECTION_CLAIM_TIMEOUT"]
+    with app.app_context():
+        rows = {row.id: row for row in Submission.query}
+        rows[old].status, rows[old].claimed_at = "processing", datetime.utcnow() - timedelta(seconds=timeout + 60)
+        rows[fresh].status, rows[fresh].claimed_at = "processing", datetime.utcnow()
+        # Claimed before claims were timestamped
+        rows[unstamped].status, rows[unstamped].claimed_at = "processing", None
+        rows[done].status = "processed"
+        db.session.commit()
+
+    detection_queue = app.extensions["detection_queue"]
+    detection_queue.recover()
+
+    assert _queue_contents(detection_queue) == sorted([old, unstamped])
+    with app.app_context():
+        rows = {row.id: row for row in Submission.query}
+        assert (rows[old].status, rows[old].stage, rows[old].claimed_at) == ("queued", "queued", None)
+        assert rows[unstamped].status == "queued"
+        assert rows[fresh].status == "processing"
+        assert rows[done].status == "processed"
+        # A re-queued submission can be claimed again, exactly once
+        assert claim_submission(old)
+        assert not claim_submission(old)
+        assert db.session.get(Submission, old).claimed_at is not None
+
+
+def test_requeue_stale_leaves_live_claims_alone(app):
+    ids = seed(app, assignments=1, submissions=1)
+    [submission_id] = ids["submissions"][ids["teachers"][0]]
+    with app.app_context():
+        db.session.get(Submission, submission_id).status = "queued"
+        db.session.commit()
+        assert claim_submission(submission_id)
+
+    assert app.extensions["detection_queue"].requeue_stale() == []
+    with app.app_context():
+        assert db.session.get(Submission, submission_id).status == "processing"
+
+
+def test_abandoned_catch_up_returns_to_provisional(app):
+    ids = seed(app, assignments=1, submissions=3)
+    old, fresh, unstamped = ids["submissions"][ids["teachers"][0]]
+    timeout = app.config["DETECTION_CLAIM_TIMEOUT"]
+    with app.app_context():
+        rows = {row.id: row for row in Submission.query}
+        for submission_id in (old, fresh, unstamped):
+            rows[submission_id].detection_completeness = "running"
+        rows[old].claimed_at = datetime.utcnow() - timedelta(seconds=timeout + 60)
+        rows[fresh].claimed_at = datetime.utcnow()
+        rows[unstamped].claimed_at = None
+        db.session.commit()
+
+    detection_queue = app.extensions["detection_queue"]
+    # Finished submissions aren't queued again, only handed back to catch-up
+    assert detection_queue.requeue_stale() == []
+    assert _queue_contents(detection_queue) == []
+
+    with app.app_context():
+        rows = {row.id: row for row in Submission.query}
+        assert (rows[old].detection_completeness, rows[old].claimed_at) == ("provisional", None)
+        assert rows[unstamped].detection_completeness == "provisional"
+        assert rows[fresh].detection_completeness == "running"
+        assert {row.status for row in rows.values()} == {"processed"}
+
+
+def test_catch_up_claim_is_timestamped(app, monkeypatch):
+    ids = seed(app, assignments=1, submissions=1)
+    [submission_id] = ids["submissions"][ids["teachers"][0]]
+    seen = []
+
+    def full_detection(submission, report_folder, duplicate):
+        # What another process sees while the deferred detectors run
+        seen.append(db.session.execute(
+            select(Submission.detection_completeness, Submission.claimed_at).where(Submission.id == submission.id)
+        ).one())
+        submission.detection_completeness = "complete"
+
+    monkeypatch.setattr(pipeline, "_run_full_detection", full_detection)
+    with app.app_context():
+        db.session.get(Submission, submission_id).detection_completeness = "provisional"
+        db.session.commit()
+        started = datetime.utcnow()
+        catch_up_submission(submission_id, app.config["REPORT_FOLDER"])
+
+    [(completeness, claimed_at)] = seen
+    assert completeness == "running"
+    assert claimed_at >= started
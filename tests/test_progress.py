@@ -0,0 +1,68 @@
+"""Submission progress waits take slots from their own pool, not the live dashboard's"""
+import os
+import runpy
+from datetime import datetime
+
+import pytest
+
+from models import Submission, db
+
+from conftest import login, seed
+
+
+@pytest.fixture
+def running_submission(app):
+    """A submission a live worker is checking for plagiarism"""
+    ids = seed(app, assignments=1, submissions=1)
+    [submission_id] = ids["submissions"][ids["teachers"][0]]
+    with app.app_context():
+        submission = db.session.get(Submission, submission_id)
+        submission.status, submission.stage, submission.claimed_at = "processing", "plagiarism", datetime.utcnow()
+        db.session.commit()
+    return ids["teachers"][0], submission_id
+
+
+def _poll(app, teacher_id, submission_id):
+    return login(app, teacher_id=teacher_id).get(
+        f"/submissions/{submission_id}/progress?stage=plagiarism&wait=0.1"
+    )
+
+
+def _take_all(slots):
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    return taken
+
+
+def test_busy_live_streams_do_not_block_progress(make_app, running_submission):
+    app = make_app(create=False, LIVE_MAX_STREAMS=1, PROGRESS_MAX_STREAMS=1)
+    assert _take_all(app.extensions["live_slots"]) == 1
+
+    response = _poll(app, *running_submission)
+
+    # It waited in a slot instead of being told to come back
+    assert response.status_code == 200
+    assert response.get_json()["stage"] == "plagiarism"
+    assert "Retry-After" not in response.headers
+
+
+def test_busy_progress_slots_answer_at_once(make_app, running_submission):
+    app = make_app(create=False, PROGRESS_MAX_STREAMS=2)
+    slots = app.extensions["progress_slots"]
+    assert _take_all(slots) == 2
+
+    response = _poll(app, *running_submission)
+
+    assert response.status_code == 200
+    assert response.headers["Retry-After"] == "3"
+    assert app.extensions["live_slots"].acquire(blocking=False)
+
+
+def test_default_stream_pools_leave_gunicorn_threads_for_requests(app, monkeypatch):
+    monkeypatch.delenv("GUNICORN_THREADS", raising=False)
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    settings = runpy.run_path(os.path.join(os.path.dirname(os.path.dirname(__file__)), "gunicorn.conf.py"))
+
+    streams = app.config["LIVE_MAX_STREAMS"] + app.config["PROGRESS_MAX_STREAMS"]
+    assert settings["threads"] - streams >= 4
@@ -0,0 +1,50 @@
+"""Pages that list submissions run a fixed number of queries however many rows they show"""
+import pytest
+
+from query_audit import assert_max_queries
+
+from conftest import login, seed
+
+# Enough rows that a per-row lazy load would run far more queries than any bound below
+ASSIGNMENTS = 6
+SUBMISSIONS_PER_ASSIGNMENT = 25
+
+
+@pytest.fixture
+def seeded(app):
+    ids = seed(app, teachers=2, assignments=ASSIGNMENTS, submissions=SUBMISSIONS_PER_ASSIGNMENT, students=5)
+    # The first request starts the detection workers, which query for work to recover
+    app.test_client().get("/")
+    return ids
+
+
+@pytest.mark.parametrize("path, max_queries", [
+    ("/dashboard", 3),  # live head, assignments, submission rows
+    ("/api/submissions", 1),
+])
+def test_teacher_listing(app, seeded, path, max_queries):
+    teacher = login(app, teacher_id=seeded["teachers"][0])
+
+    with assert_max_queries(max_queries):
+        response = teacher.get(path)
+
+    assert response.status_code == 200
+
+
+def test_api_submissions_serialises_every_row_from_one_query(app, seeded):
+    with assert_max_queries(1):
+        submissions = login(app, teacher_id=seeded["teachers"][0]).get("/api/submissions").get_json()
+
+    assert len(submissions) == sum(len(ids) for ids in seeded["submissions"].values())
+    # Feedback lives in submission_body and comes from the same query
+    assert {s["feedback"] for s in submissions} == {f"Feedback {n}" for n in range(SUBMISSIONS_PER_ASSIGNMENT)}
+
+
+def test_student_dashboard(app, seeded):
+    student = login(app, student_id=seeded["students"][0])
+
+    # student, assignments, latest submissions and their feedback, history
+    with assert_max_queries(5):
+        response = student.get("/student/dashboard")
+
+    assert response.status_code == 200
@@ -0,0 +1,99 @@
+"""Deadline reminders: who is reminded, and one send per reminder across processes"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Assignment, EmailOutbox, ReminderSent, SchedulerLease, Student, Submission, db
+from leases import release_lease
+from reminders import LEASE_NAME, ReminderScheduler, init_reminders
+
+from conftest import seed
+
+
+@pytest.fixture
+def due_soon(make_app):
+    """An assignment due in 45 minutes, whose 60-minute reminder is due now, and four students"""
+    app = make_app(REMINDER_OFFSETS=[60])
+    # Flask-Mail isn't needed to queue reminders, only to send them
+    app.config["FEATURES"] = app.config["FEATURES"] | {"email"}
+    init_reminders(app)
+    ids = seed(app, assignments=1, submissions=0, students=4)
+    [assignment_id] = ids["assignments"][ids["teachers"][0]]
+    with app.app_context():
+        db.session.get(Assignment, assignment_id).due_date = datetime.utcnow() + timedelta(minutes=45)
+        db.session.commit()
+    return app, assignment_id, ids["students"]
+
+
+def reminded(app):
+    with app.app_context():
+        return sorted(row.recipient for row in EmailOutbox.query.filter_by(kind="deadline_reminder"))
+
+
+def submit(app, assignment_id, **fields):
+    with app.app_context():
+        db.session.add(Submission(assignment_id=assignment_id, submitted_at=datetime.utcnow(), **fields))
+        db.session.commit()
+
+
+def test_students_who_submitted_are_not_reminded(due_soon):
+    app, assignment_id, students = due_soon
+    with app.app_context():
+        linked, by_reg_no, by_email, missing = (db.session.get(Student, i) for i in students)
+        submit(app, assignment_id, student_name=linked.name, student_id=linked.id)
+        # Anonymous form submissions carry only what the student typed
+        submit(app, assignment_id, student_name="typed name", reg_no=by_reg_no.reg_no)
+        submit(app, assignment_id, student_name="typed name", student_email=by_email.email)
+        missing_email = missing.email
+
+    with app.app_context():
+        assert ReminderScheduler(app).send(assignment_id, 60) == 1
+    assert reminded(app) == [missing_email]
+
+
+def test_only_the_lease_holder_sends_and_a_takeover_does_not_resend(due_soon):
+    app, assignment_id, students = due_soon
+    first, second = ReminderScheduler(app), ReminderScheduler(app)
+
+    with app.app_context():
+        first.tick()
+        second.tick()
+        assert db.session.get(SchedulerLease, LEASE_NAME).holder == first.holder
+    assert len(reminded(app)) == len(students)
+
+    # The first process dies: its lease expires and the second takes over
+    with app.app_context():
+        db.session.get(SchedulerLease, LEASE_NAME).expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        second.tick()
+        assert db.session.get(SchedulerLease, LEASE_NAME).holder == second.holder
+        # The old holder finds the lease gone and drops its schedule
+        first.tick()
+        assert first.heap == []
+        assert ReminderSent.query.count() == 1
+    assert len(reminded(app)) == len(students)
+
+
+def test_the_same_reminder_is_sent_once_even_if_two_processes_fire_it(due_soon):
+    app, assignment_id, students = due_soon
+    with app.app_context():
+        assert ReminderScheduler(app).send(assignment_id, 60) == len(students)
+        assert ReminderScheduler(app).send(assignment_id, 60) == 0
+    assert len(reminded(app)) == len(students)
+
+
+def test_takeover_sends_reminders_that_became_due_after_it(due_soon):
+    app, assignment_id, students = due_soon
+    first, second = ReminderScheduler(app), ReminderScheduler(app)
+    with app.app_context():
+        first.tick()
+        teacher_id = db.session.get(Assignment, assignment_id).teacher_id
+        later = Assignment(title="Later", description="Write", teacher_id=teacher_id,
+                           due_date=datetime.utcnow() + timedelta(minutes=50))
+        db.session.add(later)
+        db.session.commit()
+        # The first process shuts down cleanly and gives up the lease
+        release_lease(LEASE_NAME, first.holder)
+        second.tick()
+        assert {(r.assignment_id, r.offset_minutes) for r in ReminderSent.query} == {(assignment_id, 60), (later.id, 60)}
+    assert len(reminded(app)) == 2 * len(students)
@@ -0,0 +1,118 @@
+"""Upgrading a database created with the original schema"""
+import sqlite3
+
+from sqlalchemy import inspect
+
+from models import Submission, db
+from schema import upgrade_schema
+from submission_text import migrate_submission_text
+
+from conftest import login
+
+# The tables as the first release of models.py created them
+BASELINE_SCHEMA = """
+CREATE TABLE teacher (
+    id INTEGER NOT NULL, email VARCHAR(120) NOT NULL, password VARCHAR(128) NOT NULL,
+    name VARCHAR(120) NOT NULL, created_at DATETIME, PRIMARY KEY (id), UNIQUE (email)
+);
+CREATE TABLE student (
+    id INTEGER NOT NULL, name VARCHAR(120) NOT NULL, reg_no VARCHAR(120) NOT NULL,
+    email VARCHAR(120) NOT NULL, password VARCHAR(128) NOT NULL,
+    PRIMARY KEY (id), UNIQUE (reg_no), UNIQUE (email)
+);
+CREATE TABLE assignment (
+    id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, description TEXT NOT NULL,
+    due_date DATETIME NOT NULL, created_at DATETIME, teacher_id INTEGER NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(teacher_id) REFERENCES teacher (id)
+);
+CREATE TABLE submission (
+    id INTEGER NOT NULL, student_name VARCHAR(120) NOT NULL, student_email VARCHAR(120),
+    reg_no VARCHAR(20), submitted_at DATETIME, is_late BOOLEAN, plagiarism INTEGER,
+    ai_detected BOOLEAN, file_path VARCHAR(300), text_content TEXT, assignment_id INTEGER NOT NULL,
+    student_id INTEGER, grade VARCHAR(10), feedback TEXT,
+    PRIMARY KEY (id), FOREIGN KEY(assignment_id) REFERENCES assignment (id),
+    FOREIGN KEY(student_id) REFERENCES student (id)
+);
+INSERT INTO teacher VALUES (1, 'teacher@example.com', 'x', 'Teacher', '2024-01-01 09:00:00');
+INSERT INTO student VALUES (1, 'Student', 'R0001', 'student@example.com', 'x');
+INSERT INTO assignment VALUES (1, 'Rivers', 'Write about rivers', '2024-02-01 09:00:00', '2024-01-01 09:00:00', 1);
+INSERT INTO submission VALUES
+    (1, 'Student', 'student@example.com', 'R0001', '2024-01-20 10:00:00', 0, 12, 0, NULL,
+     'The estuary floods twice a day', 1, 1, 'B', 'Good use of sources'),
+    (2, 'Student', 'student@example.com', 'R0001', '2024-01-21 10:00:00', 1, 0, 0, NULL,
+     NULL, 1, 1, NULL, NULL);
+"""
+
+
+def _baseline_database(tmp_path):
+    connection = sqlite3.connect(tmp_path / "test.db")
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+
+
+def _missing_schema(app):
+    """[(table, column or index)] the models have and the database lacks"""
+    with app.app_context():
+        inspector = inspect(db.engine)
+        missing = []
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                missing.append((table.name, None))
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table.name)}
+            indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+            missing += [(table.name, c.name) for c in table.columns if c.name not in columns]
+            missing += [(table.name, i.name) for i in table.indexes if i.name not in indexes]
+        return missing
+
+
+def test_startup_upgrades_a_baseline_database(make_app, tmp_path):
+    _baseline_database(tmp_path)
+
+    app = make_app(create=False)
+
+    assert _missing_schema(app) == []
+    with app.app_context():
+        old = db.session.get(Submission, 1)
+        # Existing rows get the column defaults
+        assert (old.status, old.detection_completeness, old.needs_review) == ("processed", "complete", False)
+        assert (old.text_content, old.feedback) == ("The estuary floods twice a day", "Good use of sources")
+        assert upgrade_schema(db.session.connection()) == []
+
+    teacher = login(app, teacher_id=1)
+    assert teacher.get("/dashboard").status_code == 200
+    submissions = teacher.get("/api/submissions").get_json()
+    assert [s["id"] for s in submissions] == [1, 2]
+    assert login(app, student_id=1).get("/student/dashboard").status_code == 200
+
+
+def test_text_migration_runs_on_an_upgraded_database(make_app, tmp_path):
+    _baseline_database(tmp_path)
+    app = make_app(create=False)
+
+    with app.app_context():
+        assert migrate_submission_text(batch_size=1, pause=0) == 1
+        db.session.expire_all()
+        moved = db.session.get(Submission, 1)
+        assert moved.legacy_text_content is None
+        assert (moved.text_content, moved.feedback) == ("The estuary floods twice a day", "Good use of sources")
+
+    teacher = login(app, teacher_id=1)
+    graded = teacher.put("/api/submissions/2/grade", json={"grade": "A", "feedback": "Clear"})
+    assert graded.status_code == 200
+    changes = teacher.get("/api/changes?since=0").get_json()
+    assert [c["id"] for c in changes["changes"]] == [2]
+    found = teacher.get("/api/search/submissions?q=estuary").get_json()
+    assert [r["submission"]["id"] for r in found["results"]] == [1]
+
+
+def test_upgrade_db_command(make_app, tmp_path):
+    _baseline_database(tmp_path)
+    app = make_app(create=False, SCHEMA_AUTO_UPGRADE=False)
+    assert _missing_schema(app)
+
+    result = app.test_cli_runner().invoke(args=["upgrade-db"])
+
+    assert "submission.needs_review" in result.output
+    assert _missing_schema(app) == []
+    assert "up to date" in app.test_cli_runner().invoke(args=["upgrade-db"]).output
@@ -0,0 +1,77 @@
+"""Full-text search is scoped to the caller and follows every write through the triggers"""
+import pytest
+
+from models import Assignment, Submission, db
+
+from conftest import login, seed
+
+
+@pytest.fixture
+def essays(app):
+    """Two teachers with two submissions each, one from each of two students, all about rivers"""
+    ids = seed(app, teachers=2, assignments=1, submissions=2, students=2)
+    with app.app_context():
+        for submission in Submission.query:
+            submission.text_content = f"Rivers carve the estuary, essay {submission.id}"
+        db.session.commit()
+    return ids
+
+
+def found(client, q, **params):
+    response = client.get("/api/search/submissions", query_string=dict(q=q, **params))
+    assert response.status_code == 200
+    return sorted(result["submission"]["id"] for result in response.get_json()["results"])
+
+
+def test_teacher_finds_only_their_own_assignments_submissions(app, essays):
+    for teacher_id in essays["teachers"]:
+        assert found(login(app, teacher_id=teacher_id), "estuary") == sorted(essays["submissions"][teacher_id])
+
+
+def test_student_finds_only_their_own_submissions(app, essays):
+    for student_id in essays["students"]:
+        with app.app_context():
+            own = sorted(s.id for s in Submission.query.filter_by(student_id=student_id))
+        assert len(own) == 2
+        assert found(login(app, student_id=student_id), "estuary") == own
+
+
+def test_assignment_search_is_scoped_to_the_teacher(app, essays):
+    teacher_id = essays["teachers"][0]
+    response = login(app, teacher_id=teacher_id).get("/api/search/assignments?q=write")
+    assert [r["assignment"]["id"] for r in response.get_json()["results"]] == essays["assignments"][teacher_id]
+
+
+def test_feedback_update_replaces_the_indexed_text(app, essays):
+    teacher_id = essays["teachers"][0]
+    submission_id = essays["submissions"][teacher_id][0]
+    client = login(app, teacher_id=teacher_id)
+    assert found(client, "tributaries") == []
+
+    client.put(f"/api/submissions/{submission_id}/grade", json={"grade": "A", "feedback": "Mention tributaries"})
+
+    assert found(client, "tributaries") == [submission_id]
+    assert found(client, "tributaries", **{"in": "feedback"}) == [submission_id]
+    # The old feedback is no longer indexed for this submission
+    assert submission_id not in found(client, '"Feedback 0"')
+
+
+def test_deleted_submission_leaves_and_renamed_assignment_is_reindexed(app, essays):
+    teacher_id = essays["teachers"][0]
+    gone, kept = essays["submissions"][teacher_id]
+    client = login(app, teacher_id=teacher_id)
+    with app.app_context():
+        db.session.delete(db.session.get(Submission, gone))
+        db.session.commit()
+
+    assert found(client, "estuary") == [kept]
+
+    with app.app_context():
+        assignment = db.session.get(Assignment, essays["assignments"][teacher_id][0])
+        assignment.title = "Deltas"
+        db.session.commit()
+    def titles(q):
+        return [r["assignment"]["title"] for r in client.get(f"/api/search/assignments?q={q}").get_json()["results"]]
+
+    assert titles("deltas") == ["Deltas"]
+    assert titles("essay") == []
@@ -0,0 +1,154 @@
+"""API bearer tokens: issue, verify, expire, revoke, and the same access as the session cookie"""
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from models import RevokedToken, Student, Teacher, db
+from tokens import denylist, issue_token
+
+from conftest import login, seed
+
+
+# Few iterations: the tests log in often and only the check itself matters here
+PASSWORD = generate_password_hash("secret", method="pbkdf2:sha256:1000")
+
+
+@pytest.fixture
+def accounts(app):
+    ids = seed(app, teachers=2, assignments=1, submissions=2, students=2)
+    with app.app_context():
+        db.session.get(Teacher, ids["teachers"][0]).password = PASSWORD
+        db.session.get(Student, ids["students"][0]).password = PASSWORD
+        db.session.commit()
+    return ids
+
+
+def api_login(app, user_type="teacher", email="teacher0@example.com", password="secret"):
+    return app.test_client().post("/api/auth/login", json={
+        "email": email, "password": password, "user_type": user_type
+    })
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def teacher_token(app):
+    return api_login(app).get_json()["access_token"]
+
+
+def test_login_issues_a_token_that_works_without_the_cookie(app, accounts):
+    response = api_login(app)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["token_type"], body["expires_in"]) == ("Bearer", app.config.get("API_TOKEN_TTL", 3600))
+
+    # A fresh client has no session cookie; only the token identifies the caller
+    client = app.test_client()
+    assert client.get("/api/submissions").status_code == 403
+    assert client.get("/api/submissions", headers=bearer(body["access_token"])).status_code == 200
+
+
+def test_wrong_password_issues_no_token(app, accounts):
+    response = api_login(app, password="wrong")
+    assert response.status_code == 401
+    assert "access_token" not in response.get_json()
+
+
+@pytest.mark.parametrize("tamper", ["signature", "payload"])
+def test_tampered_token_is_rejected(app, accounts, tamper):
+    body, signature = teacher_token(app).split(".")
+    if tamper == "signature":
+        token = f"{body}.{signature[:-1]}{'A' if signature[-1] != 'A' else 'B'}"
+    else:
+        # Claims of the other teacher under the first teacher's signature
+        other, _ = issue_token(app.config["SECRET_KEY"], "teacher", accounts["teachers"][1], 3600)
+        token = f"{other.split('.')[0]}.{signature}"
+
+    response = app.test_client().get("/api/submissions", headers=bearer(token))
+
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Invalid token signature"
+
+
+def test_token_signed_with_another_secret_is_rejected(app, accounts):
+    token, _ = issue_token("not-the-secret", "teacher", accounts["teachers"][0], 3600)
+    response = app.test_client().get("/api/submissions", headers=bearer(token))
+    assert response.status_code == 401
+
+
+@pytest.mark.parametrize("token", ["", "garbage", "a.b.c"])
+def test_malformed_token_is_rejected(app, accounts, token):
+    assert app.test_client().get("/api/assignments", headers=bearer(token)).status_code == 401
+
+
+def test_expired_token_is_rejected(app, accounts):
+    token, _ = issue_token(app.config["SECRET_KEY"], "teacher", accounts["teachers"][0], -1)
+
+    response = app.test_client().get("/api/submissions", headers=bearer(token))
+
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Token expired"
+
+
+def test_logout_revokes_the_token(app, accounts):
+    token = teacher_token(app)
+    client = app.test_client()
+    assert client.post("/api/auth/logout", headers=bearer(token)).status_code == 200
+
+    response = client.get("/api/submissions", headers=bearer(token))
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Token revoked"
+    # Other tokens of the same teacher are unaffected
+    assert client.get("/api/submissions", headers=bearer(teacher_token(app))).status_code == 200
+
+
+def test_token_revoked_by_another_process_is_rejected_after_refresh(app, accounts, monkeypatch):
+    token, claims = issue_token(app.config["SECRET_KEY"], "teacher", accounts["teachers"][0], 3600)
+    client = app.test_client()
+    assert client.get("/api/submissions", headers=bearer(token)).status_code == 200
+
+    with app.app_context():
+        db.session.add(RevokedToken(jti=claims["jti"], expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+    # Force the next check to reload the denylist, as the periodic refresh would
+    monkeypatch.setattr(denylist, "_loaded_at", 0.0)
+
+    response = client.get("/api/submissions", headers=bearer(token))
+    assert response.status_code == 401
+    assert response.get_json()["error"] == "Token revoked"
+
+
+@pytest.mark.parametrize("path", [
+    "/api/assignments",
+    "/api/submissions",
+    "/api/changes?since=0",
+    "/api/search/submissions?q=essay",
+    "/api/search/assignments?q=essay",
+    "/api/analytics/overview",
+])
+def test_teacher_token_reaches_what_the_cookie_reaches(app, accounts, path):
+    by_cookie = login(app, teacher_id=accounts["teachers"][0]).get(path)
+    by_token = app.test_client().get(path, headers=bearer(teacher_token(app)))
+
+    assert by_cookie.status_code == by_token.status_code == 200
+    assert by_cookie.get_json() == by_token.get_json()
+
+
+def test_student_token_reaches_what_the_cookie_reaches(app, accounts):
+    student_id = accounts["students"][0]
+    token = api_login(app, user_type="student", email="student0@example.com").get_json()["access_token"]
+    [own, *_] = accounts["submissions"][accounts["teachers"][0]]
+    client = app.test_client()
+    cookie = login(app, student_id=student_id)
+
+    for path in (f"/api/students/{student_id}/submissions", f"/api/submissions/{own}", "/api/changes?since=0"):
+        by_cookie, by_token = cookie.get(path), client.get(path, headers=bearer(token))
+        assert by_cookie.status_code == by_token.status_code == 200
+        assert by_cookie.get_json() == by_token.get_json()
+
+    # Neither reaches another student's data or the teacher-only endpoints
+    other = accounts["students"][1]
+    for path in (f"/api/students/{other}/submissions", "/api/submissions", "/api/analytics/overview"):
+        assert cookie.get(path).status_code == client.get(path, headers=bearer(token)).status_code == 403
@@ -0,0 +1,100 @@
+"""HMAC-signed bearer tokens for the REST API.
+
+A token is `<payload>.<signature>` where the payload is base64url JSON with
+the role, user id, expiry and a unique id (jti). Verification needs only the
+secret, so authenticated API calls never touch the database; revoked tokens
+are checked against an in-memory denylist refreshed from revoked_token.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from metrics import record_cache
+from models import db, RevokedToken
+
+
+class TokenError(Exception):
+    """Raised for malformed, tampered, expired or revoked tokens"""
+
+
+def _b64encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(secret, body):
+    return _b64encode(hmac.new(secret.encode(), body.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(secret, role, user_id, ttl_seconds, **claims):
+    """Create a signed token for `role` ('teacher' or 'student') and `user_id`"""
+    payload = dict(claims, role=role, sub=user_id, exp=int(time.time()) + ttl_seconds, jti=uuid.uuid4().hex)
+    body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(secret, body)}", payload
+
+
+def verify_token(secret, token):
+    """Return the token's claims or raise TokenError; no database access on the hot path"""
+    try:
+        body, signature = token.split(".", 1)
+    except ValueError:
+        raise TokenError("Malformed token")
+    if not hmac.compare_digest(signature, _sign(secret, body)):
+        raise TokenError("Invalid token signature")
+    try:
+        claims = json.loads(_b64decode(body))
+    except ValueError:
+        raise TokenError("Malformed token")
+    if claims.get("exp", 0) < time.time():
+        raise TokenError("Token expired")
+    if denylist.contains(claims.get("jti")):
+        raise TokenError("Token revoked")
+    return claims
+
+
+class Denylist:
+    """Revoked token ids cached in memory and reloaded from the database periodically"""
+
+    def __init__(self, refresh_seconds=30):
+        self.refresh_seconds = refresh_seconds
+        self._revoked = frozenset()
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = datetime.utcnow()
+        self._revoked = frozenset(
+            jti for (jti,) in db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > now)
+        )
+        self._loaded_at = time.monotonic()
+
+    def contains(self, jti):
+        stale = time.monotonic() - self._loaded_at > self.refresh_seconds
+        record_cache("token_denylist", not stale)
+        if stale:
+            # One thread refreshes; the others keep using the current set
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._refresh()
+                finally:
+                    self._lock.release()
+        return jti in self._revoked
+
+    def revoke(self, claims):
+        """Persist a revocation and apply it to this process immediately"""
+        db.session.merge(RevokedToken(jti=claims["jti"], expires_at=datetime.utcfromtimestamp(claims["exp"])))
+        # Expired revocations are useless once the token itself has expired
+        RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        self._revoked = self._revoked | {claims["jti"]}
+
+
+denylist = Denylist()
@@ -0,0 +1,549 @@
+"""Page routes shared by every app profile.
+
+Routes are registered by init_app() with add_url_rule so endpoint names stay
+the same as when they lived in app.py ("login", "dashboard", ...).
+"""
+from flask import current_app, render_template, request, redirect, url_for, session, send_from_directory, abort, jsonify
+from models import db, Teacher, Assignment, Submission, SubmissionBody
+from models import Student
+from datetime import datetime
+from werkzeug.utils import secure_filename
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+import hashlib
+import os
+import uuid
+from datetime import datetime as dt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import detectors
+from changes import head_seq
+from features import enabled
+from metrics import SUBMISSIONS_TOTAL, stage
+from notifications import queue_feedback_notification, queue_feedback_notifications
+from pipeline import content_hash
+from progress import issue_handle
+from read_models import submission_rows
+from submission_text import list_options, set_feedback
+
+ALLOWED_EXTENSIONS = {"pdf", "doc", "docx", "txt", "png", "jpg", "jpeg"}
+MAX_FILE_SIZE = 16 * 1024 * 1024  # 16MB limit
+
+
+def template(name):
+    """Template for a page in the current profile"""
+    return current_app.config["TEMPLATES"][name]
+
+
+# -------------------
+# Student Auth Routes
+# -------------------
+def student_signup():
+    error = None
+    if request.method == "POST":
+        name = request.form["name"]
+        reg_no = request.form["reg_no"]
+        email = request.form["email"]
+        password = request.form["password"]
+        if Student.query.filter((Student.email == email) | (Student.reg_no == reg_no)).first():
+            error = "Email or Registration Number already exists."
+        else:
+            hashed_pw = generate_password_hash(password)
+            student = Student(name=name, reg_no=reg_no, email=email, password=hashed_pw)
+            db.session.add(student)
+            db.session.commit()
+            return redirect(url_for("student_login"))
+    return render_template("student_signup.html", error=error)
+
+def student_login():
+    error = None
+    if request.method == "POST":
+        email = request.form["email"]
+        password = request.form["password"]
+        student = Student.query.filter_by(email=email).first()
+        if student and check_password_hash(student.password, password):
+            session["student_id"] = student.id
+            return redirect(url_for("student_dashboard"))
+        else:
+            error = "Invalid email or password."
+    return render_template("student_login.html", error=error)
+
+def student_logout():
+    session.pop("student_id", None)
+    return redirect(url_for("student_login"))
+
+# -------------------
+# Student Dashboard Route
+# -------------------
+def student_dashboard():
+    if "student_id" not in session:
+        return redirect(url_for("student_login"))
+    student = Student.query.get(session["student_id"])
+    assignments = Assignment.query.order_by(Assignment.due_date.desc()).all()
+    # Latest submission per assignment, picked in SQL rather than by scanning every resubmission
+    ranked = db.session.query(
+        Submission.id,
+        func.row_number().over(
+            partition_by=Submission.assignment_id,
+            order_by=(Submission.submitted_at.desc(), Submission.id.desc())
+        ).label("rank")
+    ).filter(Submission.student_id == student.id).subquery()
+    latest = Submission.query.options(*list_options()) \
+        .join(ranked, Submission.id == ranked.c.id).filter(ranked.c.rank == 1).all()
+    submitted_assignments = {sub.assignment_id: sub for sub in latest}
+    # Prepare submission history for table, joining titles instead of lazy-loading each assignment
+    history = db.session.query(
+        Submission.id,
+        Assignment.title,
+        Submission.submitted_at,
+        Submission.is_late,
+        Submission.file_path,
+        Submission.legacy_feedback,
+        SubmissionBody.feedback
+    ).join(Assignment, Submission.assignment_id == Assignment.id) \
+        .outerjoin(SubmissionBody, SubmissionBody.submission_id == Submission.id) \
+        .filter(Submission.student_id == student.id) \
+        .order_by(Submission.id).all()
+    submission_history = [{
+        "id": row.id,
+        "assignment_title": row.title,
+        "submitted_at": row.submitted_at.strftime("%d %b %Y %I:%M %p") if row.submitted_at else "—",
+        "is_late": row.is_late,
+        "file_path": row.file_path,
+        "feedback": row.feedback if row.feedback is not None else row.legacy_feedback
+    } for row in history]
+    return render_template(
+        template("student_dashboard"),
+        student=student,
+        assignments=assignments,
+        submitted_assignments=submitted_assignments,
+        submissions=submission_history,
+        now=dt.utcnow()
+    )
+
+
+
+
+
+# -------------------
+# Helpers
+# -------------------
+def allowed_file(filename):
+    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def validate_file_size(file):
+    """Check if file size is within limits"""
+    if hasattr(file, 'content_length'):
+        return file.content_length <= MAX_FILE_SIZE
+    return True
+
+def wants_json():
+    """True when the client prefers a JSON response over HTML"""
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
+
+def sanitize_filename(filename):
+    """Remove dangerous characters from filename"""
+    import re
+    # Remove any characters that aren't alphanumeric, dots, hyphens, or underscores
+    filename = re.sub(r'[^\w\-_\.]', '', filename)
+    # Ensure filename isn't empty and doesn't start with a dot
+    if not filename or filename.startswith('.'):
+        filename = 'file_' + filename
+    return filename
+
+
+# -------------------
+# Routes
+# -------------------
+def home():
+    return redirect(url_for("login"))
+
+
+def teacher_signup():
+    error = None
+    if request.method == "POST":
+        name = request.form["name"]
+        email = request.form["email"]
+        password = request.form["password"]
+        
+        if Teacher.query.filter_by(email=email).first():
+            error = "Email already exists."
+        else:
+            hashed_pw = generate_password_hash(password)
+            teacher = Teacher(name=name, email=email, password=hashed_pw)
+            db.session.add(teacher)
+            db.session.commit()
+            return redirect(url_for("login"))
+    return render_template("signup.html", error=error)
+
+def login():
+    error = None
+    if request.method == "POST":
+        email = request.form["email"]
+        password = request.form["password"]
+
+        teacher = Teacher.query.filter_by(email=email).first()
+        if teacher and check_password_hash(teacher.password, password):
+            session["teacher_id"] = teacher.id
+            return redirect(url_for("dashboard"))
+        else:
+            error = "Invalid email or password"
+    return render_template("login.html", error=error)
+
+
+def create_assignment():
+    if "teacher_id" not in session:
+        return redirect(url_for("login"))
+
+    if request.method == "POST":
+        title = request.form["title"]
+        description = request.form["description"]
+        due_date = datetime.strptime(request.form["due_date"], "%Y-%m-%dT%H:%M")
+        assignment = Assignment(
+            title=title,
+            description=description,
+            due_date=due_date,
+            teacher_id=session["teacher_id"]
+        )
+        db.session.add(assignment)
+        db.session.commit()
+        return redirect(url_for("dashboard"))
+
+    return render_template("creating_assignment.html")
+
+
+def submission_key(explicit_key, student_id, reg_no, email, digest):
+    """Stored idempotency key: the client's own key, else one derived from the student and upload"""
+    if explicit_key:
+        source = f"client:{explicit_key}"
+    elif digest:
+        source = f"upload:{student_id or ''}:{reg_no}:{email}:{digest}"
+    else:
+        return None
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _accepted(submission, assignment, position=0, replayed=False):
+    """202 with the submission's handle; the pipeline reports progress separately"""
+    detection_queue = current_app.extensions["detection_queue"]
+    handle = issue_handle(submission.id)
+    accepted = {
+        "submission_id": submission.id,
+        "status": submission.status,
+        "stage": submission.stage,
+        "position": position,
+        "eta_seconds": detection_queue.eta_seconds(position),
+        "handle": handle,
+        "progress_url": url_for("submission_progress", submission_id=submission.id, handle=handle),
+        "replayed": replayed
+    }
+    if wants_json():
+        return jsonify(accepted), 202
+    return render_template(template("submission_form"), assignment=assignment, success=True, queued=accepted), 202
+
+
+def _start_processing(submission_id, assignment_id):
+    """Run detection now on a background thread while there is capacity, else queue it.
+
+    Returns the queue position (0 when it started at once).
+    """
+    admission = current_app.extensions["admission"]
+    detection_queue = current_app.extensions["detection_queue"]
+    if admission.try_admit(assignment_id):
+        SUBMISSIONS_TOTAL.labels("inline").inc()
+        detection_queue.run_now(submission_id, on_done=lambda: admission.release(assignment_id))
+        return 0
+    SUBMISSIONS_TOTAL.labels("queued").inc()
+    return detection_queue.enqueue(submission_id)
+
+
+def _replay(existing, assignment):
+    """A retried POST: hand back the stored submission, re-running it only if it failed"""
+    retried = db.session.execute(
+        update(Submission)
+        .where(Submission.id == existing.id, Submission.status == "failed")
+        .values(status="queued", stage="queued")
+    )
+    db.session.commit()
+    position = _start_processing(existing.id, assignment.id) if retried.rowcount else 0
+    return _accepted(existing, assignment, position, replayed=True)
+
+
+def submit_assignment(assignment_id):
+    assignment = Assignment.query.get_or_404(assignment_id)
+
+    if request.method == "POST":
+        # Lateness is judged on arrival, so time spent queued can never make a student late
+        arrived_at = datetime.utcnow()
+        student_name = request.form["student_name"]
+        reg_no = request.form["reg_no"]
+        email = request.form["email"]
+        text_data = request.form.get("text_data")
+        student_id = session.get("student_id")
+        # Browsers resend a form whose response timed out; the key makes that a no-op
+        explicit_key = request.headers.get("Idempotency-Key") or request.form.get("idempotency_key")
+
+        key = submission_key(explicit_key, student_id, reg_no, email, None)
+        existing = key and Submission.query.filter_by(assignment_id=assignment.id, idempotency_key=key).first()
+        if existing:
+            return _replay(existing, assignment)
+
+        file = request.files.get("file")
+        file_path = None
+        if file and file.filename:
+            if not allowed_file(file.filename):
+                return render_template(template("submission_form"), assignment=assignment, error="File type not allowed")
+            if not validate_file_size(file):
+                return render_template(template("submission_form"), assignment=assignment, error="File too large (max 16MB)")
+            
+            # Sanitize filename and create secure path
+            safe_filename = sanitize_filename(file.filename)
+            filename = secure_filename(f"{assignment_id}_{reg_no}_{safe_filename}")
+            file_path = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
+            with stage("save"):
+                file.save(file_path)
+
+        with stage("hash"):
+            digest = content_hash(file_path, text_data)
+        if not explicit_key:
+            key = submission_key(None, student_id, reg_no, email, digest)
+            existing = key and Submission.query.filter_by(assignment_id=assignment.id, idempotency_key=key).first()
+            if existing:
+                return _replay(existing, assignment)
+
+        is_late = arrived_at > assignment.due_date
+
+        # Link submission to logged-in student if available
+        submission = Submission(
+            student_name=student_name,
+            reg_no=reg_no,
+            student_email=email,
+            text_content=text_data if text_data else None,
+            file_path=file_path,
+            assignment_id=assignment.id,
+            submitted_at=arrived_at,
+            is_late=is_late,
+            status="queued",
+            stage="queued",
+            content_hash=digest,
+            idempotency_key=key,
+            student_id=student_id
+        )
+        db.session.add(submission)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key stored it first
+            db.session.rollback()
+            existing = Submission.query.filter_by(assignment_id=assignment.id, idempotency_key=key).first()
+            if existing is None:
+                raise
+            return _replay(existing, assignment)
+
+        # Detection never runs in this request: the student follows it through the handle
+        position = _start_processing(submission.id, assignment.id)
+        return _accepted(submission, assignment, position)
+
+    # The form posts this back so a resent POST is recognised as the same submission
+    return render_template(template("submission_form"), assignment=assignment, idempotency_key=uuid.uuid4().hex)
+
+
+def download_file(submission_id):
+    submission = Submission.query.get_or_404(submission_id)
+    if submission.file_path and os.path.exists(submission.file_path):
+        return send_from_directory(
+            directory=os.path.dirname(submission.file_path),
+            path=os.path.basename(submission.file_path),
+            as_attachment=True
+        )
+    abort(404, description="File not found")
+
+
+def download_report(submission_id):
+    submission = Submission.query.get_or_404(submission_id)
+    if submission.report_path and os.path.exists(submission.report_path):
+        return send_from_directory(
+            directory=os.path.dirname(submission.report_path),
+            path=os.path.basename(submission.report_path),
+            as_attachment=True
+        )
+    abort(404, description="Report not found")
+
+def preview_file(submission_id):
+    """Preview submitted file"""
+    if not enabled("preview"):
+        return "<p>File preview not available</p>", 503
+    submission = Submission.query.get_or_404(submission_id)
+    
+    if not submission.file_path or not os.path.exists(submission.file_path):
+        return "<p>File not found</p>", 404
+    
+    preview_html = detectors.get("generate_file_preview")(submission.file_path)
+    file_info = detectors.get("get_file_info")(submission.file_path)
+    
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>File Preview - {submission.student_name}</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 20px; }}
+            .file-info {{ background: #f8f9fa; padding: 10px; border-radius: 5px; margin-bottom: 20px; }}
+            .preview-content {{ border: 1px solid #ddd; padding: 20px; border-radius: 5px; }}
+        </style>
+    </head>
+    <body>
+        <h2>File Preview: {os.path.basename(submission.file_path)}</h2>
+        <div class="file-info">
+            <strong>Student:</strong> {submission.student_name}<br>
+            <strong>Assignment:</strong> {submission.assignment.title}<br>
+            <strong>Submitted:</strong> {submission.submitted_at.strftime('%Y-%m-%d %H:%M:%S')}<br>
+            {f'<strong>File Size:</strong> {file_info["size"]}<br>' if file_info else ''}
+        </div>
+        <div class="preview-content">
+            {preview_html}
+        </div>
+    </body>
+    </html>
+    """
+
+
+
+# Teacher dashboard with grading/feedback form
+def dashboard():
+    if "teacher_id" not in session:
+        return redirect(url_for("login"))
+
+    # Handle grading/feedback POST
+    if request.method == "POST":
+        submission_id = request.form.get("submission_id")
+        grade = request.form.get("grade")
+        feedback = request.form.get("feedback")
+        # Only submissions to the teacher's own assignments, like /bulk-grade
+        submission = Submission.query.join(Assignment, Submission.assignment_id == Assignment.id) \
+            .filter(Submission.id == submission_id, Assignment.teacher_id == session["teacher_id"]).first()
+        if submission:
+            submission.grade = grade
+            submission.feedback = feedback
+            # Feedback email is queued in the same transaction as the grade
+            if submission.student_email:
+                queue_feedback_notification(
+                    submission.student_email,
+                    submission.student_name,
+                    submission.assignment.title,
+                    grade,
+                    feedback
+                )
+            db.session.commit()
+
+    # Read before the page data: /dashboard/live?since=<live_seq> then misses nothing
+    live_seq = head_seq() if current_app.extensions.get("live") else None
+    assignments = Assignment.query.all()
+    # One list of slotted rows serves both the table (dict-style) and the forms (object-style)
+    submissions = submission_rows()
+    return render_template(
+        template("dashboard"),
+        assignments=assignments,
+        submissions=submissions,
+        submission_objs=submissions,
+        live_seq=live_seq
+    )
+
+
+def bulk_grade():
+    """Handle bulk grading operations"""
+    if "teacher_id" not in session:
+        return redirect(url_for("login"))
+    
+    action = request.form.get("action")
+    submission_ids = request.form.getlist("submission_ids")
+    
+    if not submission_ids:
+        return redirect(url_for("dashboard"))
+    
+    ids = [int(i) for i in submission_ids if i.isdigit()]
+
+    if action == "grade":
+        grade = request.form.get("bulk_grade")
+        feedback = request.form.get("bulk_feedback", "")
+        values = {Submission.grade: grade}
+    elif action == "mark_late":
+        values = {Submission.is_late: True}
+    elif action == "mark_plagiarism_review":
+        values = {Submission.needs_review: True}
+    else:
+        return redirect(url_for("dashboard"))
+
+    # One UPDATE ... WHERE id IN (...) per chunk instead of loading and mutating each row
+    updated = 0
+    recipients = []
+    for start in range(0, len(ids), current_app.config["BULK_CHUNK_SIZE"]):
+        # Only submissions to this teacher's assignments; other posted ids are ignored
+        chunk = [row.id for row in db.session.query(Submission.id)
+                 .join(Assignment, Submission.assignment_id == Assignment.id)
+                 .filter(Submission.id.in_(ids[start:start + current_app.config["BULK_CHUNK_SIZE"]]),
+                         Assignment.teacher_id == session["teacher_id"])]
+        if not chunk:
+            continue
+        updated += Submission.query.filter(Submission.id.in_(chunk)).update(values, synchronize_session=False)
+        if action == "grade":
+            set_feedback(chunk, feedback)
+            recipients.extend(
+                db.session.query(Submission.student_email, Submission.student_name, Assignment.title)
+                .join(Assignment, Submission.assignment_id == Assignment.id)
+                .filter(Submission.id.in_(chunk), Submission.student_email.isnot(None))
+                .all()
+            )
+    # Emails are queued as one batch in the same transaction; the outbox dispatcher sends them
+    if recipients:
+        queue_feedback_notifications(recipients, grade, feedback)
+    db.session.commit()
+
+    return redirect(url_for("dashboard", bulk_updated=updated))
+
+def logout():
+    session.pop("teacher_id", None)
+    return redirect(url_for("login"))
+
+
+# -------------------
+# Error Handlers
+# -------------------
+def too_large(e):
+    return render_template('error.html', 
+                         error_code=413, 
+                         error_message="File too large. Maximum size is 16MB."), 413
+
+def not_found(e):
+    return render_template('error.html', 
+                         error_code=404, 
+                         error_message="Page not found."), 404
+
+def internal_error(e):
+    db.session.rollback()
+    return render_template('error.html', 
+                         error_code=500, 
+                         error_message="Internal server error."), 500
+
+
+
+def init_app(app):
+    """Register the page routes and error handlers on the app"""
+    app.add_url_rule("/student/signup", view_func=student_signup, methods=["GET", "POST"])
+    app.add_url_rule("/student/login", view_func=student_login, methods=["GET", "POST"])
+    app.add_url_rule("/student/logout", view_func=student_logout)
+    app.add_url_rule("/student/dashboard", view_func=student_dashboard)
+    app.add_url_rule("/", view_func=home)
+    app.add_url_rule("/signup", view_func=teacher_signup, methods=["GET", "POST"])
+    app.add_url_rule("/login", view_func=login, methods=["GET", "POST"])
+    app.add_url_rule("/create", view_func=create_assignment, methods=["GET", "POST"])
+    app.add_url_rule("/submit/<int:assignment_id>", view_func=submit_assignment, methods=["GET", "POST"])
+    app.add_url_rule("/download/<int:submission_id>", view_func=download_file)
+    app.add_url_rule("/download-report/<int:submission_id>", view_func=download_report)
+    app.add_url_rule("/preview/<int:submission_id>", view_func=preview_file)
+    app.add_url_rule("/dashboard", view_func=dashboard, methods=["GET", "POST"])
+    app.add_url_rule("/bulk-grade", view_func=bulk_grade, methods=["POST"])
+    app.add_url_rule("/logout", view_func=logout)
+    app.register_error_handler(413, too_large)
+    app.register_error_handler(404, not_found)
+    app.register_error_handler(500, internal_error)